@@ -0,0 +1,106 @@
+# Linear component cascade class
+# Stands in for a chain of linear components (fibers, links, filters, detector bandwidth): their transfer functions
+# are multiplied into one cached response and applied with a single FFT/IFFT pair per frame (see tools.transfer)
+# Optical stages (fibers, links) filter the field (sqrt of the power) in output_opt_signal, electrical stages
+# (filters, detector bandwidth) filter the waveform in output_signal; stages of both domains cannot be mixed
+# The stages are listed by hand when building the bench, chains of components are not folded automatically
+# Default time unit: 1 s
+# Default wavelength unit = 1 nm
+# Default power unit: W
+
+# Imports
+import os, time
+import numpy as np
+from tools.transfer import TransferCascade
+from tools.graph import writable
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main component class
+class Cascade():
+    # Main parameters
+    freq = 1e6
+
+    # Input objects
+    input_signal_obj = None
+    input_time_obj = None
+
+
+    # Default functions
+    def __init__(self, stages=()):
+        print("Initializing cascade")
+        self.t0 = time.time()
+        self.tref = self.t0
+        self.cascade = TransferCascade(stages)
+
+    def __del__(self):
+        print("Deleting cascade object")
+
+    # Append a stage (in signal order, although linear stages commute)
+    def add(self, stage):
+        self.cascade.add(stage)
+        return self
+
+    # An empty cascade passes either domain through
+    def check_domain(self, domain):
+        if self.cascade.domain not in (None, domain):
+            raise ValueError(f"Cascade holds {self.cascade.domain} stages, it cannot filter an {domain} signal")
+
+    # I/O functions
+    # Set inputs: to connect the in functions to other instruments
+    # Optical sources carry their own time array, electrical ones need time_obj (output_timearray)
+    def set_inputs(self, signal_obj, time_obj=None):
+        self.input_signal_obj = signal_obj
+        self.input_time_obj = time_obj
+
+    # Optical signal to propagate
+    def input_opt_signal(self):
+        spec, wf = self.input_signal_obj.output_opt_signal()
+        return writable(spec), writable(wf)  # Edited in place (bench graph results are read-only)
+
+    # Electrical waveform to filter
+    def input_signal(self):
+        wf = self.input_signal_obj.output_signal()
+        return wf
+
+    # Time array of the electrical waveform
+    def input_time(self):
+        timearray = self.input_time_obj.output_timearray()
+        return timearray
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output optical signal: the whole chain applied to the field, and its DC power gain to the spectrum
+    def output_opt_signal(self):
+        # Get stuff from signal
+        self.freq = self.input_signal_obj.freq
+
+        # Get spectrum and waveform
+        spec, wf = self.input_opt_signal()
+        if len(wf[0]) < 2:
+            return spec, wf
+        self.check_domain("optical")
+        wavelength = spec[0][np.argmax(spec[1])]
+        dt = wf[0][1] - wf[0][0]
+
+        # Filter the field
+        field = self.cascade.apply(np.sqrt(np.maximum(wf[1], 0.0)).astype(complex), dt, wavelength)
+        wf[1] = np.abs(field)**2
+        spec[1] = np.abs(self.cascade.response(len(wf[0]), dt, wavelength)[0])**2*spec[1]
+
+        return spec, wf
+
+    # Output signal: the whole chain applied to the electrical waveform
+    def output_signal(self):
+        # Get stuff from signal
+        self.freq = self.input_signal_obj.freq
+
+        self.check_domain("electrical")
+
+        # Get waveform, and time array
+        wf = self.input_signal()
+        timearray = self.input_time()
+
+        return self.cascade.apply(wf, timearray[1] - timearray[0])
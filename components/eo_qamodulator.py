@@ -8,8 +8,8 @@ import os, time
 import numpy as np
 from scipy.fft import fft, fftfreq
 
-from instruments.qam_i_opt_signal import QAMIOSignal
-from instruments.qam_q_opt_signal import QAMQOSignal
+from components.qam_i_opt_signal import QAMIOSignal
+from components.qam_q_opt_signal import QAMQOSignal
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
@@ -35,17 +35,15 @@ class EOQAM():
     i_wf = []
     q_wf = []
 
-    # I and Q signal outputs
-    signal_i = QAMIOSignal()
-    signal_q = QAMQOSignal()
-
     # Default functions
     def __init__(self):    
         print("Initializing EO QAM Modulator object")
         self.t0 = time.time()
         self.tref = self.t0
 
-        # Connect outputs to mainframe
+        # I and Q signal outputs, connected to this modulator
+        self.signal_i = QAMIOSignal()
+        self.signal_q = QAMQOSignal()
         self.signal_i.set_inputs(self)
         self.signal_q.set_inputs(self)
 
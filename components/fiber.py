@@ -6,6 +6,8 @@
 # Imports
 import os, time
 import numpy as np
+from tools.propagation import Propagator
+from tools.graph import writable
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
@@ -16,23 +18,40 @@ thisfile = os.path.basename(__file__)
 class Fiber():
     # Main parameters
     att = 0.35  # dB/km
+    disp = 17.0  # ps/(nm km)
+    disp_slope = 0.057  # ps/(nm^2 km)
+    gamma = 1.3  # 1/(W km)
     freq = 1e6
+    transfer_domain = "optical"  # See tools.transfer
     
     # Input objects
     input_opt_signal_obj = None
 
 
     # Default functions
-    def __init__(self, length=1.0, loss=0.35):    
+    def __init__(self, length=1.0, loss=0.35, dispersion=False, nonlinear=False):    
         print("Initializing fiber")
         self.t0 = time.time()
         self.tref = self.t0
         self.length = length
         self.att = loss
+        self.dispersion = dispersion
+        self.nonlinear = nonlinear
+        self.propagator = Propagator()
 
     def __del__(self):
         print("Deleting fiber object")
 
+    # Linear response (field domain) for transfer-function cascades, see tools.transfer
+    def transfer_key(self):
+        return (self.length, self.att, self.disp, self.disp_slope, self.dispersion)
+
+    def transfer_function(self, npoints, dt, wavelength=None):
+        if not self.dispersion or wavelength is None:
+            return 10**(-self.att*self.length/20.0)
+        return self.propagator.transfer_function(npoints, dt, self.length, wavelength, self.disp, self.disp_slope,
+                                                 self.att)
+
     # I/O functions
     # Set inputs: to connect the in functions to other instruments
     def set_inputs(self, opt_signal_obj):    
@@ -41,7 +60,7 @@ class Fiber():
     # Waveform to propagate
     def input_opt_signal(self):
         spec, wf = self.input_opt_signal_obj.output_opt_signal()
-        return spec, wf
+        return writable(spec), writable(wf)  # Edited in place (bench graph results are read-only)
 
     # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
     # Output signal: The instrument oputput (a time-dependent signal)   
@@ -56,8 +75,15 @@ class Fiber():
         # Get waveform, and time array
         spec, wf = self.input_opt_signal()
         
-        # Attenuate
-        wf[1] = total_att*wf[1]
+        # Attenuate (the waveform also disperses, and with nonlinear, goes through the split-step engine)
+        if self.dispersion or self.nonlinear:
+            wavelength = spec[0][np.argmax(spec[1])]
+            disp = self.disp if self.dispersion else 0.0
+            slope = self.disp_slope if self.dispersion else 0.0
+            gamma = self.gamma if self.nonlinear else 0.0
+            wf[1] = self.propagator.propagate(wf[0], wf[1], self.length, self.att, wavelength, disp, slope, gamma)
+        else:
+            wf[1] = total_att*wf[1]
         spec[1] = total_att*spec[1]
         
         return spec, wf
\ No newline at end of file
@@ -7,7 +7,6 @@
 # Imports
 import os, time
 import numpy as np
-import matplotlib.pyplot as plt
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
@@ -19,6 +18,7 @@ class Filter():
 
     # Main parameters
     cutoff = 120e6
+    transfer_domain = "electrical"  # See tools.transfer
 
     # Input objects
     input_waveform_obj = None
@@ -36,6 +36,23 @@ class Filter():
         print("Deleting filter object")
 
 
+    # Smoothing window for a given time step (odd length, centered)
+    def window(self, timestep, maxlen):
+        filt_wl = min(max(int((1.15/self.cutoff)/timestep), 3), maxlen)
+        if not (filt_wl % 2): filt_wl -= 1
+        return np.blackman(filt_wl)
+
+    # Linear response for transfer-function cascades, see tools.transfer (the window, centered, so zero phase)
+    def transfer_key(self):
+        return (self.cutoff,)
+
+    def transfer_function(self, npoints, dt, wavelength=None):
+        w = self.window(dt, npoints)
+        h = np.zeros([npoints])
+        h[:len(w)] = w/np.sum(w)
+        h = np.roll(h, -(len(w)//2))
+        return np.fft.fft(h)
+
     # I/O functions
     # Set inputs: to connect the in functions to other instruments
     def set_inputs(self, waveform_obj, time_obj, freq_obj):    
@@ -90,9 +107,7 @@ class Filter():
 
         # Filter waveform
         timestep = timearray[1] - timearray[0]
-        filt_wl = min(max(int((1.15/self.cutoff)/timestep), 3), len(wf))
-        if not (filt_wl % 2): filt_wl -= 1
-        w = np.blackman(filt_wl)
+        w = self.window(timestep, len(wf))
         wf = np.convolve(wf, w, 'same')/np.sum(w)
 
         # Take the correct slice from the waveform
@@ -0,0 +1,77 @@
+# Simple tunable laser source class (no GUI, see instruments.laser for the front panel)
+# Default time unit: 1 s
+# Default frequency unit = 1 THz
+# Default wavelength unit: nm
+# Default power unit: W
+
+# Imports
+import os, time
+import numpy as np
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main component class
+class LaserSource():
+
+    # Main parameters
+    wavelength = 1550.0
+    frequency = 193.548
+    powermw = 1.0
+    powerdbm = 0.0
+
+    # Internal parameters
+    linewidth = 0.01
+    start_wl = 700
+    stop_wl = 1700
+    npoints = 1000000
+
+    # Spec and wf holders
+    spec = np.zeros([2, npoints])
+    wf = np.zeros([2, 100])
+
+    # Default functions
+    # Cooperative: front panels list this class first, and the Qt base is initialized through super()
+    # spec can be a precomputed spectrum (e.g. a shared-memory view, see tools.shm), used as is
+    def __init__(self, wavelength=None, powerdbm=None, spec=None, **kwargs):
+        super().__init__(**kwargs)
+
+        print("Initializing Tunable Laser object")
+        if wavelength is not None:
+            self.wavelength = wavelength
+            self.frequency = 3e5/wavelength
+        if powerdbm is not None:
+            self.powerdbm = powerdbm
+            self.powermw = 10**(powerdbm/10)
+
+        if spec is None:
+            self.create_spec()
+        else:
+            self.spec = spec
+        self.create_wf()
+
+    def __del__(self):
+        print("Deleting Tunable Laser object")
+
+    # Internal functions    
+    # Create full spectrum
+    def create_spec(self):
+        self.spec = np.zeros([2, self.npoints])
+        self.spec[0] = np.linspace(self.start_wl, self.stop_wl, self.npoints)
+
+        # Gaussian with linewidth
+        self.spec[1] = 1e-3*self.powermw*np.exp(-((self.spec[0] - self.wavelength)**2)/(2*(self.linewidth**2)))
+
+    # Create constant waveform
+    def create_wf(self):
+        self.wf = np.ones([2, 100])
+        self.wf[0] = np.linspace(0.0, 1.0, 100)
+        self.wf[1] = 1e-3*self.powermw*self.wf[1]
+
+    # I/O functions
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output optical signal: The instrument output (the laser spectrum) 
+    def output_opt_signal(self):
+        return np.copy(self.spec), np.copy(self.wf)
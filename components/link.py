@@ -0,0 +1,169 @@
+# Multi-span optical link class
+# A chain of fiber spans and point elements (connectors, splices, reflectors), with a precomputed cumulative-loss
+# index along distance, used both for the signal path and as the OTDR event map
+# The index is rebuilt lazily, on the first query after the link changed, so building a link stays linear
+# Default length unit: km
+# Default wavelength unit = 1 nm
+# Default power unit: W
+
+# Imports
+import os, time
+import numpy as np
+from tools.graph import writable
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main component class
+class Link():
+    # Main parameters
+    freq = 1e6
+    transfer_domain = "optical"  # See tools.transfer
+
+    # Input objects
+    input_opt_signal_obj = None
+
+
+    # Default functions
+    def __init__(self):
+        print("Initializing link")
+        self.t0 = time.time()
+        self.tref = self.t0
+
+        # Elements, in order: length (km), attenuation (dB/km), point loss (dB), reflectance (dB, nan if none)
+        self.elements = []
+        self.index = None  # Built on demand (None when the elements changed)
+
+    def __del__(self):
+        print("Deleting link object")
+
+    # Link elements (all return self, so links can be built in one chain; add_spans is the bulk version)
+    def add_fiber(self, length=1.0, loss=0.35):
+        self.elements.append([length, loss, 0.0, np.nan])
+        self.index = None
+        return self
+
+    def add_connector(self, loss=0.5, reflectance=-45.0):
+        self.elements.append([0.0, 0.0, loss, reflectance])
+        self.index = None
+        return self
+
+    def add_splice(self, loss=0.05):
+        self.elements.append([0.0, 0.0, loss, np.nan])
+        self.index = None
+        return self
+
+    def add_reflector(self, reflectance=-14.7, loss=0.0):
+        self.elements.append([0.0, 0.0, loss, reflectance])
+        self.index = None
+        return self
+
+    # Many spans at once: fibers of the given lengths, joined by splices (or connectors, if reflectance is given)
+    def add_spans(self, lengths, loss=0.35, joint_loss=0.05, reflectance=np.nan):
+        lengths = np.atleast_1d(lengths)
+        if len(lengths) == 0:
+            return self
+        spans = np.zeros([2*len(lengths) - 1, 4])
+        spans[0::2, 0] = lengths
+        spans[0::2, 1] = loss
+        spans[1::2, 2] = joint_loss
+        spans[:, 3] = np.nan
+        spans[1::2, 3] = reflectance
+        self.elements.extend(spans.tolist())
+        self.index = None
+        return self
+
+    # Cumulative-loss index: element starts and the loss accumulated before each element
+    def build_index(self):
+        elements = np.array(self.elements, dtype=float).reshape(-1, 4)
+        lengths, att, loss, refl = elements.T
+        starts = np.cumsum(lengths) - lengths
+        cum_after = np.cumsum(lengths*att + loss)
+        cum_before = cum_after - lengths*att - loss
+
+        point = lengths == 0.0
+        length = float(lengths.sum())
+        total_loss = float(cum_after[-1]) if len(cum_after) > 0 else 0.0
+        self.index = {"starts": starts, "lengths": lengths, "att": att, "loss": loss, "cum_before": cum_before,
+                      "length": length, "total_loss": total_loss, "mean_att": total_loss/length if length > 0 else 0.0,
+                      "events": np.array([starts[point], loss[point], refl[point]])}
+        return self.index
+
+    # Current index (rebuilt if the elements changed since the last query)
+    def get_index(self):
+        return self.index if self.index is not None else self.build_index()
+
+    # Summary values, from the index
+    @property
+    def length(self):
+        return self.get_index()["length"]  # km
+
+    @property
+    def total_loss(self):
+        return self.get_index()["total_loss"]  # dB
+
+    @property
+    def att(self):
+        return self.get_index()["mean_att"]  # dB/km, averaged over the link
+
+    @property
+    def events(self):
+        return self.get_index()["events"]  # Point elements: position (km), loss (dB), reflectance (dB)
+
+    # One-way loss (dB) at positions z (km), point losses count from their own position on
+    def loss_at(self, z):
+        index = self.get_index()
+        if len(index["starts"]) == 0:
+            return np.zeros(np.shape(z))
+        i = np.clip(np.searchsorted(index["starts"], z, side="right") - 1, 0, None)
+        inside = np.clip(z - index["starts"][i], 0.0, index["lengths"][i])
+        return index["cum_before"][i] + index["loss"][i] + index["att"][i]*inside
+
+    # Fiber attenuation (dB/km) at positions z (km), zero past the end of the link
+    def att_at(self, z):
+        index = self.get_index()
+        if len(index["starts"]) == 0:
+            return np.zeros(np.shape(z))
+        i = np.clip(np.searchsorted(index["starts"], z, side="right") - 1, 0, None)
+        return np.where(z < self.length, index["att"][i], 0.0)
+
+    # Total one-way loss of the link (dB)
+    def budget(self):
+        return self.total_loss
+
+    # Linear response (field domain) for transfer-function cascades, see tools.transfer
+    def transfer_key(self):
+        return (self.total_loss,)
+
+    def transfer_function(self, npoints, dt, wavelength=None):
+        return 10**(-self.total_loss/20.0)
+
+    # I/O functions
+    # Set inputs: to connect the in functions to other instruments
+    def set_inputs(self, opt_signal_obj):
+        self.input_opt_signal_obj = opt_signal_obj
+
+    # Waveform to propagate
+    def input_opt_signal(self):
+        spec, wf = self.input_opt_signal_obj.output_opt_signal()
+        return writable(spec), writable(wf)  # Edited in place (bench graph results are read-only)
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output signal: The instrument oputput (a time-dependent signal)
+    def output_opt_signal(self):
+        # Get stuff from signal
+        self.freq = self.input_opt_signal_obj.freq
+
+        # Total attenuation from the loss index
+        total_att = 10**(-self.budget()/10.0)
+
+        # Get waveform, and time array
+        spec, wf = self.input_opt_signal()
+
+        # Attenuate
+        wf[1] = total_att*wf[1]
+        spec[1] = total_att*spec[1]
+
+        return spec, wf
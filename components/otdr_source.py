@@ -0,0 +1,110 @@
+# Simple OTDR model class (no GUI, see instruments.otdr for the front panel)
+# Default time unit: 1 ns
+# Default wavelength unit: nm
+# Default power unit: W
+
+# Imports
+import os, time
+import numpy as np
+from tools.otdr import OTDREngine
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main component class
+class OTDRSource():
+
+    # Main parameters
+    powerdbm = 0.0
+    fiber_n = 1.45
+    pulsew = 100.0
+    stopkm = 100.0
+    averages = 64
+    resln = 1.0  # m
+
+    # Internal parameters
+    npoints = int(stopkm*1000.0/resln) + 1
+    real_length = 0.0
+    real_loss = 0.0
+
+    # Data holders
+    fiber_z = np.linspace(0, stopkm, npoints)
+    refl_pwr = np.zeros([npoints])
+    events = []
+
+
+    # Input objs
+    input_fiber = None
+    
+    # Default functions
+    # Cooperative: front panels list this class first, and the Qt base is initialized through super()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        
+        print("Initializing OTDR object")
+
+        self.engine = OTDREngine(self.fiber_n)
+
+    def __del__(self):
+        print("Deleting OTDR object")
+
+    # Internal functions
+    # Recalculate the distance grid (after changing stopkm or resln)
+    def refresh_params(self):
+        self.engine.fiber_n = self.fiber_n
+
+        self.npoints = int(self.stopkm*1000.0/self.resln) + 1
+        if self.npoints < 20:
+            self.npoints = 20
+
+        # Data holders
+        self.fiber_z = np.linspace(0, self.stopkm, self.npoints)
+        self.refl_pwr = np.zeros([self.npoints])
+
+    # Measure a trace (refl_pwr, in dB relative to its maximum)
+    def measure(self):
+        # Get stuff from fiber
+        self.input_fiber_params()
+
+        # Links bring their own events and loss profile, plain fibers get random events (position, loss,
+        # reflectance): losses are splices, the others are connectors
+        att = self.real_loss
+        loss = None
+        if hasattr(self.input_fiber, "loss_at"):
+            self.events = self.input_fiber.events
+            att = self.input_fiber.att_at(self.fiber_z)
+            loss = self.input_fiber.loss_at(self.fiber_z)
+        elif len(self.events) < 1:
+            n = np.random.randint(1, 20)
+            amps = np.random.uniform(-5, 3, n)
+            self.events = np.zeros([3, n])
+            self.events[0] = np.random.uniform(0.1, self.real_length, n)
+            self.events[1] = np.where(amps < 0, -amps, 0.3)
+            self.events[2] = np.where(amps < 0, np.nan, -55.0 + 5.0*amps)
+
+        # Backscatter trace averaged over the shots, in dB relative to its maximum
+        trace = self.engine.acquire(self.fiber_z, self.powerdbm, self.pulsew, self.real_length, att,
+                                    self.events, self.averages, loss)
+        self.refl_pwr = self.engine.to_db(trace)
+        self.refl_pwr = self.refl_pwr - self.refl_pwr.max()
+
+
+    # Set inputs: to connect the in functions to other instruments
+    def set_input_fiber(self, fiber=None):    
+        self.input_fiber = fiber
+
+    # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
+    # Total time of the output wave
+    def input_fiber_params(self):
+        if self.input_fiber:
+            self.real_length = self.input_fiber.length
+            self.real_loss = self.input_fiber.att
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output trace: a new measurement, as [length (km), rel. reflected power (dB)]
+    def output_trace(self):
+        self.refresh_params()
+        self.measure()
+        return np.array([self.fiber_z, self.refl_pwr])
@@ -6,12 +6,17 @@
 # Imports
 import os, time
 import numpy as np
+from tools.transfer import TransferCascade
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
 thisfile = os.path.basename(__file__)
 
 
+# Constants
+q = 1.602176634e-19  # C
+k_b = 1.380649e-23  # J/K
+
 # Responsivity parameters [zero, half, max, zero, max_resp]
 INGAAS = [850.0, 950.0, 1550.0, 1700.0, 0.95]
 GE = [550.0, 1000.0, 1450.0, 1650.0, 0.55]
@@ -23,7 +28,13 @@ class Photodetector():
     # Main parameters
     amp = 10e3  # V/A
     bw = 1e12  # Hz
+    dark = 5e-9  # A
+    temperature = 300.0  # K
+    noise = False  # Shot, dark and thermal noise (off by default, as the other components are noiseless)
+    absolute = False  # Photocurrent as resp*power of the waveform itself, instead of peaking at the detected spectrum
+    sparse_fraction = 0.01  # Spectra with fewer lines than this (relative to the grid) skip the full curve
     freq = 1e6
+    transfer_domain = "electrical"  # See tools.transfer
 
     # Input objects
     input_opt_signal_obj = None
@@ -35,6 +46,9 @@ class Photodetector():
         self.t0 = time.time()
         self.tref = self.t0
         self.material = material
+        self.resp_cache = {}
+        self.bw_filter = TransferCascade([self])
+        self.rng = np.random.default_rng()
 
     def __del__(self):
         print("Deleting photodetector object")
@@ -51,6 +65,65 @@ class Photodetector():
         resp = np.interp(wl_array, rough_x, rough_y)
         return resp
 
+    # Wavelength grid identity: size, ends and midpoint (grids are linspaces, rebuilt but equal on every frame)
+    def grid_key(self, wl_array):
+        return (tuple(self.material), len(wl_array), wl_array[0], wl_array[len(wl_array)//2], wl_array[-1])
+
+    # Responsivity function, cached per (material, wavelength grid)
+    def responsivity(self, wl_array):
+        key = self.grid_key(wl_array)
+        resp = self.resp_cache.get(key)
+        if resp is None:
+            if len(self.resp_cache) >= 4:
+                self.resp_cache.pop(next(iter(self.resp_cache)))
+            resp = self.create_resp_function(wl_array)
+            self.resp_cache[key] = resp
+        return resp
+
+    # Spectrum-weighted responsivity: a dot product with the cached responsivity. Sparse spectra (a few laser lines on a
+    # wide grid) only need the curve at their lines: those are cached instead, under the grid and the line positions
+    def effective_responsivity(self, spec):
+        total = np.sum(spec[1])
+        if total <= 0:
+            return 0.0
+        lines = np.flatnonzero(spec[1])
+        if len(lines) >= self.sparse_fraction*len(spec[1]):
+            return np.dot(spec[1], self.responsivity(spec[0]))/total
+        key = self.grid_key(spec[0]) + (lines.tobytes(),)
+        resp = self.resp_cache.get(key)
+        if resp is None:
+            if len(self.resp_cache) >= 4:
+                self.resp_cache.pop(next(iter(self.resp_cache)))
+            resp = self.resp_cache[key] = self.create_resp_function(spec[0][lines])
+        return np.dot(spec[1][lines], resp)/total
+
+    # Bandwidth as a single-pole electrical response, for the detector itself and for transfer-function cascades
+    def transfer_key(self):
+        return (self.bw,)
+
+    def transfer_function(self, npoints, dt, wavelength=None):
+        return 1.0/(1.0 + 1j*np.fft.fftfreq(npoints, dt)/self.bw)
+
+    # Photocurrent (A) for an optical power waveform (W): peaking at the power detected over the spectrum (as the
+    # detector always did), or resp*power with absolute. Shot, dark and thermal noise are drawn over the sampled band
+    # (white up to Nyquist, at once; the bandwidth filter then shapes it together with the signal)
+    # Thermal noise is the transimpedance amplifier's feedback resistor (amp, V/A = Ohm)
+    def photocurrent(self, spec, power):
+        resp = self.effective_responsivity(spec)
+        if self.absolute:
+            return resp*power
+        peak = np.max(power)
+        if peak <= 0:
+            return np.zeros(np.shape(power))
+        detected_power = resp*np.sum(spec[1])*(spec[0][1] - spec[0][0])
+        return detected_power*power/peak
+
+    def detect(self, current, dt):
+        if self.noise:
+            psd = 2*q*(np.abs(current) + self.dark) + 4*k_b*self.temperature/self.amp  # A^2/Hz
+            current = current + np.sqrt(psd/(2*dt))*self.rng.standard_normal(np.shape(current))
+        return current
+
     # I/O functions
     # Set inputs: to connect the in functions to other instruments
     def set_inputs(self, opt_signal_obj):    
@@ -70,16 +143,13 @@ class Photodetector():
         # Get spectrum and waveform
         spec, wf = self.input_opt_signal()
         
-        # Create responsivity function
-        resp_function = self.create_resp_function(spec[0])
-
-        # Get detected power
-        detected_spec = spec[1]*resp_function
-        detected_power = np.sum(detected_spec)*(spec[0][1] - spec[0][0])
+        # Photocurrent, with the responsivity weighted by the optical spectrum
+        current = self.photocurrent(spec, wf[1])
 
-        # Normalize waveform with detected power
-        max_v = detected_power*self.amp
+        # Noise and bandwidth, converted to voltage by the amplifier
+        if len(wf[0]) < 2:
+            return self.amp*current
+        dt = wf[0][1] - wf[0][0]
+        signal = self.amp*self.bw_filter.apply(self.detect(current, dt), dt)
 
-        signal = max_v*wf[1]/wf[1].max()
-        
-        return signal
\ No newline at end of file
+        return signal
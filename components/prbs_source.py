@@ -0,0 +1,160 @@
+# Simple PRBS source class (no GUI, see instruments.prbs_gen for the front panel)
+# Default time unit: 1 s
+# Default frequency unit = 1 Hz
+# Default voltage unit: V
+
+# Imports
+import os, time
+import numpy as np
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main component class
+class PRBSSource():
+
+    # Main parameters
+    freq = 1e6
+    amplitude = 1.0
+    dutycycle = 0.5
+    offset = 0.0
+    sampletime = 2e-6
+    npoints = 1000
+
+    # Input objects
+    input_sampletime_obj = None
+    input_npoints_obj = None
+
+    # Independent limits
+    max_freq = 50e9
+    min_freq= 100e3
+    max_amplitude = 1e2
+    min_amplitude = 1e-3
+    max_offset = 1e2
+    min_offset = -1e2
+
+    # Internal parameters
+    risetime = 0.4*(5/max_freq)
+    falltime = risetime
+    noiselevel = 5*min_amplitude
+    jitter = 20e-12
+    phase = 0.0
+    output_enabled = False
+    timemult = 1.0
+    nlevels = 2
+
+    # Waveform holder
+    wf = []
+    
+    # Default functions
+    # Cooperative: front panels list this class first, and the Qt base is initialized through super()
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+
+        print("Initializing PRBS generator")
+        self.t0 = time.time()  # Will be the phase of the output wave
+        self.tref = time.time()
+        self.refresh_params()  # Recalculate some parameters
+
+    def __del__(self):
+        print("Deleting PRBS generator object")
+
+    # Internal functions    
+    # Create full waveform
+    def get_waveform(self):
+        wf = np.zeros([self.totnpoints])
+        phase = self.t0 % (2*np.pi) + self.phase
+
+        # Add some jitter
+        jitter = np.random.uniform(-self.jitter/2, self.jitter/2)
+        argument = 2*np.pi*self.freq*(self.exttimearray + jitter) + phase
+
+        # Create bits (a new random level every period of the argument)
+        bit_n = np.floor(argument/(2*np.pi))
+        bit_n = (bit_n - bit_n[0]).astype(int)
+        bits = np.random.randint(0, self.nlevels, bit_n[-1] + 1)/(self.nlevels - 1)
+        multiplier_array = bits[bit_n]
+        wf = self.amplitude*(multiplier_array - 0.5)
+            
+        # Filter (simulate risetime)
+        filt_wl = min(max(int(self.risetime/self.delta), 3), self.totnpoints)
+        if not (filt_wl % 2): filt_wl -= 1
+        w = np.blackman(filt_wl)
+        wf = np.convolve(wf, w, 'same')/np.sum(w)
+        
+        # Get only the numper of points wanted
+        wf = wf[self.addpoints:-self.addpoints]
+
+        # Add some noise
+        noise = np.random.uniform(-self.noiselevel/2, self.noiselevel/2, size=self.npoints)
+        wf = wf + noise + self.offset
+
+        self.wf = np.clip(wf, self.min_offset, self.max_offset)
+    
+    # Recalculate some parameters
+    def refresh_params(self):  
+        self.delta = self.sampletime/self.npoints  # Time step
+        
+        # Points to add (will be cut off later, increases filter precision)
+        self.npoints = int(self.npoints*self.timemult)
+        self.addpoints = int(self.npoints*0.1)
+        self.totnpoints = self.npoints + 2*self.addpoints
+
+        # Added time due to the added points
+        self.sampletime = self.sampletime*self.timemult
+        self.addtime = self.delta*self.addpoints
+        self.tottime = self.sampletime + self.addtime
+
+        # Time arrays
+        self.exttimearray = np.linspace(-self.addtime, self.tottime, self.totnpoints)
+        self.timearray = np.linspace(0, self.sampletime, self.npoints)
+
+
+    # I/O functions
+    # Set inputs: to connect the in functions to other instruments
+    def set_inputs(self, sampletime_obj, npoints_obj):    
+        self.input_sampletime_obj = sampletime_obj
+        self.input_npoints_obj = npoints_obj
+
+    # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
+    # Total time of the output wave
+    def input_sampletime(self):
+        if self.input_sampletime_obj:
+            sampletime = self.input_sampletime_obj.output_sampletime()
+        else:
+            sampletime = self.sampletime
+        if self.sampletime != sampletime:
+            self.sampletime = sampletime
+
+    # Number of points of the output wave
+    def input_npoints(self):
+        if self.input_npoints_obj:
+            npoints = self.input_npoints_obj.output_npoints()
+        else:
+            npoints = self.npoints
+        if npoints != self.npoints:
+            self.npoints = npoints
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output signal: The instrument oputput (a time-dependent signal)   
+    def output_signal(self):
+        # Get sampletime and npoints
+        self.input_sampletime()
+        self.input_npoints()
+        self.refresh_params()
+        self.wf = np.zeros([self.npoints])
+
+        # Get data
+        self.get_waveform()
+
+        return self.wf
+
+    # Output time array: outputs the instrument time array on which the signal is based
+    def output_timearray(self):
+        return self.timearray
+
+    # Output frequency: outputs the signal frequency
+    def output_freq(self):
+        return self.freq
\ No newline at end of file
@@ -7,7 +7,6 @@
 # Imports
 import os, time
 import numpy as np
-import matplotlib.pyplot as plt
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
@@ -37,7 +36,7 @@ class QAMQOSignal():
     # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
     def input_opt_signal(self):
         spec, wf = self.input_signal_obj.output_opt_signal()
-        return spec, np.imag(wf)
+        return spec, np.array([np.real(wf[0]), np.imag(wf[1])])
 
     # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
     # Output signal: The instrument oputput (a time-dependent signal)   
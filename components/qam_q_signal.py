@@ -7,7 +7,6 @@
 # Imports
 import os, time
 import numpy as np
-import matplotlib.pyplot as plt
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
@@ -1,101 +1,60 @@
+import os
 import numpy as np
-from scipy.special import erfc
 import matplotlib.pyplot as plt
+from tools.capture import load_channels
+from tools.evm import evm_analysis, fit_constellation, ReferenceCache
 
-# Arquivo
+# Arquivo (texto .txt ou captura binária .npz, que é mapeada em memória)
 filename = "test.txt"
 
 # Número de níveis, número total de pontos da constelação
 L = 4
 M = 16
 
-# Carrega arquivo
-ch1 = []
-ch2 =[]
-with open(filename, 'r') as file:
-    lines = file.readlines()
+# Amplitude do gerador (V), também usada para os pontos ideais abaixo
+amp_gen = 10e-3
 
-    for line in lines[1:]:
-        line_strings = line.split("\t")
-        ch1.append(float(line_strings[1]))
-        ch2.append(float(line_strings[2]))
-    
-    file.close()
-
-ch1 = np.array(ch1)
-ch2 = np.array(ch2)
+# Carrega arquivo (colunas CH1 e CH2, de uma vez só)
+ch1, ch2 = load_channels(filename)
 
 # Histograma
 ni, binsi, patchesi = plt.hist(ch1, bins=L**2)
 nq, binsq, patchesq = plt.hist(ch2, bins=L**2)
 
-# Do histograma, pegar máximos visualmente (valores de x do histograma para as barras máximas de cada região)
-# É possível automatizar este procedimento (não foi feito isso aqui)
-# Podemos pegar somente os valores positivos, por exemplo, e assumir que são simétricos)
-# Costumam ser iguais para cada canal também
-# Estes pontos  correspondem aos nossos vetores de referência (par de coordenadas para cada ponto da constelação)
-refs_i = [-0.0073, -0.0022, 0.0022, 0.0073]
-refs_q = [-0.0073, -0.0022, 0.0022, 0.0073]
-
-# Para pegar os pontos automaticamente, descomente as linha seguintes. Erros grosseiros podem acontecer!!!
-# nmax_indsi = np.sort(np.argpartition(ni, -L)[-L:])
-# nmax_indsq = np.sort(np.argpartition(nq, -L)[-L:])
-# refs_i = binsi[nmax_indsi]
-# refs_q = binsi[nmax_indsq]
+# Pontos de referência (par de coordenadas para cada ponto da constelação), encontrados automaticamente
+# O ajuste (k-means em cada eixo, começando dos quantis dos dados) é guardado em cache_file para esta configuração do enlace,
+# então novas capturas com a mesma configuração não refazem o ajuste. Mude link_config quando mudar o enlace,
+# ou use refit = True para refazer o ajuste desta configuração
+link_config = {"L": L, "M": M, "amp_gen": amp_gen, "description": "QAM direto no osciloscópio"}
+cache_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), "evm_refs.json")
+refit = False
+cache = ReferenceCache(cache_file)
+if refit:
+    cache.invalidate(link_config)
+refs_i, refs_q = fit_constellation(ch1, ch2, L, config=link_config, cache=cache)
+
+# Para usar valores lidos do histograma visualmente (valores de x das barras máximas de cada região), descomente as linhas seguintes
+# refs_i = [-0.0073, -0.0022, 0.0022, 0.0073]
+# refs_q = [-0.0073, -0.0022, 0.0022, 0.0073]
 
 # Para calcular os pontos ideais a partir do seu sinal, descomente as linhas seguintes. Só se você souber exatamente a amplitude utilizada!
-# amp_gen = 10e-3
 # v_max = amp_gen/np.sqrt(2)
 # refs_i = np.linspace(-v_max, v_max, L)
 # refs_q = refs_i
 
 
-# Agora para cada ponto de cada canal, calculamos a diferença entre sua corrdenada e a coordenada mais próxima
+# Agora para cada ponto de cada canal, calculamos a diferença entre sua coordenada e a coordenada mais próxima
+# A decisão é feita para todos os pontos de uma vez, com busca binária nos limiares entre as referências
 # Este método de decisão ignorará pontos que caíram em outra região de decisão!
-i_errs = []
-i_ideals = []
-for i_coord in ch1:
-    # Decidir qual (o índice da) coordenada de refência está mais próxima
-    ref_idx = np.abs(i_coord - refs_i).argmin()
-    i_ideals.append(refs_i[ref_idx])
-
-    # Subtração (erro da coordenada)
-    i_errs.append(i_coord - refs_i[ref_idx])
-
-q_errs = []
-q_ideals = []
-for q_coord in ch2:
-    # Decidir qual (o índice da) coordenada de refência está mais próxima
-    # Criar vetor de valores de referência
-    ref_idx = np.abs(q_coord - refs_q).argmin()
-    q_ideals.append(refs_q[ref_idx])
-
-    # Subtração (erro da coordenada)
-    q_errs.append(q_coord - refs_q[ref_idx])
-
-# Transformar vetores para numpy (muito melhor de se trabalhar)
-i_errs = np.array(i_errs)
-q_errs = np.array(q_errs)
-i_ideals = np.array(i_ideals)
-q_ideals = np.array(q_ideals)
-
-# Magnitude vectors
-err_vecs = np.sqrt(i_errs**2 + q_errs**2)
-ideal_vecs = np.sqrt(i_ideals**2 + q_ideals**2)
-
-evm = np.sqrt(np.sum(err_vecs)/np.sum(ideal_vecs))
-snr = 1/(evm**2)
-
-# Separar termos do cálculo da BER
-ber_1 = (2/np.log2(L))*(1 - (1/L))
-q_1 = np.sqrt(3*np.log2(L)/(L**2 - 1))
-q_2 = 2*snr/np.log2(M)
-
-ber = ber_1*erfc(q_1*q_2)
+# Magnitudes dos vetores de erro e ideais, EVM, SNR e BER (ver tools/evm.py)
+results = evm_analysis(ch1, ch2, refs_i, refs_q, L, M)
+evm = results["evm"]
+snr = results["snr"]
+ber = results["ber"]
 
 print(f"EVM for this measurement: {evm:.3e}")
 print(f"SNR for this measurement: {snr:.3f}, or {10*np.log10(snr):.2f} dB")
 print(f"BER for this measurement: {ber:.3e}")
 
 
-plt.show()
\ No newline at end of file
+plt.show()
@@ -0,0 +1,224 @@
+# Simple virtual constellation analyzer class
+# Samples the complex baseband at the symbol centers and keeps running EVM/SNR/BER measurements
+# Default time unit: 1 s
+# Default voltage unit: V
+
+# Imports
+import os, time
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.ticker import AutoMinorLocator
+from tools.display import DensityHistogram
+from tools.evm import sample_symbols, fit_levels, RunningEVM
+from tools.ui import FrontPanel
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main instrument class
+class ConstellationAnalyzer(FrontPanel):
+    # Front panel form (Qt is only loaded with the first instance, see tools.ui)
+    ui_file = f"{main_path}/constellation_analyzer.ui"
+
+    # Main parameters
+    nsymbols = 2000
+    sps = 16  # Samples per symbol
+    nlevels = 2  # Levels per axis
+    nbins = 256  # Image size
+
+    # Input objects
+    input_objs = [None]
+
+    # Internal parameters
+    busy = False
+    volatile = ("busy",)  # Soft lock, see tools.graph
+    running = False
+    loop_timer = None
+    bench_graph = None
+    profiler = None  # tools.profiler.Profiler, timing each frame
+    freq = 1e6
+    sampletime = nsymbols/freq
+    npoints = nsymbols*sps
+    hist = None
+    stats = None
+    refs_i = None
+    refs_q = None
+    meas_key = None
+
+
+    # Default functions
+    def __init__(self):
+        super(ConstellationAnalyzer, self).__init__()
+
+        print("Initializing constellation analyzer")
+
+        self.setupUi(self)
+        self.setupOtherUi()
+        self.setupActions()
+        self.show()
+
+    def __del__(self):
+        print("Deleting constellation analyzer object")
+
+
+    # UI functions
+    def setupOtherUi(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from PyQt5 import QtCore
+
+        self.figure = Figure()
+        self.graph = FigureCanvas(self.figure)
+        self.graphToolbar = NavigationToolbar(self.graph, self)
+        self.graphToolbar.locLabel.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+        self.graphHolder.addWidget(self.graphToolbar)
+        self.graphHolder.addWidget(self.graph)
+        self.graph_ax = self.figure.add_subplot()
+        self.graph_image = self.graph_ax.imshow(np.zeros([self.nbins, self.nbins]), aspect='equal', origin='lower',
+                                                cmap='inferno', vmin=0.0, vmax=1.0, extent=[-1, 1, -1, 1])
+        (self.graph_refs,) = self.graph_ax.plot([], [], 'c+', markersize=10)
+        self.graph_ax.xaxis.set_minor_locator(AutoMinorLocator())
+        self.graph_ax.yaxis.set_minor_locator(AutoMinorLocator())
+        self.graph_ax.set_xlabel("I (V)")
+        self.graph_ax.set_ylabel("Q (V)")
+        self.graph.draw()
+
+    def setupActions(self):
+        from PyQt5.QtCore import QTimer
+
+        # Connect UI signals to functions
+        self.startBut.clicked.connect(self.runAcquisition)
+        self.stopBut.clicked.connect(self.stopAcquisition)
+        self.resetBut.clicked.connect(self.resetMeasurement)
+        self.symbolsSpin.valueChanged.connect(self.setAcquisition)
+        self.spsSpin.valueChanged.connect(self.setAcquisition)
+        self.levelsSpin.valueChanged.connect(self.setAcquisition)
+
+        # Timers
+        self.loop_timer = QTimer()
+        self.loop_timer.timeout.connect(self.measLoop)
+        self.loop_timer.setInterval(10)
+
+    # Start/stop Acquisition
+    def runAcquisition(self):
+        if not self.running:
+            self.running = True
+            self.loop_timer.start()
+
+    def stopAcquisition(self):
+        if self.running:
+            self.running = False
+            self.loop_timer.stop()
+
+    # Set acquisition stuff
+    def setAcquisition(self):
+        self.nsymbols = self.symbolsSpin.value()
+        self.sps = self.spsSpin.value()
+        self.nlevels = self.levelsSpin.value()
+        self.resetMeasurement()
+
+    # Clear accumulated data (references are fitted again from the next frame)
+    def resetMeasurement(self):
+        self.meas_key = None
+
+
+    # Internal functions
+    # Acquisition loop
+    def measLoop(self):
+        if not self.busy:
+            # Set soft lock
+            self.busy = True
+
+            # Profiling hooks (tools.profiler): time this frame
+            if self.profiler is not None:
+                self.profiler.begin_frame(self)
+
+            try:
+                # Explicit bench graph (tools.graph): evaluate this frame's upstream in one pass
+                if self.bench_graph is not None:
+                    self.bench_graph.run(self)
+
+                if self.input_objs[0]:
+                    # Get symbols
+                    data = self.input_signal()
+                    delta = self.sampletime/self.npoints
+                    sps = int(max((1/self.freq)/delta, 1))  # Same rounding as the generators
+                    symbols = sample_symbols(data, sps)
+
+                    # New measurement when the settings change
+                    key = (self.freq, self.nsymbols, self.sps, self.nlevels)
+                    if key != self.meas_key:
+                        self.meas_key = key
+                        self.refs_i = fit_levels(symbols.real, self.nlevels)
+                        self.refs_q = fit_levels(symbols.imag, self.nlevels)
+                        span = max(self.refs_i[-1] - self.refs_i[0], self.refs_q[-1] - self.refs_q[0], 1e-9)
+                        xlims = [self.refs_i[0] - 0.5*span, self.refs_i[-1] + 0.5*span]
+                        ylims = [self.refs_q[0] - 0.5*span, self.refs_q[-1] + 0.5*span]
+                        self.hist = DensityHistogram(xlims, ylims, self.nbins, self.nbins)
+                        self.stats = RunningEVM(self.nlevels)
+
+                    # Accumulate
+                    self.hist.add(symbols.real, symbols.imag)
+                    self.stats.add(symbols.real, symbols.imag, self.refs_i, self.refs_q)
+
+                    # Update plot and measurements
+                    grid_i, grid_q = np.meshgrid(self.refs_i, self.refs_q)
+                    self.graph_refs.set_data(grid_i.ravel(), grid_q.ravel())
+                    self.graph_image.set_data(self.hist.image())
+                    self.graph_image.set_extent(self.hist.extent())
+                    self.graph_ax.set_xlim(self.hist.xlims)
+                    self.graph_ax.set_ylim(self.hist.ylims)
+
+                    evm = self.stats.evm()
+                    snr = self.stats.snr()
+                    self.evmInd.setText(f"{100*evm:.2f} %")
+                    self.snrInd.setText(f"{10*np.log10(snr):.2f} dB")
+                    self.berInd.setText(f"{self.stats.ber():.3e}")
+                    self.symbolsInd.setText(f"{self.stats.nsymbols}")
+
+                self.graph.draw()
+                self.graph.flush_events()
+            finally:
+                # Close the profiled frame, even when it failed (the overlay shows on the next draw)
+                if self.profiler is not None:
+                    self.profiler.end_frame(self)
+
+            # Release soft lock
+            self.busy = False
+
+
+    # I/O functions
+    # Set inputs: a QAM generator (complex signal) or an EO QAM modulator (complex optical waveform)
+    # The generator must take its sample time and npoints from this analyzer, so symbols have known length
+    def set_inputs(self, sig=None):
+        self.input_objs = [sig]
+
+    # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
+    # Complex baseband
+    def input_signal(self):
+        obj = self.input_objs[0]
+        if hasattr(obj, "output_opt_signal"):
+            spec, wf = obj.output_opt_signal()
+            data = wf[1]
+        else:
+            # The QAM generator only refreshes every other call (to serve its I and Q outputs), ask for a new frame
+            if hasattr(obj, "new_frame"):
+                obj.new_frame()
+            data = obj.output_signal()
+        self.freq = obj.freq
+        return np.asarray(data, dtype=complex)
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output sample time: an integer number of symbols
+    def output_sampletime(self):
+        if self.input_objs[0]:
+            self.freq = self.input_objs[0].freq
+        self.sampletime = self.nsymbols/self.freq
+        return self.sampletime*1
+
+    # Output npoints
+    def output_npoints(self):
+        self.npoints = self.nsymbols*self.sps
+        return self.npoints*1
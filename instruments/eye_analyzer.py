@@ -0,0 +1,225 @@
+# Simple virtual eye diagram analyzer class
+# Folds long records modulo the symbol period (no trigger needed) and accumulates a density image
+# Default time unit: 1 s
+# Default voltage unit: V
+
+# Imports
+import os, time
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.ticker import AutoMinorLocator
+from tools.eye import EyeAccumulator
+from tools.ui import FrontPanel
+
+# File paths
+main_path = os.path.dirname(os.path.realpath(__file__))
+thisfile = os.path.basename(__file__)
+
+
+# Main instrument class
+class EyeAnalyzer(FrontPanel):
+    # Front panel form (Qt is only loaded with the first instance, see tools.ui)
+    ui_file = f"{main_path}/eye_analyzer.ui"
+
+    # Main parameters
+    nsymbols = 2000
+    sps = 32  # Samples per symbol
+    nui = 2  # Symbol periods shown
+    nx = 256  # Image size
+    ny = 256
+
+    # Input objects
+    input_objs = [None]
+
+    # Internal parameters
+    busy = False
+    volatile = ("busy",)  # Soft lock, see tools.graph
+    running = False
+    loop_timer = None
+    bench_graph = None
+    profiler = None  # tools.profiler.Profiler, timing each frame
+    freq = 1e6
+    sampletime = nsymbols/freq
+    npoints = nsymbols*sps
+    eye = None
+    eye_key = None
+
+
+    # Default functions
+    def __init__(self):
+        super(EyeAnalyzer, self).__init__()
+
+        print("Initializing eye diagram analyzer")
+
+        self.setupUi(self)
+        self.setupOtherUi()
+        self.setupActions()
+        self.show()
+
+    def __del__(self):
+        print("Deleting eye diagram analyzer object")
+
+
+    # UI functions
+    def setupOtherUi(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from PyQt5 import QtCore
+
+        self.figure = Figure()
+        self.graph = FigureCanvas(self.figure)
+        self.graphToolbar = NavigationToolbar(self.graph, self)
+        self.graphToolbar.locLabel.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
+        self.graphHolder.addWidget(self.graphToolbar)
+        self.graphHolder.addWidget(self.graph)
+        self.graph_ax = self.figure.add_subplot()
+        self.graph_image = self.graph_ax.imshow(np.zeros([self.ny, self.nx]), aspect='auto', origin='lower',
+                                                cmap='inferno', vmin=0.0, vmax=1.0, extent=[0, self.nui, -1, 1])
+        self.graph_ax.xaxis.set_minor_locator(AutoMinorLocator())
+        self.graph_ax.yaxis.set_minor_locator(AutoMinorLocator())
+        self.graph_ax.set_xlabel("Time (UI)")
+        self.graph_ax.set_ylabel("Voltage (V)")
+        self.graph.draw()
+
+    def setupActions(self):
+        from PyQt5.QtCore import QTimer
+
+        # Connect UI signals to functions
+        self.startBut.clicked.connect(self.runAcquisition)
+        self.stopBut.clicked.connect(self.stopAcquisition)
+        self.resetBut.clicked.connect(self.resetEye)
+        self.symbolsSpin.valueChanged.connect(self.setAcquisition)
+        self.spsSpin.valueChanged.connect(self.setAcquisition)
+
+        # Timers
+        self.loop_timer = QTimer()
+        self.loop_timer.timeout.connect(self.measLoop)
+        self.loop_timer.setInterval(10)
+
+    # Start/stop Acquisition
+    def runAcquisition(self):
+        if not self.running:
+            self.running = True
+            self.loop_timer.start()
+
+    def stopAcquisition(self):
+        if self.running:
+            self.running = False
+            self.loop_timer.stop()
+
+    # Set acquisition stuff
+    def setAcquisition(self):
+        self.nsymbols = self.symbolsSpin.value()
+        self.sps = self.spsSpin.value()
+        self.resetEye()
+
+    # Clear accumulated eye
+    def resetEye(self):
+        self.eye_key = None
+
+
+    # Internal functions
+    # Helper to convert scientific notation to readable number with appropriate unit
+    def float2SI(self, number):
+        units = {  0:' ',
+           1:'K',  2:'M',  3:'G',  4:'T',  5:'P',  6:'E',  7:'Z',  8:'Y',
+          -1:'m', -2:'u', -3:'n', -4:'p', -5:'f', -6:'a', -7:'z', -8:'y'
+        }
+
+        if not np.isfinite(number) or number == 0:
+            return f"{number:.3g} "
+        mantissa,exponent = f"{number:e}".split("e")
+        unitRange         = int(exponent)//3
+        unit              = units.get(unitRange,None)
+        unitValue         = float(mantissa)*10**(int(exponent)%3)
+        return f"{unitValue:.3g} {unit}" if unit else f"{number:.3e} "
+
+    # Acquisition loop
+    def measLoop(self):
+        if not self.busy:
+            # Set soft lock
+            self.busy = True
+
+            # Profiling hooks (tools.profiler): time this frame
+            if self.profiler is not None:
+                self.profiler.begin_frame(self)
+
+            try:
+                if self.input_objs[0]:
+                    # Fixed phase, so all records share the same symbol clock (jitter still comes from the generator)
+                    self.input_objs[0].t0 = 0.0
+                    self.freq = self.input_objs[0].freq
+
+                    # Explicit bench graph (tools.graph): evaluate this frame's upstream in one pass, once the phase is set
+                    if self.bench_graph is not None:
+                        self.bench_graph.run(self)
+
+                    # Get data
+                    data = self.input_signal()
+                    timearray = self.input_timearray(len(data))
+
+                    # New eye when the symbol period or the record change
+                    key = (self.freq, self.nsymbols, self.sps)
+                    if key != self.eye_key:
+                        self.eye_key = key
+                        span = max(data.max() - data.min(), 1e-6)
+                        ylims = [data.min() - 0.25*span, data.max() + 0.25*span]
+                        self.eye = EyeAccumulator(1/self.freq, ylims, self.nui, self.nx, self.ny)
+
+                    # Fold and accumulate
+                    self.eye.add(timearray, data)
+
+                    # Update plot and measurements
+                    self.graph_image.set_data(self.eye.image())
+                    self.graph_image.set_extent(self.eye.extent())
+                    self.graph_ax.set_xlim([0, self.nui])
+                    self.graph_ax.set_ylim(self.eye.hist.ylims)
+
+                    meas = self.eye.metrics()
+                    self.heightInd.setText(f"{self.float2SI(meas['height'])}V")
+                    self.widthInd.setText(f"{self.float2SI(meas['width'])}s")
+                    self.jitterInd.setText(f"{self.float2SI(meas['jitter_rms'])}s")
+                    self.qInd.setText(f"{meas['q']:.2f}")
+                    self.recordsInd.setText(f"{meas['records']}")
+
+                self.graph.draw()
+                self.graph.flush_events()
+            finally:
+                # Close the profiled frame, even when it failed (the overlay shows on the next draw)
+                if self.profiler is not None:
+                    self.profiler.end_frame(self)
+
+            # Release soft lock
+            self.busy = False
+
+
+    # I/O functions
+    # Set inputs: to connect the in functions to other instruments
+    def set_inputs(self, sig=None):
+        self.input_objs = [sig]
+
+    # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
+    # Signal to analyze
+    def input_signal(self):
+        return np.real(self.input_objs[0].output_signal())
+
+    # Time array of the signal
+    def input_timearray(self, npoints):
+        if hasattr(self.input_objs[0], "output_timearray"):
+            timearray = self.input_objs[0].output_timearray()
+            if len(timearray) == npoints:
+                return timearray
+        return np.linspace(0, self.sampletime, npoints)
+
+    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
+    # Output sample time: an integer number of symbols
+    def output_sampletime(self):
+        if self.input_objs[0]:
+            self.freq = self.input_objs[0].freq
+        self.sampletime = self.nsymbols/self.freq
+        return self.sampletime*1
+
+    # Output npoints
+    def output_npoints(self):
+        self.npoints = self.nsymbols*self.sps
+        return self.npoints*1
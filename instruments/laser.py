@@ -8,52 +8,32 @@
 # Imports
 import os, time
 import numpy as np
-from PyQt5 import uic
+from components.laser_source import LaserSource
+from tools.ui import FrontPanel
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
 thisfile = os.path.basename(__file__)
 
-# Load ui file
-FormUI, WindowUI = uic.loadUiType(f"{main_path}/laser.ui")
 
-
-# Main instrument class
-class Laser(FormUI, WindowUI):
-
-    # Main parameters
-    wavelength = 1550.0
-    frequency = 193.548
-    powermw = 1.0
-    powerdbm = 0.0
+# Main instrument class (the model lives in LaserSource)
+class Laser(LaserSource, FrontPanel):
+    # Front panel form (Qt is only loaded with the first instance, see tools.ui)
+    ui_file = f"{main_path}/laser.ui"
 
     # Internal parameters
-    linewidth = 0.01
-    start_wl = 700
-    stop_wl = 1700
-    npoints = 1000000
     ui_busy = False
-
-    # Spec and wf holders
-    spec = np.zeros([2, npoints])
-    wf = np.zeros([2, 100])
+    volatile = ("ui_busy",)  # Soft lock, see tools.graph
     
     # Default functions
     def __init__(self):
         super(Laser, self).__init__()
-        
-        print("Initializing Tunable Laser object")
 
         self.setupUi(self)
         self.setupOtherUi()
         self.setupActions()
-        self.create_spec()
-        self.create_wf()
         self.show()
 
-    def __del__(self):
-        print("Deleting Tunable Laser object")
-
     
     # UI functions
     def setupOtherUi(self):
@@ -94,28 +74,6 @@ class Laser(FormUI, WindowUI):
                 self.dbpwrSpin.setValue(self.powerdbm)
 
             self.create_spec()
+            self.create_wf()
 
             self.ui_busy = False
-
-
-    # Internal functions    
-    # Create full spectrum
-    def create_spec(self):
-        self.spec = np.zeros([2, self.npoints])
-        self.spec[0] = np.linspace(self.start_wl, self.stop_wl, self.npoints)
-
-        # Gaussian with linewidth
-        self.spec[1] = 1e-3*self.powermw*np.exp(-((self.spec[0] - self.wavelength)**2)/(2*(self.linewidth**2)))
-
-    # Create constant waveform
-    def create_wf(self):
-        self.wf = np.ones([2, 100])
-        self.wf[0] = np.linspace(0.0, 1.0, 100)
-        self.wf[1] = 1e-3*self.powermw*self.wf[1]
-
-    # I/O functions
-
-    # Output functions: all instrument outputs are processed here. These are passive (called from other instruments)
-    # Output optical signal: The instrument output (the laser spectrum) 
-    def output_opt_signal(self):
-        return np.copy(self.spec), np.copy(self.wf)
\ No newline at end of file
@@ -5,27 +5,23 @@
 
 # Imports
 import os, time
-import PyQt5
 import numpy as np
 from scipy.fft import fft
 from scipy.signal import windows
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from matplotlib.figure import Figure
 from matplotlib.ticker import (AutoLocator, AutoMinorLocator)
-from PyQt5 import uic, QtCore
-from PyQt5.QtCore import QTimer, QDir
-from PyQt5.QtWidgets import QFileDialog
+from tools.capture import capture_filename, save_capture, save_text
+from tools.ui import FrontPanel
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
 thisfile = os.path.basename(__file__)
 
-# Load ui file
-FormUI, WindowUI = uic.loadUiType(f"{main_path}/osa.ui")
 
 # Main instrument class
-class OSA(FormUI, WindowUI):
+class OSA(FrontPanel):
+    # Front panel form (Qt is only loaded with the first instance, see tools.ui)
+    ui_file = f"{main_path}/osa.ui"
 
     # Main parameters
     wlstart = 700.0
@@ -47,8 +43,11 @@ class OSA(FormUI, WindowUI):
     # Internal parameters
     busy = False
     ui_busy = False
+    volatile = ("busy", "ui_busy")  # Soft locks, see tools.graph
     running = False
     loop_timer = None
+    bench_graph = None
+    profiler = None  # tools.profiler.Profiler, timing each frame
     x_axis = np.linspace(wlstart, wlstop, npoints)
     y_axis = np.zeros([npoints])
     sg_x = []
@@ -85,6 +84,8 @@ class OSA(FormUI, WindowUI):
         self.setup_graph()
 
     def setupActions(self):
+        from PyQt5.QtCore import QTimer
+
         # Connect UI signals to functions
         self.startBut.clicked.connect(self.runAcquisition)
         self.stopBut.clicked.connect(self.stopAcquisition)
@@ -111,8 +112,12 @@ class OSA(FormUI, WindowUI):
         self.loop_timer.setInterval(10)
         
     def setup_graph(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from PyQt5 import QtCore
+
         # Main
-        self.figure = plt.figure()
+        self.figure = Figure()
         self.graph = FigureCanvas(self.figure)
         self.graphToolbar = NavigationToolbar(self.graph, self)
         self.graphToolbar.locLabel.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
@@ -145,7 +150,7 @@ class OSA(FormUI, WindowUI):
         self.graph.draw()
 
         # Spectrogram
-        self.sgfigure = plt.figure()
+        self.sgfigure = Figure()
         self.sggraph = FigureCanvas(self.sgfigure)
         self.sggraphToolbar = NavigationToolbar(self.sggraph, self)
         self.sggraphToolbar.locLabel.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
@@ -256,144 +261,156 @@ class OSA(FormUI, WindowUI):
             # Set soft lock
             self.busy = True
 
-            if self.tabWidget.currentIndex() == 0:
-                # Create arrays
-                self.x_axis = np.linspace(self.wlstart, self.wlstop, self.npoints)  
-                
-                # Get signal
-                if self.input_objs[0]:                    
-                    # Get data
-                    new_data = self.input_signal()
-
-                    # If peak detect is enabled, hold maxima
-                    if self.peakCheck.isChecked():
-                        mask = (new_data > self.peak_buffer)
-                        self.peak_buffer[mask] = new_data[mask]
-                        self.y_axis = self.peak_buffer
-                    # If not, perform averaging
-                    elif self.avgSpin.value() > 1:
-                        self.avg_buffer = np.concatenate(([new_data], self.avg_buffer[0:-1]))
-                        self.y_axis = self.avg_buffer[0:self.avg_counter + 1].mean(axis=0)
-                    else:
-                        self.y_axis = new_data
+            # Profiling hooks (tools.profiler): time this frame
+            if self.profiler is not None:
+                self.profiler.begin_frame(self)
 
-                    if self.dBm:
-                        self.y_axis = 10*np.log10(self.y_axis)
+            try:
+                # Explicit bench graph (tools.graph): evaluate this frame's upstream in one pass
+                if self.bench_graph is not None:
+                    self.bench_graph.run(self)
+
+                if self.tabWidget.currentIndex() == 0:
+                    # Create arrays
+                    self.x_axis = np.linspace(self.wlstart, self.wlstop, self.npoints)  
+                
+                    # Get signal
+                    if self.input_objs[0]:                    
+                        # Get data
+                        new_data = self.input_signal()
+
+                        # If peak detect is enabled, hold maxima
+                        if self.peakCheck.isChecked():
+                            mask = (new_data > self.peak_buffer)
+                            self.peak_buffer[mask] = new_data[mask]
+                            self.y_axis = self.peak_buffer
+                        # If not, perform averaging
+                        elif self.avgSpin.value() > 1:
+                            self.avg_buffer = np.concatenate(([new_data], self.avg_buffer[0:-1]))
+                            self.y_axis = self.avg_buffer[0:self.avg_counter + 1].mean(axis=0)
+                        else:
+                            self.y_axis = new_data
+
+                        if self.dBm:
+                            self.y_axis = 10*np.log10(self.y_axis)
                 
-                    # Update plot
-                    self.graph_line.set_ydata(self.y_axis)
-                    self.graph_line.set_xdata(self.x_axis)
-                    self.graph_line.set_visible(True)
+                        # Update plot
+                        self.graph_line.set_ydata(self.y_axis)
+                        self.graph_line.set_xdata(self.x_axis)
+                        self.graph_line.set_visible(True)
 
-                self.graph_ax.set_xlim([self.wlstart, self.wlstop])
-                self.graph_ax.xaxis.set_ticks(np.linspace(self.wlstart, self.wlstop, 11))
-                self.graph_ax.set_xlabel("Wavelength (nm)")
+                    self.graph_ax.set_xlim([self.wlstart, self.wlstop])
+                    self.graph_ax.xaxis.set_ticks(np.linspace(self.wlstart, self.wlstop, 11))
+                    self.graph_ax.set_xlabel("Wavelength (nm)")
 
-                if self.dBm:
-                    self.graph_ax.set_autoscaley_on(False)
-                    self.graph_ax.set_autoscalex_on(False)
-                    ymin = (self.reflevel - 10*self.dbdiv)
-                    ymax = self.reflevel
-                    self.graph_ax.set_ylim([ymin, ymax])
-                    self.graph_ax.yaxis.set_ticks(np.linspace(ymin, ymax, 11))
-                    self.graph_ax.set_ylabel("Power (dBm)")
-                else:
-                    self.graph_ax.set_autoscaley_on(True)
-                    self.graph_ax.set_autoscalex_on(False)
-                    self.graph_ax.relim()
-                    self.graph_ax.yaxis.set_major_locator(AutoLocator())
-                    self.graph_ax.autoscale_view()
-                    self.graph_ax.set_ylabel("Power (mW)")
-                
-                self.graph.draw()
-                self.graph.flush_events()
-
-                # Update counters
-                if self.avgSpin.value() > 1:
-                    self.avg_counter += 1
-                    if self.avg_counter >= self.avgSpin.value():
-                        self.avg_counter = self.avgSpin.value() - 1
-            else:                
-                # Get signal
-                if self.input_objs[0]:
-                    # Clear image
-                    self.sggraph_ax.clear()
-
-                    # Get data
-                    new_data = np.abs(self.input_signal())
                     if self.dBm:
-                        new_data = 10*np.log10(new_data)
-
-                    # Join data
-                    if self.sg_counter < self.sgn:
-                        self.sg_buffer[self.sg_counter] = new_data
-                        t = time.time() - self.sg_t0
-                        dt = t/(self.sg_counter + 1)
-                        self.sg_x[self.sg_counter] = t
-                        self.sg_x[-1] = dt*self.sgn
+                        self.graph_ax.set_autoscaley_on(False)
+                        self.graph_ax.set_autoscalex_on(False)
+                        ymin = (self.reflevel - 10*self.dbdiv)
+                        ymax = self.reflevel
+                        self.graph_ax.set_ylim([ymin, ymax])
+                        self.graph_ax.yaxis.set_ticks(np.linspace(ymin, ymax, 11))
+                        self.graph_ax.set_ylabel("Power (dBm)")
                     else:
-                        self.sg_buffer = np.roll(self.sg_buffer, -1, axis=0)
-                        self.sg_buffer[-1] = new_data
-                        self.sg_x = np.roll(self.sg_x, -1, axis=0)
-                        self.sg_x[-1] = time.time() - self.sg_t0
-
-                    # Update plot
-                    self.sggraph_ax.imshow(self.sg_buffer.T, aspect='auto', origin='lower',
-                                           extent=[self.sg_x[0], self.sg_x[-1], self.sg_y[0], self.sg_y[-1]])
-
-                self.sggraph_ax.set_xlabel("Time (s)")
-                self.sggraph_ax.set_ylabel("Wavelength (nm)")
+                        self.graph_ax.set_autoscaley_on(True)
+                        self.graph_ax.set_autoscalex_on(False)
+                        self.graph_ax.relim()
+                        self.graph_ax.yaxis.set_major_locator(AutoLocator())
+                        self.graph_ax.autoscale_view()
+                        self.graph_ax.set_ylabel("Power (mW)")
                 
-                self.sggraph.draw()
-                self.sggraph.flush_events()
-
-                # Update counters
-                self.sg_counter += 1
-                if self.sg_counter > self.sgn:
-                    self.sg_counter = self.sgn - 1
+                    self.graph.draw()
+                    self.graph.flush_events()
+
+                    # Update counters
+                    if self.avgSpin.value() > 1:
+                        self.avg_counter += 1
+                        if self.avg_counter >= self.avgSpin.value():
+                            self.avg_counter = self.avgSpin.value() - 1
+                else:                
+                    # Get signal
+                    if self.input_objs[0]:
+                        # Clear image
+                        self.sggraph_ax.clear()
+
+                        # Get data
+                        new_data = np.abs(self.input_signal())
+                        if self.dBm:
+                            new_data = 10*np.log10(new_data)
+
+                        # Join data
+                        if self.sg_counter < self.sgn:
+                            self.sg_buffer[self.sg_counter] = new_data
+                            t = time.time() - self.sg_t0
+                            dt = t/(self.sg_counter + 1)
+                            self.sg_x[self.sg_counter] = t
+                            self.sg_x[-1] = dt*self.sgn
+                        else:
+                            self.sg_buffer = np.roll(self.sg_buffer, -1, axis=0)
+                            self.sg_buffer[-1] = new_data
+                            self.sg_x = np.roll(self.sg_x, -1, axis=0)
+                            self.sg_x[-1] = time.time() - self.sg_t0
+
+                        # Update plot
+                        self.sggraph_ax.imshow(self.sg_buffer.T, aspect='auto', origin='lower',
+                                               extent=[self.sg_x[0], self.sg_x[-1], self.sg_y[0], self.sg_y[-1]])
+
+                    self.sggraph_ax.set_xlabel("Time (s)")
+                    self.sggraph_ax.set_ylabel("Wavelength (nm)")
+                
+                    self.sggraph.draw()
+                    self.sggraph.flush_events()
+
+                    # Update counters
+                    self.sg_counter += 1
+                    if self.sg_counter > self.sgn:
+                        self.sg_counter = self.sgn - 1
+            finally:
+                # Close the profiled frame, even when it failed (the overlay shows on the next draw)
+                if self.profiler is not None:
+                    self.profiler.end_frame(self)
 
             # Release soft lock
             self.busy = False
 
     # Save data
     def saveData(self):
+        from PyQt5.QtCore import QDir
+        from PyQt5.QtWidgets import QFileDialog
+
         was_running = False
         if self.running:
             self.stopAcquisition()
             was_running = True
         
-        file = QFileDialog.getSaveFileName(self, "Save file", QDir.homePath() , "Text files (*.txt)")
+        file = QFileDialog.getSaveFileName(self, "Save file", QDir.homePath() ,
+                                           "Text files (*.txt);;NumPy capture (*.npz)")
         filename = file[0]
         if filename != "":
-            if filename[-4:] != ".txt" and filename[-4:] != ".TXT":
-                filename = filename + ".txt"   
-
-            with open(filename, "w") as file:
-                if self.tabWidget.currentIndex() == 0:
-                    vertname = "Power (mW)"
-                    if self.dBm:
-                        vertname = "Power (dBm)"
-                    file.write(f"Wavelength (nm)\t{vertname}\n")
-                    for i in range(len(self.y_axis)):
-                        file.write(f"{self.x_axis[i]}\t")
-                        file.write(f"{self.y_axis[i]}")
-                        file.write("\n")
+            filename, binary = capture_filename(filename, file[1])
+            spectrogram = self.tabWidget.currentIndex() != 0
+
+            if binary:
+                metadata = {"instrument": "OSA", "spectrogram": spectrogram,
+                            "wlstart": self.wlstart, "wlstop": self.wlstop, "rbw": self.rbw, "npoints": self.npoints,
+                            "averages": self.avgSpin.value(), "peak_detect": self.peakCheck.isChecked(),
+                            "units": {"wavelength": "nm", "magnitude": "dBm" if self.dBm else "mW",
+                                      "time": "s"}}
+                if spectrogram:
+                    save_capture(filename, metadata, wavelength=self.sg_y, time=self.sg_x, spectrogram=self.sg_buffer)
                 else:
-                    vertname = "P (mW)"
-                    if self.dBm:
-                        vertname = "P (dBm)"
-                    file.write(f"WL (nm)\t")
-                    for j in range(0, len(self.sg_x)):
-                        file.write(f"{vertname} t={self.sg_x[j]:.02f}\t")
-                    file.write("\n")
-                    for i in range(len(self.sg_buffer[0])):
-                        file.write(f"{self.sg_y[i]}\t")
-                        for j in range(0, len(self.sg_buffer)):
-                            file.write(f"{self.sg_buffer[j][i]}")
-                            if j < len(self.sg_buffer) - 1:
-                                file.write("\t")
-                        file.write("\n")
-                file.close()
+                    save_capture(filename, metadata, wavelength=self.x_axis, magnitude=self.y_axis)
+            elif not spectrogram:
+                vertname = "Power (mW)"
+                if self.dBm:
+                    vertname = "Power (dBm)"
+                save_text(filename, ["Wavelength (nm)", vertname], [self.x_axis, self.y_axis])
+            else:
+                vertname = "P (mW)"
+                if self.dBm:
+                    vertname = "P (dBm)"
+                names = ["WL (nm)"] + [f"{vertname} t={self.sg_x[j]:.02f}" for j in range(0, len(self.sg_x))]
+                save_text(filename, names, [self.sg_y] + list(self.sg_buffer))
 
         if was_running:
             self.runAcquisition()
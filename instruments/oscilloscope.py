@@ -6,25 +6,25 @@
 
 # Imports
 import os, time
-import PyQt5
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+import matplotlib
+from matplotlib.figure import Figure
 from matplotlib.ticker import (MultipleLocator, AutoMinorLocator)
-from PyQt5 import uic, QtCore
-from PyQt5.QtCore import QTimer, QDir
-from PyQt5.QtWidgets import QFileDialog
+from tools.capture import capture_filename, save_capture, save_text, CaptureRecorder
+from tools.display import minmax_decimate, stride_decimate, DensityHistogram, density_rgba
+from tools.graph import independent_groups
+from tools.ui import FrontPanel
 
 # File paths
 main_path = os.path.dirname(os.path.realpath(__file__))
 thisfile = os.path.basename(__file__)
 
-# Load ui file
-FormUI, WindowUI = uic.loadUiType(f"{main_path}/oscilloscope.ui")
 
 # Main instrument class
-class Oscilloscope(FormUI, WindowUI):
+class Oscilloscope(FrontPanel):
+    # Front panel form (Qt is only loaded with the first instance, see tools.ui)
+    ui_file = f"{main_path}/oscilloscope.ui"
 
     # Main parameters
     npoints = 1000
@@ -37,14 +37,23 @@ class Oscilloscope(FormUI, WindowUI):
     averages = 1
     hold = False
     holdn = 2
+    decimate = True  # Min/max decimation of long records before plotting
+    persist_nx = 500  # Persistence image size (time x voltage bins)
+    persist_ny = 250
+    workers = 4  # Threads for independent channels (1: sequential)
     
     # Input objects
     input_objs = [None, None, None, None]  
 
     # Internal parameters
     busy = False
+    volatile = ("busy",)  # Soft lock, see tools.graph
     running = False
     loop_timer = None
+    bench_graph = None
+    profiler = None  # tools.profiler.Profiler, timing each frame
+    pool = None
+    channel_groups = None
     mastervscale = [-5.0, 5.0]
     sampletime = timediv*10
     x_axis = np.linspace(timeoffs, timeoffs + sampletime, npoints)
@@ -55,6 +64,10 @@ class Oscilloscope(FormUI, WindowUI):
     hold_counter = 0
     xymode = False
     xy_x = 1
+    min_display_bins = 200
+    persist_hists = [None, None, None, None]
+    persist_key = None
+    recorder = None
     
     
     # Default functions
@@ -71,6 +84,10 @@ class Oscilloscope(FormUI, WindowUI):
 
     def __del__(self):
         print("Deleting oscilloscope object")
+        if self.recorder:
+            self.recorder.close()
+        if self.pool:
+            self.pool.shutdown(wait=False)
 
 
     # UI functions
@@ -80,11 +97,15 @@ class Oscilloscope(FormUI, WindowUI):
         self.xyChecks = [self.ch1XCheck, self.ch2XCheck, self.ch3XCheck, self.ch4XCheck]
 
     def setupActions(self):
+        from PyQt5.QtCore import QTimer
+
         # Connect UI signals to functions
         self.startBut.clicked.connect(self.runAcquisition)
         self.stopBut.clicked.connect(self.stopAcquisition)
         self.saveBut.clicked.connect(self.saveData)
+        self.recordCheck.clicked.connect(self.setRecording)
         self.holdCheck.clicked.connect(self.setAcquisition)
+        self.persistCheck.clicked.connect(self.setAcquisition)
         self.ch1XCheck.clicked.connect(self.change_xy)
         self.ch2XCheck.clicked.connect(self.change_xy)
         self.ch3XCheck.clicked.connect(self.change_xy)
@@ -114,7 +135,11 @@ class Oscilloscope(FormUI, WindowUI):
         self.loop_timer.setInterval(10)
         
     def setup_graph(self):
-        self.figure = plt.figure()
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+        from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+        from PyQt5 import QtCore
+
+        self.figure = Figure()
         self.graph = FigureCanvas(self.figure)
         self.graphToolbar = NavigationToolbar(self.graph, self)
         self.graphToolbar.locLabel.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignVCenter)
@@ -128,6 +153,11 @@ class Oscilloscope(FormUI, WindowUI):
         (self.graph_lines[3],) = self.graph_ax.plot([],[], 'o', markersize=1)
         for line in self.graph_lines:
             line.set_visible(False)
+        self.graph_image = self.graph_ax.imshow(np.zeros([self.persist_ny, self.persist_nx, 4]), aspect='auto',
+                                                origin='lower', interpolation='nearest', zorder=2,
+                                                extent=[self.timeoffs, self.timediv*10 + self.timeoffs,
+                                                        self.mastervscale[0], self.mastervscale[1]])
+        self.graph_image.set_visible(False)
         self.graph_ax.set_xlim([self.timeoffs, self.timediv*10 + self.timeoffs])
         self.graph_ax.set_ylim([self.mastervscale[0], self.mastervscale[1]])
         self.graph_ax.xaxis.set_ticks(np.linspace(self.timeoffs, self.timediv*10 + self.timeoffs, 11))
@@ -179,6 +209,26 @@ class Oscilloscope(FormUI, WindowUI):
             self.running = False
             self.loop_timer.stop()
 
+    # Start/stop recording every acquisition to disk (memory-mapped, see tools/capture.py)
+    def setRecording(self):
+        from PyQt5.QtCore import QDir
+        from PyQt5.QtWidgets import QFileDialog
+
+        if self.recordCheck.isChecked():
+            file = QFileDialog.getSaveFileName(self, "Record to", QDir.homePath() , "Recordings (*.json)")
+            filename = file[0]
+            if filename == "":
+                self.recordCheck.setChecked(False)
+                return
+            if filename[-5:].lower() == ".json":
+                filename = filename[:-5]
+            metadata = {"instrument": "Oscilloscope", "channels": ["CH1", "CH2", "CH3", "CH4"],
+                        "units": {"time": "s", "channels": "V"}}
+            self.recorder = CaptureRecorder(filename, metadata)
+        elif self.recorder:
+            self.recorder.close()
+            self.recorder = None
+
     # Set acquisition stuff
     def setAcquisition(self):
         was_running = False
@@ -193,6 +243,7 @@ class Oscilloscope(FormUI, WindowUI):
         self.hold_buffer = np.zeros([4, self.holdSpin.value(), self.npoints])
         self.avg_counter = 0
         self.hold_counter = 0
+        self.persist_key = None
 
         # Get rid of empty average buffer
         for i in range(0, 4):
@@ -283,21 +334,78 @@ class Oscilloscope(FormUI, WindowUI):
         unitValue         = float(mantissa)*10**(int(exponent)%3)
         return f"{unitValue:.0f} {unit}" if unit else f"{number:.5e}"
     
+    # Number of min/max pairs to plot: about one per pixel of the graph
+    def display_bins(self):
+        return max(int(self.graph.width()), self.min_display_bins)
+
+    # Data to plot for a channel: each record (or held record) is reduced to its min/max envelope
+    def display_data(self, channel):
+        x = np.linspace(self.timeoffs, self.timeoffs + self.sampletime, self.npoints)
+        y = self.y_axis[channel].reshape(-1, self.npoints)
+        if self.decimate:
+            x, y = minmax_decimate(x, y, self.display_bins())
+        x = np.broadcast_to(x, y.shape)  # One time axis per (held) record, decimated or not
+        return x.ravel(), y.ravel()
+    
+    # Persistence display: every record is added to a fixed size 2D histogram per channel (in divisions)
+    # Histograms are cleared when the scales, points or XY mode change
+    def update_persistence(self):
+        ch = self.xy_x - 1
+        xymode = self.xymode and self.channelsChecks[ch].isChecked() and self.input_objs[ch]
+        key = (self.sampletime, self.timeoffs, self.npoints, bool(xymode), ch,
+               tuple(self.voltdivs), tuple(self.voffsets))
+        if key != self.persist_key:
+            self.persist_key = key
+            if xymode:
+                xlims = self.mastervscale
+            else:
+                xlims = [self.timeoffs, self.timeoffs + self.sampletime]
+            self.persist_hists = [DensityHistogram(xlims, self.mastervscale, self.persist_nx, self.persist_ny)
+                                  for i in range(0, 4)]
+
+        images = []
+        colors = []
+        for i in range(0, len(self.input_objs)):
+            if self.channelsChecks[i].isChecked() and self.input_objs[i] and not (xymode and i == ch):
+                y = (self.y_axis[i] + self.voffsets[i])/self.voltdivs[i]
+                if xymode:
+                    x = (self.y_axis[ch] + self.voffsets[ch])/self.voltdivs[ch]
+                else:
+                    x = np.linspace(self.timeoffs, self.timeoffs + self.sampletime, self.npoints)
+                self.persist_hists[i].add(x, y)
+                images.append(self.persist_hists[i].image())
+                colors.append(matplotlib.colors.to_rgb(self.graph_lines[i].get_color()))
+            self.graph_lines[i].set_visible(False)
+
+        if len(images) > 0:
+            self.graph_image.set_data(density_rgba(images, colors))
+            self.graph_image.set_extent(self.persist_hists[0].extent())
+            self.graph_image.set_visible(True)
+        else:
+            self.graph_image.set_visible(False)
+
     # Acquisition loop
     def measLoop(self):
         if not self.busy:
             # Set soft lock
             self.busy = True
+
+            # Profiling hooks (tools.profiler): time this frame
+            if self.profiler is not None:
+                self.profiler.begin_frame(self)
+
+            try:
+                # Create arrays
+                self.x_axis = np.linspace(self.timeoffs, self.timeoffs + self.sampletime, self.npoints)  
+                persist = self.persistCheck.isChecked()
+                hold = self.holdCheck.isChecked() and not persist
+                if hold:
+                    self.x_axis = np.tile(self.x_axis, self.hold_counter + 1)
+                    self.y_axis = np.zeros([4, self.npoints*(self.hold_counter + 1)])
             
-            # Create arrays
-            self.x_axis = np.linspace(self.timeoffs, self.timeoffs + self.sampletime, self.npoints)  
-            if self.holdCheck.isChecked():
-                self.x_axis = np.tile(self.x_axis, self.hold_counter + 1)
-                self.y_axis = np.zeros([4, self.npoints*(self.hold_counter + 1)])
-            
-            # Sweep channels
-            for i in range(0, len(self.input_objs)):
-                if self.channelsChecks[i].isChecked() and self.input_objs[i]:
+                # Active channels and their trigger phases (widgets are only read here, in the GUI thread)
+                active = [i for i in range(0, len(self.input_objs)) if self.channelsChecks[i].isChecked() and self.input_objs[i]]
+                for i in active:
                     # Adjust phase to simulate trigger (and time offset)
                     if self.triggerautoRadio.isChecked():
                         freq = self.input_objs[i].freq
@@ -305,96 +413,128 @@ class Oscilloscope(FormUI, WindowUI):
                         self.input_objs[i].t0 = argument
                     else:
                         self.input_objs[i].t0 = np.random.uniform(0.0, 2*np.pi)
-                        
-                    # Get data
-                    new_data = self.input_channels(i)
-
-                    # If hold is enabled, hold data
-                    if self.holdCheck.isChecked():
-                        self.hold_buffer[i] = np.concatenate(([new_data], self.hold_buffer[i][0:-1]))
-                        self.y_axis[i] = np.concatenate(self.hold_buffer[i][0:self.hold_counter + 1])
-                    # If not, perform averaging
-                    elif self.avgSpin.value() > 1:
-                        self.avg_buffer[i] = np.concatenate(([new_data], self.avg_buffer[i][0:-1]))
-                        self.y_axis[i] = self.avg_buffer[i][0:self.avg_counter + 1].mean(axis=0)
-                    else:
-                        self.y_axis[i] = new_data
-                
-                    # Update plot
-                    self.graph_lines[i].set_ydata((self.y_axis[i] + self.voffsets[i])/self.voltdivs[i])
-                    self.graph_lines[i].set_xdata(self.x_axis)
-                    self.graph_lines[i].set_visible(True)
-                else:
-                    self.graph_lines[i].set_visible(False)
-
-            self.graph_ax.set_xlim([self.timeoffs, self.timediv*10 + self.timeoffs])
-            self.graph_ax.set_ylim([self.mastervscale[0], self.mastervscale[1]])
-            self.graph_ax.xaxis.set_ticks(np.linspace(self.timeoffs, self.timediv*10 + self.timeoffs, 11))
-            self.graph_ax.yaxis.set_ticks(np.linspace(self.mastervscale[0], self.mastervscale[1], 11))
-            self.graph_ax.set_xlabel("Time (s)")
-            self.graph_ax.set_ylabel("Voltage (Div)")
-
-            # After getting all data, change plots to XY mode if enabled
-            ch = self.xy_x - 1
-            if self.xymode and self.channelsChecks[ch].isChecked() and self.input_objs[ch]:
+
+                # Explicit bench graph (tools.graph): evaluate this frame's upstream once triggers are set (independent
+                # branches on the pool), so the channels below read memoized results
+                if self.bench_graph is not None:
+                    self.bench_graph.run(self, self.executor())
+
+                # Get data (independent channels run concurrently)
+                records = self.fetch_channels(active)
+
+                # Sweep channels
+                new_records = []
+                channel_mask = 0
                 for i in range(0, len(self.input_objs)):
-                    if self.channelsChecks[i].isChecked() and self.input_objs[i] and i != ch:
-                        new_x = (self.y_axis[ch] + self.voffsets[ch])/self.voltdivs[ch]
-                        self.graph_lines[i].set_xdata(new_x)
+                    if i in records:
+                        new_data = records[i]
+                        new_records.append(new_data)
+                        channel_mask += 2**i
+
+                        # If hold is enabled, hold data
+                        if hold:
+                            self.hold_buffer[i] = np.concatenate(([new_data], self.hold_buffer[i][0:-1]))
+                            self.y_axis[i] = np.concatenate(self.hold_buffer[i][0:self.hold_counter + 1])
+                        # If not, perform averaging
+                        elif self.avgSpin.value() > 1:
+                            self.avg_buffer[i] = np.concatenate(([new_data], self.avg_buffer[i][0:-1]))
+                            self.y_axis[i] = self.avg_buffer[i][0:self.avg_counter + 1].mean(axis=0)
+                        else:
+                            self.y_axis[i] = new_data
+                
+                        # Update plot (with a decimated copy, y_axis keeps the full record)
+                        plot_x, plot_y = self.display_data(i)
+                        self.graph_lines[i].set_ydata((plot_y + self.voffsets[i])/self.voltdivs[i])
+                        self.graph_lines[i].set_xdata(plot_x)
                         self.graph_lines[i].set_visible(True)
-                        self.graph_ax.set_xlim([self.mastervscale[0], self.mastervscale[1]])
-                        self.graph_ax.xaxis.set_ticks(np.linspace(self.mastervscale[0], self.mastervscale[1], 11))
-                    elif self.channelsChecks[i].isChecked() and self.input_objs[i] and i == ch:
+                    else:
                         self.graph_lines[i].set_visible(False)
-                
-                self.graph_ax.set_xlabel(f"CH{ch + 1} Voltage (Div)")
+
+                self.graph_ax.set_xlim([self.timeoffs, self.timediv*10 + self.timeoffs])
+                self.graph_ax.set_ylim([self.mastervscale[0], self.mastervscale[1]])
+                self.graph_ax.xaxis.set_ticks(np.linspace(self.timeoffs, self.timediv*10 + self.timeoffs, 11))
+                self.graph_ax.yaxis.set_ticks(np.linspace(self.mastervscale[0], self.mastervscale[1], 11))
+                self.graph_ax.set_xlabel("Time (s)")
                 self.graph_ax.set_ylabel("Voltage (Div)")
+
+                # After getting all data, change plots to XY mode if enabled
+                ch = self.xy_x - 1
+                if self.xymode and self.channelsChecks[ch].isChecked() and self.input_objs[ch]:
+                    for i in range(0, len(self.input_objs)):
+                        if self.channelsChecks[i].isChecked() and self.input_objs[i] and i != ch:
+                            new_x = (self.y_axis[ch] + self.voffsets[ch])/self.voltdivs[ch]
+                            new_y = (self.y_axis[i] + self.voffsets[i])/self.voltdivs[i]
+                            if self.decimate:
+                                new_x = stride_decimate(new_x, self.display_bins()*2)
+                                new_y = stride_decimate(new_y, self.display_bins()*2)
+                            self.graph_lines[i].set_xdata(new_x)
+                            self.graph_lines[i].set_ydata(new_y)
+                            self.graph_lines[i].set_visible(True)
+                            self.graph_ax.set_xlim([self.mastervscale[0], self.mastervscale[1]])
+                            self.graph_ax.xaxis.set_ticks(np.linspace(self.mastervscale[0], self.mastervscale[1], 11))
+                        elif self.channelsChecks[i].isChecked() and self.input_objs[i] and i == ch:
+                            self.graph_lines[i].set_visible(False)
+                
+                    self.graph_ax.set_xlabel(f"CH{ch + 1} Voltage (Div)")
+                    self.graph_ax.set_ylabel("Voltage (Div)")
+
+                # Append the raw records to the recording
+                if self.recorder and len(new_records) > 0:
+                    self.recorder.append(np.array(new_records), self.sampletime, channel_mask=channel_mask)
+
+                # Persistence replaces the plot lines with the accumulated density image
+                if persist:
+                    self.update_persistence()
+                else:
+                    self.graph_image.set_visible(False)
             
-            self.graph.draw()
-            self.graph.flush_events()
-
-            # Update counters
-            if self.holdCheck.isChecked():
-                self.hold_counter += 1
-                if self.hold_counter >= self.holdSpin.value():
-                    self.hold_counter = self.holdSpin.value() - 1
-            elif self.avgSpin.value() > 1:
-                self.avg_counter += 1
-                if self.avg_counter >= self.avgSpin.value():
-                    self.avg_counter = self.avgSpin.value() - 1
-            
+                self.graph.draw()
+                self.graph.flush_events()
+
+                # Update counters
+                if hold:
+                    self.hold_counter += 1
+                    if self.hold_counter >= self.holdSpin.value():
+                        self.hold_counter = self.holdSpin.value() - 1
+                elif self.avgSpin.value() > 1:
+                    self.avg_counter += 1
+                    if self.avg_counter >= self.avgSpin.value():
+                        self.avg_counter = self.avgSpin.value() - 1
+            finally:
+                # Close the profiled frame, even when it failed (the overlay shows on the next draw)
+                if self.profiler is not None:
+                    self.profiler.end_frame(self)
+
             # Release soft lock
             self.busy = False
 
     # Save data
     def saveData(self):
+        from PyQt5.QtCore import QDir
+        from PyQt5.QtWidgets import QFileDialog
+
         was_running = False
         if self.running:
             self.stopAcquisition()
             was_running = True
         
-        file = QFileDialog.getSaveFileName(self, "Save file", QDir.homePath() , "Text files (*.txt)")
+        file = QFileDialog.getSaveFileName(self, "Save file", QDir.homePath() ,
+                                           "Text files (*.txt);;NumPy capture (*.npz)")
         filename = file[0]
         if filename != "":
-            if filename[-4:] != ".txt" and filename[-4:] != ".TXT":
-                filename = filename + ".txt"   
-
-            with open(filename, "w") as file:
-                file.write("Time(s)\t")
-                for j in range(0, len(self.input_objs)):
-                    if self.channelsChecks[j].isChecked():
-                        file.write(f"CH{j + 1}(V)\t")
-                file.write("\n")
-
-                for i in range(len(self.y_axis[0])):
-                    file.write(f"{self.x_axis[i]}\t")
-                    for j in range(0, len(self.input_objs)):
-                        if self.channelsChecks[j].isChecked():
-                            file.write(f"{self.y_axis[j][i]}")
-                            if j < len(self.input_objs) - 1:
-                                file.write("\t")
-                    file.write("\n")
-                file.close()
+            filename, binary = capture_filename(filename, file[1])
+            chs = [j for j in range(0, len(self.input_objs)) if self.channelsChecks[j].isChecked()]
+
+            if binary:
+                metadata = {"instrument": "Oscilloscope", "sampletime": self.sampletime, "npoints": self.npoints,
+                            "timediv": self.timediv, "timeoffs": self.timeoffs,
+                            "voltdivs": self.voltdivs.tolist(), "voffsets": self.voffsets.tolist(),
+                            "averages": self.avgSpin.value(), "hold": self.holdCheck.isChecked(),
+                            "channels": [f"CH{j + 1}" for j in chs], "units": {"time": "s", "channels": "V"}}
+                save_capture(filename, metadata, time=self.x_axis, channels=self.y_axis[chs])
+            else:
+                names = ["Time(s)"] + [f"CH{j + 1}(V)" for j in chs]
+                save_text(filename, names, [self.x_axis] + [self.y_axis[j] for j in chs])
 
         if was_running:
             self.runAcquisition()
@@ -404,8 +544,36 @@ class Oscilloscope(FormUI, WindowUI):
     # Set inputs: to connect the in functions to other instruments
     def set_inputs(self, ch1=None, ch2=None, ch3=None, ch4=None):    
         self.input_objs = [ch1, ch2, ch3, ch4]
+        self.channel_groups = None
+
+    # Thread pool for the channels and the bench graph's independent branches (None with a single worker)
+    def executor(self):
+        if self.pool is None and self.workers > 1:
+            self.pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self.pool
 
     # Input functions: all parameters and instrument inputs are processed here. These are active (calls the output from other instruments)
+    # Channels sharing no upstream object (the scope itself aside) are fetched on the thread pool, the others
+    # sequentially within their group; returns {channel: data}
+    # Upstream nodes must not read widgets while computing (front panels copy their settings to attributes in the
+    # GUI thread, see the generators' setParameters)
+    def fetch_channels(self, active):
+        if self.workers <= 1 or len(active) < 2:
+            return {i: self.input_objs[i].output_signal() for i in active}
+
+        if self.channel_groups is None:
+            self.channel_groups = independent_groups(self.input_objs, exclude=[self])
+        groups = [[i for i in group if i in active] for group in self.channel_groups]
+        groups = [group for group in groups if group]
+
+        def fetch(group):
+            return [(i, self.input_objs[i].output_signal()) for i in group]
+
+        records = {}
+        for result in self.executor().map(fetch, groups):
+            records.update(result)
+        return records
+
     # Total time of the output wave
     def input_channels(self, channel):
         if self.input_objs[channel] and self.channelsChecks[channel].isChecked():
@@ -0,0 +1,33 @@
+from instruments import otdr
+from components import link
+import numpy as np
+import sys, time
+from PyQt5.QtWidgets import QApplication
+
+
+# Construct application
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+
+    # Create instruments
+    otdr1 = otdr.OTDR()
+    
+    # Create components
+    # A link with a patch connector, a few spliced spans of random length, a mid-span connector and a cleaved end
+    link1 = link.Link()
+    link1.add_connector(loss=0.3, reflectance=-50.0)
+    link1.add_spans(np.random.uniform(2.0, 10.0, 6), loss=0.22, joint_loss=0.08)
+    link1.add_connector(loss=0.5, reflectance=-40.0)
+    link1.add_spans(np.random.uniform(2.0, 10.0, 4), loss=0.25, joint_loss=0.08)
+    link1.add_reflector(reflectance=-30.0)
+    print(f"Link length: {link1.length:.2f} km, total loss: {link1.budget():.2f} dB")
+    
+    # Connect parameters, instruments, and components
+    # The OTDR is connected to the link
+    otdr1.set_input_fiber(link1)
+
+    # Run application
+    app.exec_()
+
+    # Exit when done
+    sys.exit()
@@ -0,0 +1,25 @@
+from instruments import prbs_gen, eye_analyzer
+import sys, time
+from PyQt5.QtWidgets import QApplication
+
+
+# Construct application
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+
+    # Create instruments
+    eye = eye_analyzer.EyeAnalyzer()
+    bitg1 = prbs_gen.PRBSGenerator()
+    
+    # Connect parameters and instruments 
+    # The eye analyzer gets the prbs generator output
+    eye.set_inputs(bitg1)
+    
+    # The prbs generator gets the sample time and npoints when needed (always an integer number of symbols)
+    bitg1.set_inputs(sampletime_obj=eye, npoints_obj=eye)
+
+    # Run application
+    app.exec_()
+
+    # Exit when done
+    sys.exit()
@@ -0,0 +1,33 @@
+from instruments import laser, qam_gen, constellation_analyzer
+from components import eo_qamodulator
+import sys, time
+from PyQt5.QtWidgets import QApplication
+
+
+# Construct application
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+
+    # Create instruments
+    laser1 = laser.Laser()
+    qam1 = qam_gen.QAMGenerator()
+    const1 = constellation_analyzer.ConstellationAnalyzer()
+
+    # Create components
+    eo_qam = eo_qamodulator.EOQAM()
+
+    # Connect parameters, instruments, and components
+    # The modulator gets the laser and signal generator outputs
+    eo_qam.set_inputs(laser1, qam1.signal_i, qam1.signal_q)
+
+    # The analyzer gets the modulated optical waveform (use const1.set_inputs(qam1) for the electrical baseband)
+    const1.set_inputs(eo_qam)
+    
+    # The qam generator gets the sample time and npoints when needed
+    qam1.set_inputs(sampletime_obj=const1, npoints_obj=const1)
+
+    # Run application
+    app.exec_()
+
+    # Exit when done
+    sys.exit()
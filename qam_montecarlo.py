@@ -0,0 +1,83 @@
+from components import laser_source, qam_source, eo_qamodulator, fiber, photodetector
+from tools.evm import sample_symbols, fit_levels, evm_analysis
+from tools.montecarlo import run_montecarlo, Reduction
+from tools.graph import BenchGraph
+from functools import partial
+import numpy as np
+import sys, time
+
+
+# Bench parameters
+nlevels = 4  # Levels per axis (16-QAM)
+symbol_rate = 1e9  # Hz
+nsymbols = 1024
+sps = 16  # Samples per symbol
+length = 10.0  # km
+
+
+# Bench definition: the optical_qam_oscilloscope.py chain, without front panels
+# shared holds the laser spectrum, computed once and mapped by every worker
+def build(shared=None):
+    laser1 = laser_source.LaserSource(spec=None if shared is None else shared["laser_spec"])
+    qam1 = qam_source.QAMSource(nlevels=nlevels)
+    qam1.freq = symbol_rate
+    qam1.sampletime = nsymbols/symbol_rate
+    qam1.npoints = nsymbols*sps
+    qam1.amplitude = 0.5  # V
+
+    eo_qam = eo_qamodulator.EOQAM()
+    eo_qam.v_offs = eo_qam.v_pi/4  # Quadrature, so the detected levels stay evenly spaced
+    fiber1 = fiber.Fiber(length=length)
+    fiber2 = fiber.Fiber(length=length)
+    pd1 = photodetector.Photodetector(material=photodetector.GE)
+    pd2 = photodetector.Photodetector(material=photodetector.GE)
+
+    eo_qam.set_inputs(laser1, qam1.signal_i, qam1.signal_q)
+    fiber1.set_inputs(eo_qam.signal_i)
+    fiber2.set_inputs(eo_qam.signal_q)
+    pd1.set_inputs(fiber1)
+    pd2.set_inputs(fiber2)
+    qam1.set_inputs(sampletime_obj=None, npoints_obj=None)
+
+    # Bench graph, so both detectors see the same modulator frame (one evaluation per node and realization)
+    graph = BenchGraph([pd1, pd2]).install()
+
+    return {"laser": laser1, "qam": qam1, "eo_qam": eo_qam, "fiber1": fiber1, "fiber2": fiber2, "pd1": pd1, "pd2": pd2,
+            "graph": graph}
+
+
+# One realization: new symbols, jitter and noise, reduced to EVM/SNR/BER
+def measure(bench, rng):
+    bench["qam"].t0 = 0.0
+    bench["graph"].run()  # Also starts a new QAM frame
+    ch1 = bench["pd1"].output_signal()
+    ch2 = bench["pd2"].output_signal()
+
+    symbols = sample_symbols(ch1 + 1j*ch2, sps)
+    refs_i = fit_levels(symbols.real, nlevels)
+    refs_q = fit_levels(symbols.imag, nlevels)
+    result = evm_analysis(symbols.real, symbols.imag, refs_i, refs_q, nlevels, nlevels**2, centered=True)  # DC offset
+    result["evm"] = 100*result["evm"]
+    result["snr"] = 10*np.log10(result["snr"])
+    return result
+
+
+# Run
+if __name__ == "__main__":
+    nrealizations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    t0 = time.time()
+    reduction = partial(Reduction, histograms={"evm": (100, (0.0, 100.0))})
+    shared = {"laser_spec": laser_source.LaserSource().spec}
+    results = run_montecarlo(build, measure, nrealizations, reduction=reduction, seed=1234, shared=shared)
+    print(f"{results.nrealizations} realizations in {time.time() - t0:.1f} s")
+
+    for key in ["evm", "snr", "ber"]:
+        stats = results.stats[key]
+        print(f"{key.upper()}: mean {stats.mean():.4g}, std {stats.std():.4g}, min {stats.min:.4g}, max {stats.max:.4g}")
+
+    hist = results.histograms["evm"]
+    print("EVM (%) histogram:")
+    for center, count in zip(hist.centers(), hist.counts):
+        if count > 0:
+            print(f"{center:8.2f} {count:8d}")
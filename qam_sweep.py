@@ -0,0 +1,24 @@
+from tools.sweep import Sweep
+import qam_montecarlo
+import os, sys, time
+
+
+# Sweep parameters
+nrealizations = 20
+grid = {("fiber1.length", "fiber2.length"): [5.0, 10.0, 20.0, 40.0],  # Both arms of the link
+        "eo_qam.v_offs": [1.0, 1.425, 2.0]}
+
+# Results are cached here (not tracked by git), so running again (or with more points) only computes the new ones
+cache_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), "sweep_cache")
+
+
+# Run
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        nrealizations = int(sys.argv[1])
+
+    t0 = time.time()
+    sweep = Sweep(qam_montecarlo.build, qam_montecarlo.measure, nrealizations, seed=1234, cache_dir=cache_dir)
+    results = sweep.run(grid)
+    print(f"{len(results.points)} points ({sweep.computed} computed) in {time.time() - t0:.1f} s")
+    print(results.table(["evm", "snr", "ber"]))
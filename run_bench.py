@@ -0,0 +1,33 @@
+from tools.benchconfig import load_config, build_bench, run_gui, run_headless
+import numpy as np
+import argparse
+
+
+# Run a bench description (benches/*.json, *.yaml) with its front panels, or headless for a number of frames
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a bench configuration file")
+    parser.add_argument("config", help="bench file (.json, .yaml)")
+    parser.add_argument("--headless", action="store_true", help="no front panels, just evaluate the bench")
+    parser.add_argument("--frames", type=int, default=10, help="frames to run headless")
+    parser.add_argument("--output", help="save the probed outputs (headless) to this .npz file")
+    parser.add_argument("--profile", action="store_true", help="time every node (overlay on the instrument graphs)")
+    parser.add_argument("--memory", action="store_true", help="also count allocations when profiling (slower)")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if not args.headless:
+        bench = run_gui(config, args.profile, args.memory)
+    else:
+        try:
+            bench = build_bench(config)  # The bench run_headless uses (benches are kept per topology)
+        except ValueError as error:
+            parser.error(str(error))
+        results, frame_time = run_headless(config, args.frames, args.profile, args.memory)
+        print(f"{args.frames} frames, {frame_time*1e3:.1f} ms per frame")
+        for label, values in results.items():
+            print(f"{label}: {np.shape(values) if isinstance(values, np.ndarray) else f'{len(values)} records'}")
+        if args.output:
+            np.savez(args.output, **{label: np.asarray(values) for label, values in results.items()})
+
+    if bench.profiler is not None:
+        print(bench.profiler.report())
@@ -0,0 +1,23 @@
+from tools.benchmark import default_suite, default_sizes, save_results, load_results, compare
+import argparse, sys
+
+
+# Time the signal chain (micro cases per stage, macro cases per bench), optionally saving or comparing results
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the signal chain benchmarks")
+    parser.add_argument("pattern", nargs="?", default="*", help="cases to run (e.g. 'eo_*', 'bench.*')")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(default_sizes), help="record sizes (samples)")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per case (the best one is kept)")
+    parser.add_argument("--save", help="save the results to this .json file")
+    parser.add_argument("--compare", help="compare with the results in this .json file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = default_suite().run(args.sizes, args.pattern, args.repeat)
+    if args.save:
+        save_results(args.save, results)
+    if args.compare:
+        table, regressions = compare(load_results(args.compare), results, args.threshold)
+        print(table)
+        print(f"{regressions} regression(s)")
+        sys.exit(1 if regressions else 0)
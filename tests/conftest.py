@@ -0,0 +1,4 @@
+# Run the tests from the repository root (components, tools and instruments are top-level packages)
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
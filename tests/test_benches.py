@@ -0,0 +1,48 @@
+# Every bench file loads headless and runs (or, for GUI-only benches, fails early with a clear message)
+import glob, os
+import numpy as np
+import pytest
+from tools.benchconfig import load_config, build_bench, Bench, registry
+
+main_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+bench_files = sorted(glob.glob(os.path.join(main_path, "benches", "*")))
+
+
+@pytest.mark.parametrize("filename", bench_files, ids=os.path.basename)
+def test_bench_headless(filename):
+    if filename.endswith((".yaml", ".yml")):
+        pytest.importorskip("yaml")
+    config = load_config(filename)
+    if config.get("gui_only"):
+        with pytest.raises(ValueError, match="GUI only"):
+            build_bench(config)
+        return
+    results = build_bench(config).run()
+    assert results
+    for values in results.values():
+        for array in (values if isinstance(values, tuple) else [values]):  # Optical probes are (spec, wf)
+            assert np.all(np.isfinite(array))
+
+
+# A source with no headless model is reported before anything is built
+def test_missing_source_model(monkeypatch):
+    monkeypatch.setitem(registry, "signal_gen", (registry["signal_gen"][0], None))
+    config = {"components": {"sg1": {"type": "signal_gen"}, "fiber1": {"type": "fiber"}},
+              "connections": {}}
+    with pytest.raises(ValueError, match="sg1 .signal_gen. has no headless model"):
+        Bench(config)
+
+
+# A cached bench run with fewer params puts the left-out ones back to their defaults
+def test_params_reset():
+    config = load_config(os.path.join(main_path, "benches", "optical_qam_oscilloscope.json"))
+    config["components"]["fiber1"]["params"] = {"att": 0.5}
+    config["components"]["osc"]["params"] = {"sampletime": 4e-6, "npoints": 2000}
+    bench = build_bench(config)
+    assert bench.components["fiber1"].att == 0.5
+    assert bench.run()["osc.1"].shape == (2000,)
+    del config["components"]["fiber1"]["params"], config["components"]["osc"]["params"]
+    assert build_bench(config) is bench
+    assert bench.components["fiber1"].att == type(bench.components["fiber1"]).att
+    assert not bench.settings["osc"]
+    assert bench.run()["osc.1"].shape == (bench.components["qam1"].npoints,)
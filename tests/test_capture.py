@@ -0,0 +1,17 @@
+# Long recordings on disk
+import numpy as np
+from tools.capture import CaptureRecorder, CaptureReader
+
+
+# Files grow past their initial size, and the header follows the frames without close()
+def test_recorder_grows_and_flushes(tmp_path):
+    basename = str(tmp_path / "rec")
+    recorder = CaptureRecorder(basename, frames=2, samples=8, flush_frames=3)
+    frames = [np.full((2, 5), i, dtype=np.float32) for i in range(6)]
+    for frame in frames:
+        recorder.append(frame, 1e-6)
+    assert len(CaptureReader(basename)) == 6
+    recorder.close()
+    reader = CaptureReader(basename)
+    for i, frame in enumerate(frames):
+        assert np.array_equal(reader.frame(i)[0], frame)
@@ -0,0 +1,35 @@
+# Display decimation
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from tools.display import minmax_decimate
+
+
+# Hold mode: several records sharing one time axis, with fewer points than 2*nbins (nothing to decimate)
+def test_minmax_decimate_short_hold_records():
+    x = np.linspace(0.0, 1.0, 1000)
+    y = np.random.default_rng(0).normal(size=(2, 1000))
+    dx, dy = minmax_decimate(x, y, 500)
+    assert dx.shape == dy.shape == (2, 1000)
+    assert np.array_equal(dx[1], x)
+
+
+def test_minmax_decimate_long_hold_records():
+    x = np.linspace(0.0, 1.0, 10000)
+    y = np.random.default_rng(0).normal(size=(3, 10000))
+    dx, dy = minmax_decimate(x, y, 500)
+    assert dx.shape == dy.shape == (3, 1000)
+    assert np.all(dy.max(axis=-1) == y.max(axis=-1))
+
+
+# The oscilloscope's plot data, in hold mode with default settings (1000 points, >= 500 display bins)
+def test_oscilloscope_display_data_hold():
+    pytest.importorskip("PyQt5")
+    pytest.importorskip("matplotlib")
+    from instruments.oscilloscope import Oscilloscope
+
+    for decimate in (True, False):
+        scope = SimpleNamespace(timeoffs=0.0, sampletime=1e-6, npoints=1000, decimate=decimate,
+                                y_axis=[np.zeros(2000)], display_bins=lambda: 500)
+        x, y = Oscilloscope.display_data(scope, 0)
+        assert x.shape == y.shape == (2000,)
@@ -0,0 +1,28 @@
+# EVM reference cache
+import numpy as np
+from tools.evm import ReferenceCache, fit_constellation, error_vectors
+
+
+# References are kept per link configuration (new captures of the same link reuse them), until invalidated
+def test_reference_cache(tmp_path):
+    cache_file = str(tmp_path / "evm_refs.json")
+    config = {"L": 2, "M": 4, "amp_gen": 10e-3}
+    coords = np.array([-1.0, -1.0, 1.0, 1.0])
+    fit_constellation(coords, coords, 2, config=config, cache=ReferenceCache(cache_file))
+    refs_i, refs_q = fit_constellation(2*coords, 2*coords, 2, config=config, cache=ReferenceCache(cache_file))
+    assert np.allclose(refs_i, [-1.0, 1.0])
+    assert ReferenceCache(cache_file).get(dict(config, amp_gen=20e-3)) is None
+
+    cache = ReferenceCache(cache_file)
+    cache.invalidate(config)
+    assert ReferenceCache(cache_file).get(config) is None
+
+
+# Ideal vectors are origin-referenced by default (as the original evm_ber), centered on request
+def test_error_vectors_reference():
+    refs = np.array([1.0, 3.0])
+    coords = np.array([1.0, 3.0])
+    ideal = error_vectors(coords, coords, refs, refs)[1]
+    assert np.allclose(ideal, np.hypot(coords, coords))
+    centered = error_vectors(coords, coords, refs, refs, centered=True)[1]
+    assert np.allclose(centered, np.hypot(1.0, 1.0))
@@ -0,0 +1,14 @@
+# Headless fiber
+import numpy as np
+from components.fiber import Fiber
+from tests.test_photodetector import Frame
+
+
+# Plain attenuation by default (dispersion and Kerr propagation are opt-in)
+def test_default_attenuation_only():
+    frame = Frame()
+    fiber = Fiber(length=10.0, loss=0.2)
+    assert not fiber.dispersion and not fiber.nonlinear
+    fiber.set_inputs(frame)
+    spec, wf = fiber.output_opt_signal()
+    assert np.allclose(wf[1], 10**(-0.2*10.0/10.0)*frame.wf[1])
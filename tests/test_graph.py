@@ -0,0 +1,65 @@
+# Bench graph memoization
+import numpy as np
+from tools.benchconfig import build_bench
+from tools.graph import writable, node_params
+from tools.sweep import component_params
+from components.qam_source import QAMSource
+
+
+# Every node runs once per frame (upstream nodes shared by both branches hit the memo), and sources still make a new
+# frame every time
+def test_one_evaluation_per_frame():
+    bench = build_bench("benches/optical_qam_oscilloscope.json")
+    bench.run()  # The first frame finds the pulls
+    bench.graph.reset_stats()
+    frames = [bench.run() for i in range(4)]
+    for obj in (bench.components["eo_qam"], bench.components["qam1"], bench.components["fiber1"]):
+        stats = bench.graph.stats[id(obj)]
+        assert stats.calls == 4
+        assert stats.hits >= 4
+    first, second = (list(frame.values())[0] for frame in frames[:2])
+    assert not np.array_equal(first, second)
+
+
+# Memoized results are shared read-only, and only the nodes that edit them copy
+def test_results_read_only():
+    bench = build_bench("benches/optical_qam_oscilloscope.json")
+    bench.run()
+    spec, wf = bench.components["eo_qam"].signal_i.output_opt_signal()
+    assert not spec.flags.writeable and not wf.flags.writeable
+    assert writable(wf) is not wf
+    fiber_wf = bench.components["fiber1"].output_opt_signal()[1]
+    assert not np.shares_memory(fiber_wf, wf)
+
+
+# Frame counters (the class's volatile attributes) never key results; sweeps also leave out the clock references
+def test_volatile_attributes():
+    source = QAMSource()
+    source.outp_count = 3
+    assert "outp_count" not in dict(node_params(source))
+    assert "t0" in dict(node_params(source))
+    params = component_params(source)
+    assert not {"outp_count", "t0", "tref"} & set(params)
+
+
+# Branches with no node in common are evaluated on the pool, still once per frame each
+def test_independent_branches_on_pool():
+    from concurrent.futures import ThreadPoolExecutor
+    config = {"components": {"laser1": {"type": "laser"}, "laser2": {"type": "laser"},
+                             "qam1": {"type": "qam_gen", "args": {"seed": 1}},
+                             "qam2": {"type": "qam_gen", "args": {"seed": 2}},
+                             "eoq1": {"type": "eo_qam"}, "eoq2": {"type": "eo_qam"}},
+              "connections": {"eoq1": ["laser1", "qam1.signal_i", "qam1.signal_q"],
+                              "eoq2": ["laser2", "qam2.signal_i", "qam2.signal_q"]},
+              "probes": {"i1": "eoq1.signal_i.output_opt_signal", "i2": "eoq2.signal_i.output_opt_signal"}}
+    bench = build_bench(config)
+    sequential = bench.run()
+    assert len(bench.graph.pull_groups(None, bench.graph.pulls)) == 2
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        bench.pool = pool
+        bench.graph.reset_stats()
+        frames = [bench.run() for i in range(3)]
+    bench.pool = None
+    for name in ("qam1", "qam2", "eoq1", "eoq2"):
+        assert bench.graph.stats[id(bench.components[name])].calls == 3
+    assert np.shape(frames[-1]["i1"][1]) == np.shape(sequential["i1"][1])
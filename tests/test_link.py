@@ -0,0 +1,33 @@
+# Multi-span links and their OTDR traces
+import numpy as np
+from components.link import Link
+from tools.otdr import OTDREngine
+
+
+def test_add_spans_empty():
+    link = Link().add_fiber(2.0)
+    link.add_spans([])
+    assert link.length == 2.0
+
+
+# The index is only rebuilt when queried after a change
+def test_lazy_index():
+    link = Link()
+    calls = []
+    build = link.build_index
+    link.build_index = lambda: calls.append(1) or build()
+    for i in range(10):
+        link.add_fiber(1.0, loss=0.2).add_splice(0.1)
+    assert calls == []
+    assert np.isclose(link.budget(), 10*0.2 + 10*0.1)
+    assert np.isclose(link.loss_at(np.array([1.0]))[0], 0.2 + 0.1)
+    assert calls == [1]
+
+
+# A link's end reflector replaces the engine's cleaved end (the far end reflects once)
+def test_end_reflection_once():
+    link = Link().add_fiber(1.0, loss=0.0).add_reflector(reflectance=-30.0)
+    engine = OTDREngine(front_reflectance=-200.0, scatter_fraction=0.0, end_reflectance=-14.7)
+    z = np.linspace(0.0, 2.0, 2001)
+    trace = engine.backscatter(z, 0.0, 1.0, link.length, link.att_at(z), link.events, link.loss_at(z))
+    assert np.isclose(trace.max(), 1e-3*10**(-30.0/10.0))
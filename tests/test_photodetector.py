@@ -0,0 +1,59 @@
+# Headless photodetector
+import numpy as np
+from components.photodetector import Photodetector, INGAAS
+
+
+# A fixed optical frame: a single line on a wide grid, and a modulated power waveform
+class Frame():
+    freq = 1e9
+
+    def __init__(self, npoints=100000, nsamples=1000):
+        self.spec = np.zeros([2, npoints])
+        self.spec[0] = np.linspace(700.0, 1700.0, npoints)
+        self.spec[1][np.argmin(np.abs(self.spec[0] - 1550.0))] = 1e-3
+        self.wf = np.zeros([2, nsamples])
+        self.wf[0] = np.linspace(0.0, 1e-7, nsamples)
+        self.wf[1] = 1e-3*(1 + 0.5*np.sin(2*np.pi*1e8*self.wf[0]))
+
+    def output_opt_signal(self):
+        return np.copy(self.spec), np.copy(self.wf)
+
+
+def make_detector():
+    pd = Photodetector(material=INGAAS)
+    pd.set_inputs(Frame())
+    return pd
+
+
+# Noise is opt-in: by default the detector is deterministic
+def test_noiseless_by_default():
+    pd = make_detector()
+    assert not pd.noise
+    assert np.array_equal(pd.output_signal(), pd.output_signal())
+    pd.noise = True
+    assert not np.array_equal(pd.output_signal(), pd.output_signal())
+
+
+# Sparse spectra use the responsivity at their lines only, on every frame (the full curve is never built)
+def test_sparse_responsivity_cached():
+    pd = make_detector()
+    built = []
+    create = pd.create_resp_function
+    pd.create_resp_function = lambda wl_array: built.append(len(wl_array)) or create(wl_array)
+    first = pd.output_signal()
+    second = pd.output_signal()
+    assert built == [1]
+    assert np.array_equal(first, second)
+    spec = pd.input_opt_signal()[0]
+    expected = np.dot(spec[1], create(spec[0]))/np.sum(spec[1])
+    assert np.isclose(pd.effective_responsivity(spec), expected)
+
+
+# The output peaks at the power detected over the spectrum (times the gain), unless absolute is set
+def test_output_scale():
+    pd = make_detector()
+    spec, wf = pd.input_opt_signal()
+    detected = np.sum(spec[1]*pd.create_resp_function(spec[0]))*(spec[0][1] - spec[0][0])
+    assert np.isclose(pd.output_signal().max(), pd.amp*detected, rtol=1e-3)
+    pd.absolute = True
+    assert np.isclose(pd.output_signal().max(), pd.amp*pd.effective_responsivity(spec)*wf[1].max(), rtol=1e-3)
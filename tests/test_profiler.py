@@ -0,0 +1,48 @@
+# Per-node profiler
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tools.benchconfig import build_bench
+from tools.profiler import Profiler
+
+
+class Source():
+    def output_signal(self):
+        time.sleep(0.02)
+        return 1.0
+
+
+class Sink():
+    profiler = None
+
+    def __init__(self, source):
+        self.input_source_obj = source
+        self.pool = ThreadPoolExecutor(max_workers=1)
+
+
+# Pulls made on worker threads count as upstream time of the sink's frame, not as its own
+def test_worker_calls_not_in_own_time():
+    sink = Sink(Source())
+    profiler = Profiler({"sink": sink, "source": sink.input_source_obj}).install()
+    profiler.begin_frame(sink)
+    sink.pool.submit(sink.input_source_obj.output_signal).result()
+    profiler.end_frame(sink)
+    stats = profiler.stats(1)
+    assert stats["sink.measLoop"].time >= 0.02
+    assert stats["sink.measLoop"].own < 0.01
+    assert stats["source.output_signal"].own >= 0.02
+
+
+# A failing frame is still closed
+def test_failed_frame_closed(monkeypatch):
+    bench = build_bench("benches/optical_qam_oscilloscope.json")
+    profiler = bench.profile()
+    try:
+        monkeypatch.setattr(bench.graph, "run", lambda *args, **kwargs: 1/0)
+        with pytest.raises(ZeroDivisionError):
+            bench.run()
+        assert profiler.frame is None
+        assert len(profiler.frames) == 1
+    finally:
+        profiler.uninstall()
+        bench.profiler = None
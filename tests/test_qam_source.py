@@ -0,0 +1,21 @@
+# Headless QAM source
+import numpy as np
+from components.qam_source import QAMSource
+
+
+def make_source():
+    qam = QAMSource(nlevels=4, seed=0)
+    qam.set_inputs(sampletime_obj=None, npoints_obj=None)
+    qam.freq = 1e9
+    qam.npoints = 1600
+    qam.sampletime = 1e-7
+    return qam
+
+
+# I and Q share a frame (one new frame every other call), new_frame forces the next call to generate one
+def test_new_frame():
+    qam = make_source()
+    first = qam.output_signal().copy()
+    assert np.array_equal(qam.output_signal(), first)
+    qam.new_frame()
+    assert not np.array_equal(qam.output_signal(), first)
@@ -0,0 +1,23 @@
+# Parameter sweeps
+from types import SimpleNamespace
+from tools.sweep import Sweep
+
+
+def build():
+    return {"a": SimpleNamespace(length=1.0), "b": SimpleNamespace(length=1.0)}
+
+
+def measure(bench, rng):
+    return {"a": bench["a"].length, "b": bench["b"].length}
+
+
+# Linked parameters move together on one axis, and their points are cached
+def test_linked_axis(tmp_path):
+    grid = {("a.length", "b.length"): [2.0, 3.0]}
+    sweep = Sweep(build, measure, nrealizations=2, seed=0, cache_dir=str(tmp_path), workers=1)
+    results = sweep.run(grid)
+    assert list(results.values("a")) == [2.0, 3.0]
+    assert list(results.values("b")) == [2.0, 3.0]
+    assert results.table(["a"]).splitlines()[0].startswith("a.length+b.length")
+    sweep.run(grid)
+    assert sweep.computed == 0
@@ -0,0 +1,27 @@
+# Transfer-function cascades
+import numpy as np
+import pytest
+from components.fiber import Fiber
+from components.filter import Filter
+from components.link import Link
+from components.photodetector import Photodetector
+from tools.transfer import TransferCascade
+
+
+# Field and waveform responses cannot share a cascade
+def test_mixed_domains():
+    cascade = TransferCascade([Fiber(), Link().add_fiber(1.0)])
+    assert cascade.domain == "optical"
+    with pytest.raises(ValueError):
+        cascade.add(Filter())
+    cascade = TransferCascade([Filter(), Photodetector()])
+    assert cascade.domain == "electrical"
+    with pytest.raises(ValueError):
+        cascade.add(Fiber())
+
+
+def test_response_cached():
+    cascade = TransferCascade([Filter(), Photodetector()])
+    h = cascade.response(1024, 1e-9)
+    assert cascade.response(1024, 1e-9) is h
+    assert np.isclose(abs(h[0]), 1.0, rtol=1e-2)
@@ -0,0 +1,63 @@
+# Precompiled Qt Designer forms
+import os, sys, subprocess, importlib.util
+import pytest
+from tools import ui
+
+main_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+
+# Generated modules go to a folder git ignores, so launching an instrument never dirties the tree
+def test_cache_ignored_by_git():
+    filename = os.path.join(os.path.relpath(ui.uic_path, main_path), "oscilloscope.py")
+    try:
+        result = subprocess.run(["git", "check-ignore", "-q", filename], cwd=main_path)
+    except FileNotFoundError:
+        pytest.skip("git not found")
+    if result.returncode == 128:
+        pytest.skip("not a git checkout")
+    assert result.returncode == 0
+
+
+# A form is generated once, then loaded from the cache
+def test_load_ui_type(tmp_path, monkeypatch):
+    pytest.importorskip("PyQt5.uic")
+    monkeypatch.setattr(ui, "uic_path", str(tmp_path))
+    form, base = ui.load_ui_type(os.path.join(main_path, "instruments", "laser.ui"))
+    assert os.listdir(tmp_path) and base.__name__ in ("QMainWindow", "QWidget", "QDialog")
+    sha1, recorded_base = ui.read_header(os.path.join(tmp_path, "laser.py"))
+    assert sha1 is not None and recorded_base == base.__name__
+
+
+# Importing an instrument module never imports Qt (the front panels load it when created)
+def test_instruments_import_without_qt():
+    modules = ["laser", "qam_gen", "signal_gen", "prbs_gen"]
+    if importlib.util.find_spec("matplotlib") is not None:  # The plotting instruments import matplotlib (not its Qt backend)
+        modules += ["oscilloscope", "osa", "esa", "eye_analyzer", "constellation_analyzer", "otdr"]
+    code = "import sys\n" + "".join(f"import instruments.{name}\n" for name in modules) + \
+        "assert not [name for name in sys.modules if name.startswith('PyQt5')]"
+    subprocess.run([sys.executable, "-c", code], cwd=main_path, check=True, capture_output=True)
+
+
+# The Qt class (instrument, form, window base) is built with the first instance, once per instrument class
+def test_front_panel(monkeypatch):
+    class Form():
+        def setupUi(self, window):
+            window.ready = True
+
+    class Window():
+        def __init__(self):
+            self.window = True
+
+    class Panel(ui.FrontPanel):
+        ui_file = "panel.ui"
+
+        def __init__(self):
+            super(Panel, self).__init__()
+            self.setupUi(self)
+
+    loads = []
+    monkeypatch.setattr(ui, "load_ui_type", lambda ui_file: loads.append(ui_file) or (Form, Window))
+    first, second = Panel(), Panel()
+    assert loads == ["panel.ui"]
+    assert type(first) is type(second) and isinstance(first, (Panel, Window))
+    assert first.window and first.ready
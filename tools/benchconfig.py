@@ -0,0 +1,319 @@
+# Declarative bench configurations
+# A bench is described in a JSON (or YAML, when PyYAML is installed) file instead of a launcher script:
+#   "components": {name: {"type": registry type, "args": {constructor kwargs}, "params": {attribute: value}}}
+#   (params a later run leaves out go back to their defaults; instrument params set the front panel's attributes, and
+#   headless, where the instrument is left out, they stand in for it: e.g. an oscilloscope's sampletime and npoints are
+#   served to the sources that pull them)
+#   "calls": [{"call": "name.method", "args": [...], "kwargs": {...}}]  (e.g. building a link), after params
+# Values are plain data, or {"const": "module:NAME"} for module constants (e.g. photodetector materials)
+#   "connections": {"name": [refs] or {kwarg: ref}}, calling name.set_inputs; "name.method" keys call that method
+#   "probes": {label: "name.output_method"}  (optional, what a headless run records)
+#   "gui_only": true  (optional, for benches driven by a front panel with no headless model)
+# A ref is "name" or "name.attribute" (e.g. "qam1.signal_i"), and null stays None
+# The same description builds the Qt front panels (gui=True) or a headless bench: instruments without a headless model
+# are left out, refs to them become their stand-ins, and the nodes they were connected to are probed instead. Either
+# way the bench is evaluated through a bench graph (tools.graph), from its probes or from its instruments' frames.
+# Headless benches are kept per topology, so loading the same wiring again reuses the built components, their graph
+# and their caches
+# Default time unit: 1 s
+
+# Imports
+import os, json, time, importlib
+import numpy as np
+from tools.evm import config_key
+from tools.graph import BenchGraph
+from tools.profiler import Profiler
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+# Component types: (front panel class, headless class), as "module:Class" strings imported on first use
+# None means there is no such model (instruments are only GUI, most components are the same in both)
+registry = {
+    "laser": ("instruments.laser:Laser", "components.laser_source:LaserSource"),
+    "signal_gen": ("instruments.signal_gen:SignalGenerator", "components.signal_source:SignalSource"),
+    "prbs_gen": ("instruments.prbs_gen:PRBSGenerator", "components.prbs_source:PRBSSource"),
+    "qam_gen": ("instruments.qam_gen:QAMGenerator", "components.qam_source:QAMSource"),
+    "oscilloscope": ("instruments.oscilloscope:Oscilloscope", None),
+    "osa": ("instruments.osa:OSA", None),
+    "esa": ("instruments.esa:ESA", None),
+    "eye_analyzer": ("instruments.eye_analyzer:EyeAnalyzer", None),
+    "constellation_analyzer": ("instruments.constellation_analyzer:ConstellationAnalyzer", None),
+    "otdr": ("instruments.otdr:OTDR", "components.otdr_source:OTDRSource"),
+    "fiber": ("components.fiber:Fiber", "components.fiber:Fiber"),
+    "link": ("components.link:Link", "components.link:Link"),
+    "filter": ("components.filter:Filter", "components.filter:Filter"),
+    "cascade": ("components.cascade:Cascade", "components.cascade:Cascade"),
+    "photodetector": ("components.photodetector:Photodetector", "components.photodetector:Photodetector"),
+    "eo_am": ("components.eo_amodulator:EOAM", "components.eo_amodulator:EOAM"),
+    "eo_qam": ("components.eo_qamodulator:EOQAM", "components.eo_qamodulator:EOQAM"),
+}
+
+# Types that drive a bench (signal sources, the OTDR's light): a headless bench cannot run without a model of them
+source_types = ("laser", "signal_gen", "prbs_gen", "qam_gen", "otdr")
+
+# Outputs probed on nodes that fed a left-out instrument, in order of preference
+probe_outputs = ("output_signal", "output_opt_signal")
+
+# Headless benches already built, per topology
+_benches = {}
+
+# Marks an attribute a component did not set itself (its class default applies)
+_missing = object()
+
+
+# Import a "module:Class" string
+def load_class(path):
+    module, name = path.split(":")
+    return getattr(importlib.import_module(module), name)
+
+
+# Plain value of a config entry (constants resolved)
+def literal(value):
+    if isinstance(value, dict):
+        if set(value) == {"const"}:
+            return load_class(value["const"])
+        return {key: literal(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [literal(item) for item in value]
+    return value
+
+
+# Read a configuration file (.json, or .yaml/.yml)
+def load_config(filename):
+    with open(filename, "r") as file:
+        if os.path.splitext(filename)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ImportError("PyYAML is needed to read YAML bench files")
+            return yaml.safe_load(file)
+        return json.load(file)
+
+
+# Everything but the parameter values: the components, their types and constructor args, and the wiring
+def topology(config):
+    return {"components": {name: {"type": comp["type"], "args": comp.get("args", {})}
+                           for name, comp in config["components"].items()},
+            "calls": config.get("calls", []), "connections": config.get("connections", {})}
+
+
+# Headless stand-in for a left-out instrument: serves its params (sampletime, npoints) to the sources wired to it
+# False while it serves neither, so those sources fall back to their own settings, as with no instrument at all
+class InstrumentSettings():
+    def __init__(self, name):
+        self.name = name
+
+    def __bool__(self):
+        return "sampletime" in vars(self) or "npoints" in vars(self)
+
+    # Sources pull both settings or neither
+    def check(self):
+        if self and not ("sampletime" in vars(self) and "npoints" in vars(self)):
+            raise ValueError(f"{self.name} needs both sampletime and npoints params to run headless")
+
+    # Output functions: the acquisition settings sources pull (as the instruments' own output_sampletime/npoints)
+    # None when unset (the bench graph may still replay a pull from an earlier configuration)
+    def output_sampletime(self):
+        return getattr(self, "sampletime", None)
+
+    def output_npoints(self):
+        npoints = getattr(self, "npoints", None)
+        return None if npoints is None else int(npoints)
+
+
+# A bench built from a configuration
+class Bench():
+    def __init__(self, config, gui=False):
+        self.config = config
+        self.gui = gui
+        self.components = {}
+        self.left_out = set()  # Instruments with no headless model
+        self.settings = {}  # Their stand-ins (InstrumentSettings), holding their params
+        self.defaults = {}  # {name: {attribute: value before any params}}, to undo params a later config leaves out
+        self.probes = {}
+        self.graph = None
+        self.profiler = None
+        self.pool = None  # Executor for the independent branches of the graph (optional, e.g. a ThreadPoolExecutor)
+        self.nframes = 0
+
+        if not gui:
+            self.check_headless(config)
+        for name, comp in config["components"].items():
+            if comp["type"] not in registry:
+                raise ValueError(f"Unknown component type {comp['type']} ({name})")
+            path = registry[comp["type"]][0 if gui else 1]
+            if path is None:
+                self.left_out.add(name)
+                self.settings[name] = InstrumentSettings(name)
+                continue
+            self.components[name] = load_class(path)(**literal(comp.get("args", {})))
+
+        self.apply_params(config)
+        for call in config.get("calls", []):
+            self.ref(call["call"])(*literal(call.get("args", [])), **literal(call.get("kwargs", {})))
+        self.connect(config.get("connections", {}))
+
+        # The graph's sinks: the probed nodes headless, the instruments that pull (their measLoop runs it) with the GUI
+        if gui:
+            sinks = [obj for obj in self.components.values() if hasattr(type(obj), "bench_graph")]
+        else:
+            self.find_probes(config)
+            if not self.probes:
+                raise ValueError("Nothing to probe headless (do the sources have headless models?)")
+            sinks = [self.ref(path.rsplit(".", 1)[0]) for path in self.probes.values()]
+        if sinks:
+            self.graph = BenchGraph(sinks).install()
+
+    # Headless benches need a model of every source: fail before building anything
+    def check_headless(self, config):
+        if config.get("gui_only"):
+            raise ValueError("This bench is GUI only (gui_only is set in its configuration): run it with its front panels")
+        for name, comp in config["components"].items():
+            if comp["type"] in source_types and registry[comp["type"]][1] is None:
+                raise ValueError(f"{name} ({comp['type']}) has no headless model: run this bench with its front panels")
+
+    # Component or instrument stand-in holding the params of name
+    def target(self, name):
+        return self.components[name] if name in self.components else self.settings[name]
+
+    # Set the "params" attributes (the only part that may change between runs of the same topology), after putting
+    # back the defaults of those a previous config set and this one leaves out
+    def apply_params(self, config):
+        for name, saved in self.defaults.items():
+            params = config["components"].get(name, {}).get("params", {})
+            for attribute in [a for a in saved if a not in params]:
+                value = saved.pop(attribute)
+                if value is _missing:
+                    delattr(self.target(name), attribute)
+                else:
+                    setattr(self.target(name), attribute, value)
+
+        for name, comp in config["components"].items():
+            obj = self.target(name)
+            saved = self.defaults.setdefault(name, {})
+            for attribute, value in comp.get("params", {}).items():
+                if attribute not in saved:
+                    saved[attribute] = vars(obj).get(attribute, _missing)
+                setattr(obj, attribute, literal(value))
+        for settings in self.settings.values():
+            settings.check()
+
+    # Object of a ref ("name", "name.attribute", "name.attribute.method"...), the stand-in of left-out instruments
+    def ref(self, path):
+        if path is None:
+            return None
+        name, *attributes = path.split(".")
+        if name in self.left_out:
+            return self.settings[name] if not attributes else None
+        if name not in self.components:
+            raise ValueError(f"Unknown component {name}")
+        obj = self.components[name]
+        for attribute in attributes:
+            obj = getattr(obj, attribute)
+        return obj
+
+    def resolve(self, refs):
+        if isinstance(refs, dict):
+            return {key: self.ref(value) for key, value in refs.items()}
+        return [self.ref(value) for value in refs]
+
+    # Call set_inputs (or the named method) of every connected component
+    def connect(self, connections):
+        for target, refs in connections.items():
+            if target.split(".")[0] in self.left_out:
+                continue
+            method = self.ref(target if "." in target else target + ".set_inputs")
+            if isinstance(refs, dict):
+                method(**self.resolve(refs))
+            else:
+                method(*self.resolve(refs))
+
+    # Explicit probes, or the nodes wired into the left-out instruments
+    def find_probes(self, config):
+        if "probes" in config:
+            self.probes = dict(config["probes"])
+            return
+        for target, refs in config.get("connections", {}).items():
+            name = target.split(".")[0]
+            if name not in self.left_out:
+                continue
+            values = refs.values() if isinstance(refs, dict) else refs
+            for i, path in enumerate(values):
+                node = self.ref(path)
+                method = next((m for m in probe_outputs if hasattr(node, m)), None) if node is not None else None
+                if method is not None:
+                    self.probes[f"{name}.{i + 1}"] = f"{path}.{method}"
+
+    # One headless frame: evaluate the graph once, and return the probed outputs
+    def run(self):
+        if self.gui:
+            raise RuntimeError("GUI benches run from their instruments (app.exec_())")
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        try:
+            self.graph.run(pool=self.pool)
+            self.nframes += 1
+            results = {label: self.ref(path)() for label, path in self.probes.items()}
+        finally:
+            if self.profiler is not None:
+                self.profiler.end_frame()
+        return results
+
+    # Time every input/output call of the bench (tools.profiler), per frame; GUI benches also get the overlay
+    def profile(self, memory=False):
+        if self.profiler is None:
+            self.profiler = Profiler(self.components, memory=memory, overlay=self.gui).install()
+        return self.profiler
+
+    # Several frames, stacked per probe where shapes allow it
+    def run_frames(self, nframes):
+        frames = [self.run() for i in range(nframes)]
+        results = {}
+        for label in self.probes:
+            values = [frame[label] for frame in frames]
+            try:
+                results[label] = np.stack([np.asarray(value) for value in values])
+            except ValueError:
+                results[label] = values
+        return results
+
+
+# Build a bench from a configuration (dict or file name)
+# Headless benches are reused when the topology was built before, with the new params applied
+def build_bench(config, gui=False):
+    if isinstance(config, str):
+        config = load_config(config)
+    if gui:
+        return Bench(config, gui=True)
+
+    key = config_key(topology(config))
+    bench = _benches.get(key)
+    if bench is None:
+        bench = _benches[key] = Bench(config)
+    else:
+        bench.config = config
+        bench.apply_params(config)
+    return bench
+
+
+# Start a bench with its front panels (blocks until the windows are closed)
+def run_gui(config, profile=False, memory=False):
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication([])
+    bench = build_bench(config, gui=True)
+    if profile:
+        bench.profile(memory)
+    app.exec_()
+    return bench
+
+
+# Run nframes of a bench headless, returning the stacked probes and the time per frame
+def run_headless(config, nframes=1, profile=False, memory=False):
+    bench = build_bench(config)
+    if profile:
+        bench.profile(memory)
+    t0 = time.time()
+    results = bench.run_frames(nframes)
+    return results, (time.time() - t0)/max(nframes, 1)
@@ -0,0 +1,344 @@
+# Benchmark suite for the signal chain
+# Micro cases time one stage (a generator's get_waveform, a component's output path, an instrument's input_signal)
+# with its inputs precomputed, macro cases time whole benches frame by frame. Each case is a setup function,
+# setup(npoints) -> (callable, record size), timed at several record sizes and reported as samples/s and frames/s.
+# Results are saved as JSON, so later runs can be compared against them to catch regressions
+# Cases that need Qt (the front-panel generators and the instruments) only run when PyQt5 is installed
+# Default time unit: 1 s
+
+# Imports
+import os, sys, json, time, platform, fnmatch, importlib
+import numpy as np
+from components import laser_source, qam_source, eo_amodulator, eo_qamodulator, fiber, photodetector, filter
+from tools.transfer import TransferCascade
+from tools.graph import freeze
+
+# Default record sizes (samples per frame)
+default_sizes = (1000, 10000, 100000)
+
+# Symbol rate and samples per symbol of the generated test signals
+symbol_rate = 1e9  # Hz
+sps = 16
+
+
+# Best time per call: each repeat runs enough calls to last min_time, and the fastest repeat is kept
+def time_call(func, repeat=5, min_time=0.05):
+    func()  # Warm up (caches, first allocations)
+    ncalls = 1
+    while True:
+        t0 = time.perf_counter()
+        for i in range(ncalls):
+            func()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or ncalls >= 1 << 20:
+            break
+        ncalls *= 2 if elapsed <= 0 else max(2, int(np.ceil(min_time/elapsed)))
+    best = elapsed/ncalls
+    for i in range(repeat - 1):
+        t0 = time.perf_counter()
+        for j in range(ncalls):
+            func()
+        best = min(best, (time.perf_counter() - t0)/ncalls)
+    return best
+
+
+# A fixed frame, standing in for an upstream stage (so only the stage under test is timed)
+# Outputs are read-only views, as a bench graph hands out its results: stages that edit them take their own copy
+class Frame():
+    def __init__(self, spec=None, wf=None, signal=None, timearray=None, freq=symbol_rate):
+        self.spec = spec
+        self.wf = wf
+        self.signal = signal
+        self.timearray = timearray
+        self.freq = freq
+
+    def output_opt_signal(self):
+        return freeze((self.spec, self.wf))
+
+    def output_signal(self):
+        return freeze(self.signal)
+
+    def output_timearray(self):
+        return self.timearray
+
+
+# Test signal sources
+def make_qam(npoints):
+    qam = qam_source.QAMSource(nlevels=4, seed=0)
+    qam.set_inputs(sampletime_obj=None, npoints_obj=None)
+    qam.freq = symbol_rate
+    qam.npoints = npoints
+    qam.sampletime = npoints/(sps*symbol_rate)
+    qam.refresh_params()
+    return qam
+
+
+# Laser with its spectrum sampled on npoints (10 pm apart, around the line), so optical frames follow the record size
+# (the full laser grid is 1M points, whatever the record size)
+def make_laser(npoints):
+    laser = laser_source.LaserSource(spec=np.zeros([2, npoints]))
+    laser.npoints = npoints
+    laser.start_wl = laser.wavelength - 5e-3*npoints
+    laser.stop_wl = laser.wavelength + 5e-3*npoints
+    laser.create_spec()
+    return laser
+
+
+def make_modulated(npoints):
+    laser = make_laser(npoints)
+    qam = make_qam(npoints)
+    eo_am = eo_amodulator.EOAM()
+    eo_am.set_inputs(laser, qam.signal_i)
+    spec, wf = eo_am.output_opt_signal()
+    return Frame(spec=spec, wf=wf, timearray=wf[0])
+
+
+# Micro cases (headless)
+def qam_get_waveform(npoints):
+    qam = make_qam(npoints)
+    return qam.get_waveform, npoints
+
+
+def eo_am_modulate(npoints):
+    laser = laser_source.LaserSource()
+    qam = make_qam(npoints)
+    eo_am = eo_amodulator.EOAM()
+    eo_am.set_inputs(laser, qam.signal_i)
+    eo_am.spec, eo_am.wf = laser.output_opt_signal()
+    eo_am.mod_wf = qam.signal_i.output_signal()
+    return eo_am.modulate, npoints
+
+
+def eo_qam_modulate(npoints):
+    laser = laser_source.LaserSource()
+    qam = make_qam(npoints)
+    eo_qam = eo_qamodulator.EOQAM()
+    eo_qam.set_inputs(laser, qam.signal_i, qam.signal_q)
+    eo_qam.spec, eo_qam.wf = laser.output_opt_signal()
+    eo_qam.i_wf = qam.signal_i.output_signal()
+    eo_qam.q_wf = qam.signal_q.output_signal()
+    return eo_qam.modulate, npoints
+
+
+def fiber_output(npoints):
+    fiber1 = fiber.Fiber(length=10.0)
+    fiber1.set_inputs(make_modulated(npoints))
+    return fiber1.output_opt_signal, npoints
+
+
+def photodetector_output(npoints):
+    pd = photodetector.Photodetector(material=photodetector.INGAAS)
+    pd.set_inputs(make_modulated(npoints))
+    return pd.output_signal, npoints
+
+
+def filter_cascade(npoints):
+    qam = make_qam(npoints)
+    wf = qam.signal_i.output_signal()
+    dt = qam.timearray[1] - qam.timearray[0]
+    cascade = TransferCascade([filter.Filter()])
+    return (lambda: cascade.apply(wf, dt)), npoints
+
+
+# Macro cases (headless)
+# A bench of its own (not the one build_bench keeps for this topology), with the record size set as the oscilloscope's
+# params, which the QAM source pulls
+def optical_qam_bench(npoints):
+    from tools.benchconfig import load_config, Bench
+    main_path = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+    config = load_config(os.path.join(main_path, "benches", "optical_qam_oscilloscope.json"))
+    config["components"]["osc"]["params"] = {"sampletime": npoints/(sps*symbol_rate), "npoints": npoints}
+    config["components"]["qam1"]["params"] = {"freq": symbol_rate}
+    bench = Bench(config)
+    return bench.run, npoints
+
+
+# Qt cases: an application is created on first use (offscreen, no windows are shown)
+_app = None
+
+
+def qt_app():
+    global _app
+    if _app is None:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        _app = QApplication.instance() or QApplication(sys.argv[:1])
+    return _app
+
+
+def generator_get_waveform(module, cls):
+    def setup(npoints):
+        qt_app()
+        gen = getattr(importlib.import_module(f"instruments.{module}"), cls)()
+        gen.set_inputs(sampletime_obj=None, npoints_obj=None)
+        gen.npoints = npoints
+        gen.sampletime = npoints/(sps*gen.freq)
+        gen.refresh_params()
+        return gen.get_waveform, npoints
+    return setup
+
+
+def filter_output(npoints):
+    qt_app()
+    from instruments.signal_gen import SignalGenerator
+    gen = SignalGenerator()
+    gen.set_inputs(sampletime_obj=None, npoints_obj=None)
+    gen.npoints = npoints
+    gen.refresh_params()
+    filter1 = filter.Filter()
+    filter1.set_inputs(gen, gen, gen)
+    return filter1.output_signal, npoints
+
+
+# Instrument settings for records of about npoints samples (as the front panels set them)
+def size_analyzer(inst, npoints):
+    inst.sps = sps
+    inst.nsymbols = max(npoints//sps, 1)
+
+
+def size_esa(inst, npoints):
+    inst.rbw = inst.npoints_inc*2*inst.fstop/npoints
+    inst.npoints = int(inst.fspan/inst.rbw)
+    inst.sampletime = 1/inst.rbw
+
+
+def size_osa(inst, npoints):
+    inst.npoints = npoints
+    inst.rbw = inst.wlspan/npoints
+    inst.x_axis = np.linspace(inst.wlstart, inst.wlstop, npoints)
+
+
+# Instruments set the record size: electrical sources pull it from them (sampletime and npoints), optical frames are
+# made with as many points
+def instrument_input(module, cls, size_instrument, optical=False):
+    def setup(npoints):
+        qt_app()
+        inst = getattr(importlib.import_module(f"instruments.{module}"), cls)()
+        size_instrument(inst, npoints)
+        if optical:
+            source = make_modulated(npoints)
+        else:
+            qam = make_qam(npoints)
+            qam.set_inputs(inst, inst)
+            source = qam.signal_i
+        inst.set_inputs(source)
+        size = inst.output_npoints() if hasattr(inst, "output_npoints") else len(inst.input_signal())
+        return inst.input_signal, size
+    return setup
+
+
+# Oscilloscope frame: two independent channels fetched (on its thread pool) and reduced for display
+def oscilloscope_frame(npoints):
+    qt_app()
+    from instruments.oscilloscope import Oscilloscope
+    scope = Oscilloscope()
+    scope.npoints = npoints
+    scope.sampletime = npoints/(sps*symbol_rate)
+    scope.y_axis = np.zeros([4, npoints])
+    sources = [make_qam(npoints) for i in range(2)]
+    for qam in sources:
+        qam.set_inputs(scope, scope)
+    scope.set_inputs(sources[0].signal_i, sources[1].signal_i)
+    active = [0, 1]
+
+    def frame():
+        records = scope.fetch_channels(active)
+        for i in active:
+            scope.y_axis[i] = records[i]
+            scope.display_data(i)
+
+    return frame, 2*npoints
+
+
+# Named cases: setup, kind (micro/macro), needs Qt, timed per record size
+class Suite():
+    def __init__(self):
+        self.cases = {}
+
+    def add(self, name, setup, kind="micro", qt=False, sized=True):
+        self.cases[name] = {"setup": setup, "kind": kind, "qt": qt, "sized": sized}
+        return self
+
+    # Run the cases matching pattern (fnmatch, e.g. "eo_*"), returning {name: [result per record size]}
+    def run(self, sizes=default_sizes, pattern="*", repeat=5, min_time=0.05, log=print):
+        try:
+            import PyQt5
+            has_qt = True
+        except ImportError:
+            has_qt = False
+
+        results = {}
+        for name, case in self.cases.items():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            if case["qt"] and not has_qt:
+                log(f"{name}: skipped (needs PyQt5)")
+                continue
+            results[name] = []
+            for npoints in (sizes if case["sized"] else sizes[:1]):
+                func, size = case["setup"](npoints)
+                t = time_call(func, repeat, min_time)
+                result = {"kind": case["kind"], "npoints": int(size), "time": t, "frames_per_s": 1/t,
+                          "samples_per_s": size/t}
+                results[name].append(result)
+                log(f"{name:<36}{size:>10d}{t*1e3:>12.3f} ms{result['frames_per_s']:>12.1f} fps"
+                    f"{result['samples_per_s']/1e6:>12.2f} MS/s")
+        return results
+
+
+# The built-in cases
+def default_suite():
+    suite = Suite()
+    suite.add("qam_source.get_waveform", qam_get_waveform)
+    suite.add("prbs_gen.get_waveform", generator_get_waveform("prbs_gen", "PRBSGenerator"), qt=True)
+    suite.add("signal_gen.get_waveform", generator_get_waveform("signal_gen", "SignalGenerator"), qt=True)
+    suite.add("eo_am.modulate", eo_am_modulate)
+    suite.add("eo_qam.modulate", eo_qam_modulate)
+    suite.add("fiber.output_opt_signal", fiber_output)
+    suite.add("photodetector.output_signal", photodetector_output)
+    suite.add("filter.output_signal", filter_output, qt=True)
+    suite.add("filter.cascade", filter_cascade)
+    suite.add("esa.input_signal", instrument_input("esa", "ESA", size_esa), qt=True)
+    suite.add("osa.input_signal", instrument_input("osa", "OSA", size_osa, optical=True), qt=True)
+    suite.add("eye_analyzer.input_signal", instrument_input("eye_analyzer", "EyeAnalyzer", size_analyzer), qt=True)
+    suite.add("constellation_analyzer.input_signal",
+              instrument_input("constellation_analyzer", "ConstellationAnalyzer", size_analyzer), qt=True)
+    suite.add("oscilloscope.frame", oscilloscope_frame, qt=True)
+    suite.add("bench.optical_qam", optical_qam_bench, kind="macro")
+    return suite
+
+
+# Results files
+def save_results(filename, results):
+    data = {"meta": {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+                     "numpy": np.__version__, "machine": platform.machine(), "processor": platform.processor(),
+                     "cpus": os.cpu_count()},
+            "results": results}
+    with open(filename, "w") as file:
+        json.dump(data, file, indent=1)
+
+
+def load_results(filename):
+    with open(filename, "r") as file:
+        return json.load(file)["results"]
+
+
+# Compare against a baseline: time ratios per case and record size, flagging the ones slower by more than threshold
+def compare(baseline, results, threshold=0.1):
+    lines = [f"{'Case':<36}{'Points':>10}{'Baseline':>12}{'Now':>12}{'Ratio':>8}"]
+    regressions = 0
+    for name, runs in results.items():
+        old = {run["npoints"]: run for run in baseline.get(name, [])}
+        for run in runs:
+            if run["npoints"] not in old:
+                continue
+            ratio = run["time"]/old[run["npoints"]]["time"]
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  slower"
+                regressions += 1
+            elif ratio < 1/(1 + threshold):
+                flag = "  faster"
+            lines.append(f"{name:<36}{run['npoints']:>10d}{old[run['npoints']]['time']*1e3:>10.3f}ms"
+                         f"{run['time']*1e3:>10.3f}ms{ratio:>8.2f}{flag}")
+    return "\n".join(lines), regressions
@@ -0,0 +1,193 @@
+# Capture files for the virtual instruments
+# Binary captures are uncompressed .npz files (one bulk write), with the instrument settings as JSON metadata.
+# Arrays inside them can be memory-mapped, so analysis scripts do not need to load long captures in RAM.
+# Text captures (tab separated) are still supported, also written in bulk.
+
+# Imports
+import os, time, json, struct, zipfile
+import numpy as np
+
+
+# Decide file name and format from a save dialog result
+def capture_filename(filename, selected_filter=""):
+    if filename[-4:].lower() == ".npz" or "npz" in selected_filter:
+        if filename[-4:].lower() != ".npz":
+            filename = filename + ".npz"
+        return filename, True
+    if filename[-4:].lower() != ".txt":
+        filename = filename + ".txt"
+    return filename, False
+
+# Save a binary capture: named arrays plus a metadata dictionary
+def save_capture(filename, metadata=None, **arrays):
+    arrays["metadata"] = np.array(json.dumps(metadata if metadata else {}, default=str))
+    np.savez(filename, **arrays)
+
+# Save a text capture: header names and equal length columns
+def save_text(filename, names, columns):
+    with open(filename, "w") as file:
+        file.write("\t".join(names) + "\n")
+        np.savetxt(file, np.column_stack(columns), fmt="%.15g", delimiter="\t")
+
+# Offset of the raw data of an array stored (uncompressed) in a .npz file
+def _member_offset(filename, info):
+    with open(filename, "rb") as file:
+        file.seek(info.header_offset)
+        header = struct.unpack("<4s5H3I2H", file.read(30))
+        file.seek(info.header_offset + 30 + header[-2] + header[-1])
+        version = np.lib.format.read_magic(file)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(file)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(file)
+        return file.tell(), shape, fortran_order, dtype
+
+# Load a binary capture, returns (arrays, metadata)
+# With mmap=True, numeric arrays are read-only memory maps into the file
+def load_capture(filename, mmap=True):
+    arrays = {}
+    with zipfile.ZipFile(filename) as zf:
+        infos = zf.infolist()
+    with np.load(filename) as data:
+        metadata = json.loads(str(data["metadata"])) if "metadata" in data.files else {}
+        for info in infos:
+            name = info.filename[:-4]
+            if name == "metadata":
+                continue
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                offset, shape, fortran_order, dtype = _member_offset(filename, info)
+                if dtype.hasobject or np.prod(shape) == 0:
+                    arrays[name] = data[name]
+                else:
+                    order = "F" if fortran_order else "C"
+                    arrays[name] = np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape, order=order)
+            else:
+                arrays[name] = data[name]
+    return arrays, metadata
+
+# Load channel columns from an oscilloscope capture (binary or text)
+def load_channels(filename, channels=(0, 1), mmap=True):
+    if filename[-4:].lower() == ".npz":
+        arrays, metadata = load_capture(filename, mmap)
+        return [arrays["channels"][j] for j in channels]
+    data = np.loadtxt(filename, skiprows=1, delimiter="\t", usecols=[j + 1 for j in channels], ndmin=2)
+    return [data[:, j] for j in range(data.shape[1])]
+
+
+# Long recordings on disk
+# Frames (channels x points) are appended to a preallocated memory-mapped data file (<name>.dat), with a
+# memory-mapped index (<name>.idx) of frame offsets. Both files grow by doubling, RAM use stays constant.
+# <name>.json keeps the sizes, data type and the user metadata. It is rewritten (with the maps flushed) every
+# flush_frames frames or flush_period seconds, so a crash loses at most that much of the recording.
+INDEX_FIELDS = ["offset", "nchannels", "npoints", "time", "sampletime", "channel_mask"]
+
+
+class CaptureRecorder():
+    def __init__(self, basename, metadata=None, dtype=np.float32, frames=1024, samples=2**22, flush_frames=64,
+                 flush_period=1.0):
+        self.basename = basename
+        self.flush_frames = flush_frames
+        self.flush_period = flush_period  # s
+        self.metadata = metadata if metadata else {}
+        self.dtype = np.dtype(dtype)
+        self.nframes = 0
+        self.nsamples = 0
+        self.t0 = None
+        self.data = self._create(f"{basename}.dat", self.dtype, (samples,))
+        self.index = self._create(f"{basename}.idx", np.float64, (frames, len(INDEX_FIELDS)))
+        self.write_header()
+        self.flushed = time.time()
+
+    def _create(self, filename, dtype, shape):
+        return np.memmap(filename, dtype=dtype, mode="w+", shape=shape)
+
+    # Double the size of a memory-mapped file attribute ("data" or "index"), keeping its contents
+    # The old map is released before the file is resized (resizing a mapped file fails on Windows)
+    def _grow(self, name, needed):
+        mmap = getattr(self, name)
+        filename = mmap.filename
+        dtype = mmap.dtype
+        shape = list(mmap.shape)
+        while shape[0] < needed:
+            shape[0] *= 2
+        mmap.flush()
+        setattr(self, name, None)
+        del mmap
+        with open(filename, "r+b") as file:
+            file.truncate(int(np.prod(shape))*dtype.itemsize)
+        setattr(self, name, np.memmap(filename, dtype=dtype, mode="r+", shape=tuple(shape)))
+
+    # Append one frame: channels is (nchannels x npoints)
+    def append(self, channels, sampletime, timestamp=None, channel_mask=0):
+        channels = np.atleast_2d(channels)
+        nch, npoints = channels.shape
+        size = nch*npoints
+        if timestamp is None:
+            timestamp = time.time()
+        if self.t0 is None:
+            self.t0 = timestamp
+
+        if self.nsamples + size > len(self.data):
+            self._grow("data", self.nsamples + size)
+        if self.nframes + 1 > len(self.index):
+            self._grow("index", self.nframes + 1)
+
+        self.data[self.nsamples:self.nsamples + size] = channels.ravel()
+        self.index[self.nframes] = [self.nsamples, nch, npoints, timestamp - self.t0, sampletime, channel_mask]
+        self.nsamples += size
+        self.nframes += 1
+
+        # Keep the header current, in case the recording is never closed
+        if not self.nframes % self.flush_frames or time.time() - self.flushed >= self.flush_period:
+            self.flush()
+
+    # Sizes and metadata (the data files are only valid up to these sizes)
+    def write_header(self):
+        header = {"nframes": self.nframes, "nsamples": self.nsamples, "dtype": self.dtype.str,
+                  "index_fields": INDEX_FIELDS, "t0": self.t0, "metadata": self.metadata}
+        with open(f"{self.basename}.json", "w") as file:
+            json.dump(header, file, indent=1, default=str)
+
+    def flush(self):
+        self.data.flush()
+        self.index.flush()
+        self.write_header()
+        self.flushed = time.time()
+
+    # Close and trim the files to the recorded size
+    def close(self):
+        self.flush()
+        filenames = [self.data.filename, self.index.filename]
+        sizes = [self.nsamples*self.dtype.itemsize, self.nframes*len(INDEX_FIELDS)*8]
+        del self.data
+        del self.index
+        for filename, size in zip(filenames, sizes):
+            with open(filename, "r+b") as file:
+                file.truncate(size)
+
+
+# Out of core access to a recording
+class CaptureReader():
+    def __init__(self, basename):
+        with open(f"{basename}.json", "r") as file:
+            header = json.load(file)
+        self.metadata = header["metadata"]
+        self.nframes = header["nframes"]
+        dtype = np.dtype(header["dtype"])
+        self.data = np.memmap(f"{basename}.dat", dtype=dtype, mode="r", shape=(header["nsamples"],))
+        self.index = np.memmap(f"{basename}.idx", dtype=np.float64, mode="r",
+                               shape=(self.nframes, len(INDEX_FIELDS)))
+
+    def __len__(self):
+        return self.nframes
+
+    # One frame (channels x points, a view into the file) and its index entry
+    def frame(self, i):
+        offset, nch, npoints = [int(v) for v in self.index[i][:3]]
+        info = dict(zip(INDEX_FIELDS, [float(v) for v in self.index[i]]))
+        return self.data[offset:offset + nch*npoints].reshape(nch, npoints), info
+
+    # Iterate over all frames
+    def frames(self):
+        for i in range(self.nframes):
+            yield self.frame(i)
@@ -0,0 +1,94 @@
+# Display helpers for the virtual instruments
+# Only used to reduce what is drawn, the instruments keep the full data for measurements and saving
+# Default time unit: 1 s
+# Default voltage unit: V
+
+# Imports
+import numpy as np
+
+
+# Min/max (peak detect) decimation
+# Splits the last axis of y in nbins blocks and keeps the minimum and the maximum of each block, in the order
+# they happen, so spikes and the signal envelope survive. y can be 2D (one record per row, sharing the same x).
+def minmax_decimate(x, y, nbins):
+    npoints = y.shape[-1]
+    if nbins < 1 or 2*nbins >= npoints:
+        # Nothing to reduce, but x still gets y's shape (as in the decimated case)
+        return np.broadcast_to(x, y.shape), y
+
+    # Pad with the last value, so all blocks have the same size
+    binsize = int(np.ceil(npoints/nbins))
+    nbins = int(np.ceil(npoints/binsize))
+    pad = nbins*binsize - npoints
+    if pad > 0:
+        padding = [(0, 0)]*(y.ndim - 1) + [(0, pad)]
+        y_pad = np.pad(y, padding, mode='edge')
+    else:
+        y_pad = y
+    blocks = y_pad.reshape(y.shape[:-1] + (nbins, binsize))
+
+    # Indexes of the min and max of each block, sorted in time
+    start = np.arange(nbins)*binsize
+    imin = np.minimum(blocks.argmin(axis=-1) + start, npoints - 1)
+    imax = np.minimum(blocks.argmax(axis=-1) + start, npoints - 1)
+    idx = np.stack([np.minimum(imin, imax), np.maximum(imin, imax)], axis=-1)
+    idx = idx.reshape(y.shape[:-1] + (2*nbins,))
+
+    return x[idx], np.take_along_axis(y, idx, axis=-1)
+
+
+# Simple stride decimation, keeps pairs of samples together (for XY plots)
+def stride_decimate(y, maxpoints):
+    step = max(int(np.ceil(y.shape[-1]/max(maxpoints, 1))), 1)
+    return y[..., ::step]
+
+
+# Fixed size 2D histogram (y bins x x bins) for persistence/density displays
+# Each record is binned and added to the counts, so the cost per frame does not depend on the number of
+# records already accumulated.
+class DensityHistogram():
+    def __init__(self, xlims, ylims, nx=500, ny=250):
+        self.xlims = [float(xlims[0]), float(xlims[1])]
+        self.ylims = [float(ylims[0]), float(ylims[1])]
+        self.nx = int(nx)
+        self.ny = int(ny)
+        self.reset()
+
+    # Clear accumulated data
+    def reset(self):
+        self.counts = np.zeros([self.ny, self.nx])
+        self.nrecords = 0
+
+    # Bin one record (x can be shared by all rows of y)
+    def add(self, x, y):
+        x, y = np.broadcast_arrays(x, y)
+        ix = np.floor((x.ravel() - self.xlims[0])*self.nx/(self.xlims[1] - self.xlims[0])).astype(np.int64)
+        iy = np.floor((y.ravel() - self.ylims[0])*self.ny/(self.ylims[1] - self.ylims[0])).astype(np.int64)
+        ix[x.ravel() == self.xlims[1]] = self.nx - 1  # Include the right edge
+        iy[y.ravel() == self.ylims[1]] = self.ny - 1
+        mask = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        flat = np.bincount(iy[mask]*self.nx + ix[mask], minlength=self.nx*self.ny)
+        self.counts += flat.reshape(self.ny, self.nx)
+        self.nrecords += 1
+
+    # Normalized (0 to 1) image, log scale by default to show rare events
+    def image(self, log=True):
+        img = np.log1p(self.counts) if log else self.counts
+        top = img.max()
+        if top > 0:
+            img = img/top
+        return img
+
+    # Extent for imshow
+    def extent(self):
+        return [self.xlims[0], self.xlims[1], self.ylims[0], self.ylims[1]]
+
+
+# Color-graded image from several density images, one color per image (RGBA, alpha from the density)
+def density_rgba(images, colors):
+    rgba = np.zeros(images[0].shape + (4,))
+    for img, color in zip(images, colors):
+        rgba[..., :3] += img[..., None]*np.array(color[:3])
+        rgba[..., 3] = np.maximum(rgba[..., 3], img)
+    rgba[..., :3] = np.clip(rgba[..., :3], 0.0, 1.0)
+    return rgba
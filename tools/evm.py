@@ -0,0 +1,159 @@
+# Constellation, EVM and BER analysis for square QAM signals
+# Default voltage unit: V
+
+# Imports
+import os, json, hashlib
+import numpy as np
+from scipy.special import erfc
+
+
+# Phase (in samples) of the symbol centers: the point of each symbol farthest from the transitions
+def symbol_center_phase(sig, sps):
+    transitions = np.abs(np.diff(sig))
+    energy = np.bincount(np.arange(len(transitions)) % sps, weights=transitions, minlength=sps)
+    boundary = (energy.argmax() + 1) % sps
+    return (boundary + sps//2) % sps
+
+# Samples at the symbol centers
+def sample_symbols(sig, sps, phase=None):
+    if phase is None:
+        phase = symbol_center_phase(sig, sps)
+    return sig[phase::sps]
+
+# Reference levels of one axis: the data has nlevels equally likely levels, so each one is the median of
+# its share of the sorted samples
+def estimate_levels(coords, nlevels):
+    return np.quantile(coords, (np.arange(nlevels) + 0.5)/nlevels)
+
+# Reference levels of one axis by k-means (Lloyd), seeded with the quantile estimate
+# Assignment uses the decision thresholds and the update uses bincount, so each iteration is fully vectorized
+def fit_levels(coords, nlevels, iterations=50, tol=1e-12):
+    coords = np.asarray(coords, dtype=float)
+    levels = estimate_levels(coords, nlevels)
+    for it in range(iterations):
+        thresholds = 0.5*(levels[1:] + levels[:-1])
+        idx = np.searchsorted(thresholds, coords)
+        counts = np.bincount(idx, minlength=nlevels)
+        sums = np.bincount(idx, weights=coords, minlength=nlevels)
+        new_levels = np.where(counts > 0, sums/np.maximum(counts, 1), levels)
+        new_levels = np.sort(new_levels)
+        shift = np.abs(new_levels - levels).max()
+        levels = new_levels
+        if shift <= tol*max(np.abs(levels).max(), 1e-30):
+            break
+    return levels
+
+# Key for a link configuration (any JSON-like description of the setup)
+def config_key(config):
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+# Cache of fitted references, per link configuration
+# Kept in memory, and in a JSON file when a filename is given, so other runs can reuse it
+class ReferenceCache():
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.refs = {}
+        if filename and os.path.isfile(filename):
+            with open(filename, "r") as file:
+                self.refs = json.load(file)
+
+    def get(self, config):
+        entry = self.refs.get(config_key(config))
+        if entry is None:
+            return None
+        return np.array(entry["refs_i"]), np.array(entry["refs_q"])
+
+    def put(self, config, refs_i, refs_q):
+        self.refs[config_key(config)] = {"config": config, "refs_i": list(map(float, refs_i)),
+                                         "refs_q": list(map(float, refs_q))}
+        self.save()
+
+    # Forget the references of a configuration (e.g. the link changed but its description did not)
+    def invalidate(self, config):
+        if self.refs.pop(config_key(config), None) is not None:
+            self.save()
+
+    def save(self):
+        if self.filename:
+            with open(self.filename, "w") as file:
+                json.dump(self.refs, file, indent=1, default=str)
+
+# Reference levels of both axes, fitted once per link configuration
+def fit_constellation(i_coords, q_coords, L, config=None, cache=None):
+    if config is not None and cache is not None:
+        refs = cache.get(config)
+        if refs is not None:
+            return refs
+    refs_i = fit_levels(i_coords, L)
+    refs_q = fit_levels(q_coords, L)
+    if config is not None and cache is not None:
+        cache.put(config, refs_i, refs_q)
+    return refs_i, refs_q
+
+# Decision thresholds of one axis: halfway between sorted reference levels
+def decision_thresholds(refs):
+    refs = np.sort(np.asarray(refs, dtype=float))
+    return refs, 0.5*(refs[1:] + refs[:-1])
+
+# Nearest reference for each coordinate (one axis), by binary search on the thresholds
+def decide(coords, refs):
+    refs, thresholds = decision_thresholds(refs)
+    return refs[np.searchsorted(thresholds, coords)]
+
+# Error and ideal vector magnitudes for I/Q coordinates
+# Ideal vectors are measured from the origin, or from the constellation center with centered=True (for signals with a
+# DC offset, e.g. detected optical power)
+def error_vectors(i_coords, q_coords, refs_i, refs_q, centered=False):
+    i_ideals = decide(i_coords, refs_i)
+    q_ideals = decide(q_coords, refs_q)
+    err_vecs = np.hypot(i_coords - i_ideals, q_coords - q_ideals)
+    if centered:
+        ideal_vecs = np.hypot(i_ideals - np.mean(refs_i), q_ideals - np.mean(refs_q))
+    else:
+        ideal_vecs = np.hypot(i_ideals, q_ideals)
+    return err_vecs, ideal_vecs
+
+# EVM, SNR and BER of a whole capture
+def evm_analysis(i_coords, q_coords, refs_i, refs_q, L, M, centered=False):
+    err_vecs, ideal_vecs = error_vectors(i_coords, q_coords, refs_i, refs_q, centered)
+    evm = np.sqrt(np.sum(err_vecs)/np.sum(ideal_vecs))
+    snr = 1/(evm**2)
+    return {"evm": evm, "snr": snr, "ber": ber_from_snr(snr, L, M)}
+
+# BER estimate for a square M-QAM (L levels per axis) from the SNR
+def ber_from_snr(snr, L, M):
+    ber_1 = (2/np.log2(L))*(1 - (1/L))
+    q_1 = np.sqrt(3*np.log2(L)/(L**2 - 1))
+    q_2 = 2*snr/np.log2(M)
+    return ber_1*erfc(q_1*q_2)
+
+
+# Running EVM/SNR/BER over many frames
+# Ideal vectors are taken from the constellation center, so DC offsets (e.g. detected optical power) do not count
+class RunningEVM():
+    def __init__(self, nlevels):
+        self.nlevels = nlevels
+        self.reset()
+
+    def reset(self):
+        self.err_sum = 0.0
+        self.ideal_sum = 0.0
+        self.nsymbols = 0
+
+    # Add symbol samples (I and Q coordinates) decided against the reference levels
+    def add(self, i_coords, q_coords, refs_i, refs_q):
+        err_vecs, ideal_vecs = error_vectors(i_coords, q_coords, refs_i, refs_q, centered=True)
+        self.err_sum += err_vecs.sum()
+        self.ideal_sum += ideal_vecs.sum()
+        self.nsymbols += len(i_coords)
+
+    def evm(self):
+        return np.sqrt(self.err_sum/self.ideal_sum) if self.ideal_sum > 0 else np.nan
+
+    def snr(self):
+        return 1/(self.evm()**2)
+
+    def ber(self):
+        return ber_from_snr(self.snr(), self.nlevels, self.nlevels**2)
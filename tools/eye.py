@@ -0,0 +1,91 @@
+# Eye diagram analysis
+# Records are folded modulo the symbol period in one step and accumulated in a density image, together with
+# running eye statistics, so long captures can be streamed in chunks
+# Default time unit: 1 s
+# Default voltage unit: V
+
+# Imports
+import numpy as np
+from tools.display import DensityHistogram
+from tools.stats import RunningStats
+
+
+# Eye accumulator for two-level (NRZ) signals
+# The display spans nui symbol periods, with crossings at the borders and the eye centers at half periods
+class EyeAccumulator():
+    def __init__(self, period, ylims, nui=2, nx=256, ny=256, center_window=0.1):
+        self.period = period
+        self.nui = nui
+        self.center_window = center_window  # Fraction of the period used to sample the eye center
+        self.hist = DensityHistogram([0.0, nui*period], ylims, nx, ny)
+        self.ones = RunningStats()
+        self.zeros = RunningStats()
+        self.crossings = RunningStats()
+        self.reset()
+
+    # Clear everything (the next record sets the threshold and the crossing reference again)
+    def reset(self):
+        self.hist.reset()
+        self.ones.reset()
+        self.zeros.reset()
+        self.crossings.reset()
+        self.threshold = None
+        self.t_cross = None
+        self.nrecords = 0
+
+    # Threshold crossing times, linearly interpolated between samples
+    def find_crossings(self, t, y):
+        above = y > self.threshold
+        k = np.flatnonzero(above[1:] != above[:-1])
+        return t[k] + (self.threshold - y[k])*(t[k + 1] - t[k])/(y[k + 1] - y[k])
+
+    # Add one record
+    def add(self, t, y):
+        T = self.period
+        if self.threshold is None:
+            self.threshold = 0.5*(y.min() + y.max())
+
+        # Crossings, the first record defines the (circular mean) crossing phase
+        tc = self.find_crossings(t, y)
+        if self.t_cross is None:
+            if len(tc) > 0:
+                self.t_cross = T*np.angle(np.mean(np.exp(2j*np.pi*tc/T)))/(2*np.pi)
+            else:
+                self.t_cross = 0.0
+        self.crossings.add(np.mod(tc - self.t_cross + T/2, T) - T/2)
+
+        # Fold and accumulate the image
+        self.hist.add(np.mod(t - self.t_cross, self.nui*T), y)
+
+        # Levels at the eye center
+        center = np.abs(np.mod(t - self.t_cross, T) - T/2) <= self.center_window*T/2
+        y_center = y[center]
+        self.ones.add(y_center[y_center > self.threshold])
+        self.zeros.add(y_center[y_center <= self.threshold])
+        if self.ones.n > 0 and self.zeros.n > 0:
+            self.threshold = 0.5*(self.ones.mean() + self.zeros.mean())
+
+        self.nrecords += 1
+
+    # Eye measurements from the accumulated statistics
+    def metrics(self):
+        mu1 = self.ones.mean()
+        mu0 = self.zeros.mean()
+        s1 = self.ones.std()
+        s0 = self.zeros.std()
+        q = (mu1 - mu0)/(s1 + s0) if (s1 + s0) > 0 else np.inf
+        jitter_pp = self.crossings.ptp()
+        return {"height": (mu1 - 3*s1) - (mu0 + 3*s0),
+                "amplitude": mu1 - mu0,
+                "width": self.period - jitter_pp,
+                "jitter_rms": self.crossings.std(),
+                "jitter_pp": jitter_pp,
+                "q": q,
+                "records": self.nrecords}
+
+    # Eye image (normalized) and its extent in symbol periods (UI)
+    def image(self):
+        return self.hist.image()
+
+    def extent(self):
+        return [0.0, float(self.nui), self.hist.ylims[0], self.hist.ylims[1]]
@@ -0,0 +1,257 @@
+# Bench graph scheduler
+# Nodes and edges are read from the set_inputs wiring (attributes named input_*, holding objects with output_*
+# methods, or lists of them), sorted once, and each frame is evaluated in one forward pass: every output_* call is
+# memoized for the frame, keyed by its arguments and the node's parameters, and timed per node
+# Memoized arrays are shared by every caller of the frame, so they are handed out read-only: nodes that edit their
+# input in place take a writable() copy first
+# Default time unit: 1 s
+
+# Imports
+import time, threading
+import numpy as np
+
+
+# Objects that can be pulled from (anything with output_* methods)
+def is_node(obj):
+    return obj is not None and not isinstance(obj, (str, bytes, np.ndarray)) and \
+        any(name.startswith("output_") and callable(getattr(type(obj), name, None)) for name in dir(type(obj)))
+
+
+# Upstream objects of a node, from its input_* attributes
+def node_inputs(obj):
+    inputs = []
+    for name in dir(obj):
+        if not name.startswith("input_"):
+            continue
+        value = getattr(obj, name)
+        for item in (value if isinstance(value, (list, tuple)) else [value]):
+            if is_node(item) and not any(item is other for other in inputs):
+                inputs.append(item)
+    return inputs
+
+
+# Ids of the nodes upstream of obj (itself included), not going through the exclude objects
+def upstream_nodes(obj, exclude=()):
+    skip = {id(item) for item in exclude}
+    seen = {id(obj)}
+    if id(obj) in skip:
+        return seen
+    todo = [obj]
+    while todo:
+        for item in node_inputs(todo.pop()):
+            if id(item) not in seen and id(item) not in skip:
+                seen.add(id(item))
+                todo.append(item)
+    return seen
+
+
+# Split objects into groups with no upstream node in common (returns lists of indices), so each group can be
+# evaluated on its own thread while the ones sharing nodes stay sequential
+def independent_groups(objs, exclude=()):
+    groups = []
+    for i, obj in enumerate(objs):
+        nodes = upstream_nodes(obj, exclude)
+        members = [i]
+        for group in [g for g in groups if g[1] & nodes]:
+            groups.remove(group)
+            members = group[0] + members
+            nodes = nodes | group[1]
+        groups.append((sorted(members), nodes))
+    return [group[0] for group in groups]
+
+
+# Attributes that change on every call without changing what the node computes (frame counters, soft locks): each
+# class lists its own in a volatile class attribute
+def volatile_attributes(obj):
+    return tuple(getattr(obj, "volatile", ()))
+
+
+# Phase and time references, set from the clock when a node is built: part of what a frame computes (triggers set
+# them), but never part of a bench's identity across runs (see tools.sweep)
+clock_attributes = ("t0", "tref")
+
+
+# Parameters of a node (scalar attributes, volatile ones excluded): calls only share a result while these are unchanged
+def node_params(obj):
+    skip = volatile_attributes(obj)
+    return tuple((k, v) for k, v in vars(obj).items()
+                 if k not in skip and isinstance(v, (bool, int, float, str, np.generic)))
+
+
+# Read-only views of returned data, so in-place edits downstream never reach the memoized results
+def freeze(value):
+    if isinstance(value, np.ndarray):
+        value = value.view()
+        value.flags.writeable = False
+        return value
+    if isinstance(value, tuple):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, list):
+        return [freeze(v) for v in value]
+    return value
+
+
+# An input array a node can edit in place: itself, or a copy when it is a (read-only) memoized result
+def writable(array):
+    return array if array.flags.writeable else array.copy()
+
+
+# Per-node counters
+class NodeStats():
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.time = 0.0  # Own time, upstream calls excluded
+
+
+# Explicit graph of a bench, built from its sinks (the instruments that pull)
+class BenchGraph():
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self.nodes = []
+        self.edges = []
+        self.feedback = []  # Edges closing a cycle (parameter pulls back into a sink), left out of the order
+        self.stats = {}
+        self.pulls = []
+        self.groups = {}
+        self.memo = {}
+        self.local = threading.local()  # Per-thread call stack, for the own-time accounting
+        self.installed = False
+        self.build()
+
+    # Discover nodes and edges, and sort them (depth-first post-order from the sinks: inputs come first)
+    def build(self):
+        order = []
+        state = {}  # id -> 1 (visiting), 2 (done)
+
+        def visit(obj):
+            state[id(obj)] = 1
+            for item in node_inputs(obj):
+                self.edges.append((item, obj))
+                if state.get(id(item)) == 1:
+                    self.feedback.append((item, obj))
+                elif id(item) not in state:
+                    visit(item)
+            state[id(obj)] = 2
+            order.append(obj)
+
+        for sink in self.sinks:
+            if id(sink) not in state:
+                visit(sink)
+        self.nodes = order
+        self.rank = {id(obj): i for i, obj in enumerate(order)}
+        self.stats = {id(obj): NodeStats() for obj in order}
+
+        # Nodes upstream of each sink (including itself), so a sink's frame only evaluates its own branch
+        self.upstream = {id(sink): upstream_nodes(sink) for sink in self.sinks}
+
+    # Wrap the output_* methods of every node, and hook the sinks (their measLoop calls run() when bench_graph is set)
+    def install(self):
+        if self.installed:
+            return self
+        for obj in self.nodes:
+            for name in dir(type(obj)):
+                if name.startswith("output_") and callable(getattr(type(obj), name, None)):
+                    # The class method (bound here), not getattr(obj, name), which may be another graph's wrapper
+                    setattr(obj, name, self.wrap(obj, name, getattr(type(obj), name).__get__(obj)))
+        for sink in self.sinks:
+            sink.bench_graph = self
+        self.installed = True
+        return self
+
+    def uninstall(self):
+        for obj in self.nodes:
+            for name in [n for n in vars(obj) if n.startswith("output_")]:
+                delattr(obj, name)
+        for sink in self.sinks:
+            sink.bench_graph = None
+        self.installed = False
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def wrap(self, obj, name, method):
+        stats = self.stats[id(obj)]
+
+        def output(*args, **kwargs):
+            call = (id(obj), name, args, tuple(sorted(kwargs.items())))
+            key = call + (node_params(obj),)
+            try:
+                hash(key)
+            except TypeError:
+                return method(*args, **kwargs)
+            if key in self.memo:
+                stats.hits += 1
+                return self.memo[key]
+
+            stack = self.stack()
+            stack.append(0.0)
+            t0 = time.perf_counter()
+            try:
+                result = freeze(method(*args, **kwargs))
+            finally:
+                elapsed = time.perf_counter() - t0
+                upstream = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            stats.calls += 1
+            stats.time += elapsed - upstream
+
+            # Parameters the call updated itself (e.g. read from its inputs) are part of this result too
+            self.memo[key] = self.memo[call + (node_params(obj),)] = result
+            pull = (obj, name, args, kwargs)
+            if not any(p[0] is obj and p[1:] == pull[1:] for p in self.pulls):
+                self.pulls.append(pull)
+            return result
+
+        return output
+
+    # One frame: forget the last results, start a new frame on the sources that keep one (e.g. the QAM source, which
+    # serves its I and Q outputs from one frame) and evaluate the pulls seen so far, inputs first
+    # (the sink then reads everything from the memo, unless a node's parameters changed in between: sinks call this
+    # after setting their own state on their inputs, e.g. the trigger phase)
+    # With a pool (concurrent.futures executor), pulls with no upstream node in common are evaluated on its workers,
+    # each group in one sequential pass, so nodes shared by several pulls still run once
+    def run(self, sink=None, pool=None):
+        self.memo = {}
+        self.pulls.sort(key=lambda p: self.rank.get(id(p[0]), -1))
+        branch = self.upstream.get(id(sink)) if sink is not None else None
+        for obj in self.nodes:
+            if hasattr(obj, "new_frame") and (branch is None or id(obj) in branch):
+                obj.new_frame()
+        pulls = [pull for pull in self.pulls if branch is None or id(pull[0]) in branch]
+        groups = self.pull_groups(sink, pulls) if pool is not None else [list(range(len(pulls)))]
+
+        def evaluate(group):
+            for i in group:
+                obj, name, args, kwargs = pulls[i]
+                getattr(obj, name)(*args, **kwargs)
+
+        if len(groups) < 2:
+            for group in groups:
+                evaluate(group)
+        else:
+            list(pool.map(evaluate, groups))
+
+    # Independent groups of a branch's pulls (indices, in rank order), kept until new pulls are found
+    def pull_groups(self, sink, pulls):
+        key = (id(sink), len(pulls))
+        if key not in self.groups:
+            # Not through the sinks that close a feedback edge (instruments whose settings their sources pull)
+            loops = [item for item, obj in self.feedback]
+            self.groups[key] = independent_groups([pull[0] for pull in pulls], exclude=loops)
+        return self.groups[key]
+
+    # Per-node timing table
+    def report(self):
+        lines = [f"{'Node':<32}{'Calls':>8}{'Hits':>8}{'Time (ms)':>12}"]
+        for obj in self.nodes:
+            stats = self.stats[id(obj)]
+            lines.append(f"{type(obj).__name__:<32}{stats.calls:>8}{stats.hits:>8}{stats.time*1e3:>12.2f}")
+        return "\n".join(lines)
+
+    def reset_stats(self):
+        for stats in self.stats.values():
+            stats.__init__()
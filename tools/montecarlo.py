@@ -0,0 +1,124 @@
+# Monte-Carlo runner
+# A bench definition is a pair of module-level functions (so they pickle by reference): build() returns the bench
+# (any object, e.g. a dict of headless components) and measure(bench, rng) runs one realization and returns a dict of
+# results. Each worker process builds its bench once, runs chunks of realizations with independent RNG streams
+# (SeedSequence children) and reduces them locally, so only the reductions travel back
+# Large read-only inputs (e.g. a laser spectrum) can be passed as shared: they are placed in shared memory once, and
+# build(shared) gets views on them instead of one pickled copy per worker (see tools.shm)
+# Default time unit: 1 s
+
+# Imports
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from tools.stats import RunningStats
+from tools.shm import SharedArrays, unpack
+
+
+# Fixed-range histogram that can be merged
+class Histogram():
+    def __init__(self, bins, range):
+        self.edges = np.linspace(range[0], range[1], bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        self.counts += np.histogram(values, self.edges)[0]
+        self.under += np.count_nonzero(values < self.edges[0])
+        self.over += np.count_nonzero(values > self.edges[-1])
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.under += other.under
+        self.over += other.over
+
+    def centers(self):
+        return 0.5*(self.edges[1:] + self.edges[:-1])
+
+
+# Default reduction: running statistics for every result key, element-wise sums for array results, and optional
+# histograms ({key: (bins, range)})
+class Reduction():
+    def __init__(self, histograms=None):
+        self.histogram_specs = histograms or {}
+        self.stats = {}
+        self.sums = {}
+        self.histograms = {key: Histogram(*spec) for key, spec in self.histogram_specs.items()}
+        self.nrealizations = 0
+
+    def add(self, result):
+        self.nrealizations += 1
+        for key, value in result.items():
+            if key in self.histograms:
+                self.histograms[key].add(value)
+            if np.ndim(value) > 0:
+                self.sums[key] = self.sums[key] + value if key in self.sums else np.array(value, dtype=float)
+            self.stats.setdefault(key, RunningStats()).add(value)
+
+    def merge(self, other):
+        self.nrealizations += other.nrealizations
+        for key, value in other.sums.items():
+            self.sums[key] = self.sums[key] + value if key in self.sums else value
+        for key, stats in other.stats.items():
+            self.stats.setdefault(key, RunningStats()).merge(stats)
+        for key, hist in other.histograms.items():
+            self.histograms[key].merge(hist)
+
+    def mean(self, key):
+        if key in self.sums:
+            return self.sums[key]/self.nrealizations
+        return self.stats[key].mean()
+
+
+# Worker side: one bench per process
+_bench = None
+
+
+def _init_worker(build, shared=None):
+    global _bench
+    _bench = build() if shared is None else build(unpack(shared))
+
+
+def _run_chunk(measure, seeds, reduction):
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        seed_bench(_bench, rng)
+        reduction.add(measure(_bench, rng))
+    return reduction
+
+
+# Give every component with an rng attribute its own stream from the realization's generator (components still
+# using the global numpy RNG get a derived seed too)
+def seed_bench(bench, rng):
+    objs = bench.values() if isinstance(bench, dict) else (bench if isinstance(bench, (list, tuple)) else [bench])
+    for obj in objs:
+        if hasattr(obj, "rng"):
+            obj.rng = np.random.default_rng(rng.integers(2**63))
+    np.random.seed(rng.integers(2**32))
+
+
+# Run nrealizations of a bench, returning the merged reduction
+# reduction is a picklable zero-argument factory (Reduction, or functools.partial(Reduction, histograms=...)), and
+# each realization only depends on seed and its index, not on the number of workers (workers=1 runs here)
+# shared is a dict (or list) of arrays handed to build, see above
+def run_montecarlo(build, measure, nrealizations, reduction=Reduction, seed=None, workers=None, chunksize=None,
+                   shared=None):
+    seeds = np.random.SeedSequence(seed).spawn(nrealizations)
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        _init_worker(build, shared)
+        return _run_chunk(measure, seeds, reduction())
+
+    chunksize = chunksize or max(1, int(np.ceil(nrealizations/(4*workers))))
+    chunks = [seeds[i:i + chunksize] for i in range(0, nrealizations, chunksize)]
+    total = reduction()
+    with SharedArrays() as store:
+        packed = None if shared is None else store.pack(shared)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(build, packed)) as pool:
+            futures = [pool.submit(_run_chunk, measure, chunk, reduction()) for chunk in chunks]
+            for future in futures:
+                total.merge(future.result())
+    return total
@@ -0,0 +1,104 @@
+# OTDR trace engine
+# Rayleigh backscatter and point reflections along a fiber are built as an impulse response over distance,
+# convolved with the launched pulse (FFT), clipped by the receiver and averaged over N noisy shots
+# Default length unit: km (traces are sampled in m internally)
+# Default time unit: 1 ns
+# Default power unit: dBm in, W out
+
+# Imports
+import numpy as np
+from scipy.signal import fftconvolve
+
+# Constants
+c = 299792458.0
+
+
+# Backscatter model of a fiber seen from one end
+# Events are given as a (3, n) array: position (km), one-way loss (dB), reflectance (dB, nan when not reflective)
+# att can also be an array along z, and a precomputed one-way loss profile (dB, events included) can replace the
+# one built here from att and the event losses (see components.link)
+class OTDREngine():
+    def __init__(self, fiber_n=1.45, capture=1.5e-3, scatter_fraction=0.8, end_reflectance=-14.7,
+                 front_reflectance=-45.0, nep=2e-15, saturation=1e-4, max_batch=2**22, rng=None):
+        self.fiber_n = fiber_n
+        self.capture = capture                    # Fraction of the scattered light guided back
+        self.scatter_fraction = scatter_fraction  # Rayleigh part of the fiber attenuation
+        self.end_reflectance = end_reflectance    # Fresnel reflection of a cleaved end (dB)
+        self.front_reflectance = front_reflectance  # Front panel connector reflection (dB)
+        self.nep = nep                            # Receiver noise equivalent power (W/sqrt(Hz))
+        self.saturation = saturation              # Receiver saturation power (W)
+        self.max_batch = max_batch                # Samples drawn per noise batch when averaging
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    # Pulse length in fiber (m), already halved for the round trip
+    def pulse_length(self, pulsew):
+        return 0.5*pulsew*1e-9*c/self.fiber_n
+
+    # Launched pulse sampled on the trace grid (rectangular, unit peak)
+    def pulse_shape(self, pulsew, dz):
+        return np.ones(max(int(np.rint(self.pulse_length(pulsew)/dz)), 1))
+
+    # Receiver noise per shot (W rms), with the bandwidth matched to the pulse
+    def noise_rms(self, pulsew):
+        return self.nep*np.sqrt(1.0/(pulsew*1e-9))
+
+    # Noiseless trace (W) at positions z (km, uniform grid starting at 0)
+    def backscatter(self, z, power, pulsew, length, att, events=None, loss=None):
+        npoints = len(z)
+        dz = (z[1] - z[0])*1000.0 if npoints > 1 else 1.0
+        p0 = 1e-3*10**(power/10.0)
+        inside = z < length
+
+        # One-way loss along the fiber, event losses are steps starting at each event
+        has_events = events is not None and len(events[0]) > 0
+        if has_events:
+            locs = np.clip(np.rint(events[0]*1000.0/dz).astype(int), 0, npoints)
+        if loss is None:
+            loss = att*np.minimum(z, length)
+            if has_events:
+                steps = np.zeros([npoints + 1])
+                np.add.at(steps, locs, events[1])
+                loss = loss + np.cumsum(steps)[:npoints]
+        round_trip = 10**(-2.0*loss/10.0)
+
+        # Rayleigh backscatter density per sample (inside the fiber only)
+        alpha_s = self.scatter_fraction*att/(10.0*np.log10(np.e)*1000.0)
+        impulse = np.where(inside, p0*self.capture*alpha_s*dz*round_trip, 0.0)
+
+        # Reflections (the loss of the event itself comes after it)
+        if has_events:
+            refl = ~np.isnan(events[2]) & (locs < npoints)
+            rlocs = locs[refl]
+            before = 10**(-2.0*(loss[rlocs] - events[1][refl])/10.0)
+            np.add.at(impulse, rlocs, p0*10**(events[2][refl]/10.0)*before)
+        impulse[0] += p0*10**(self.front_reflectance/10.0)
+
+        # The cleaved end, unless the events already put a reflection there (e.g. a link's end reflector)
+        end = int(np.rint(length*1000.0/dz))
+        if end < npoints and not (has_events and np.any(rlocs == end)):
+            impulse[end] += p0*10**(self.end_reflectance/10.0)*round_trip[end]
+
+        # Pulse convolution (causal: each contribution lasts one pulse length after its position)
+        trace = fftconvolve(impulse, self.pulse_shape(pulsew, dz))[:npoints]
+        return np.minimum(trace, self.saturation)
+
+    # Average of N shots (W): the noiseless trace plus receiver noise, drawn in batches of shots
+    def acquire(self, z, power, pulsew, length, att, events=None, averages=1, loss=None):
+        trace = self.backscatter(z, power, pulsew, length, att, events, loss)
+        npoints = len(trace)
+        averages = max(int(averages), 1)
+        batch = int(np.clip(self.max_batch//max(npoints, 1), 1, averages))
+
+        noise = np.zeros([npoints])
+        done = 0
+        while done < averages:
+            n = min(batch, averages - done)
+            noise += self.rng.standard_normal((n, npoints), dtype=np.float32).sum(axis=0)
+            done += n
+
+        return trace + self.noise_rms(pulsew)*noise/averages
+
+    # Trace in OTDR units (5log10, so slopes read as one-way dB/km)
+    @staticmethod
+    def to_db(trace):
+        return 5.0*np.log10(np.maximum(np.abs(trace), 1e-30))
@@ -0,0 +1,239 @@
+# Per-node profiler
+# Wraps the input_* and output_* methods of every node of a bench (found from the set_inputs wiring, as in tools.graph)
+# with timers and, optionally, tracemalloc allocation counters. Instruments with a profiler attribute call
+# begin_frame/end_frame from their measLoop, so counters are also aggregated per frame, the rest of the measLoop
+# (processing and drawing) is counted as the instrument's own "measLoop" time, and the slowest nodes of the last frame
+# can be shown as a text overlay on the instrument graph
+# Default time unit: 1 s
+
+# Imports
+import time, threading, tracemalloc
+from collections import deque
+from tools.graph import node_inputs
+
+# Overlay style
+overlay_lines = 6
+overlay_style = {"fontsize": 7, "family": "monospace", "va": "top", "ha": "left", "color": "black",
+                 "bbox": {"facecolor": "white", "alpha": 0.7, "edgecolor": "none"}}
+
+
+# All nodes feeding the sinks (sinks included), in discovery order
+def find_nodes(sinks):
+    nodes = []
+    seen = set()
+    todo = list(sinks)
+    while todo:
+        obj = todo.pop(0)
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        nodes.append(obj)
+        todo.extend(node_inputs(obj))
+    return nodes
+
+
+# Methods to wrap: input_* and output_* defined on the class (input_*_obj attributes are references, not methods)
+def profiled_methods(obj):
+    return [name for name in dir(type(obj)) if name.startswith(("input_", "output_")) and
+            callable(getattr(type(obj), name, None))]
+
+
+# Counters of one method (or of one instrument's measLoop)
+class Counters():
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0  # Including upstream calls
+        self.own = 0.0  # Upstream calls excluded
+        self.alloc = 0  # Net bytes allocated (with memory=True)
+
+    def add(self, other):
+        self.calls += other.calls
+        self.time += other.time
+        self.own += other.own
+        self.alloc += other.alloc
+
+
+# Profiler of a bench, from its sinks (instruments) or any objects with input_*/output_* methods
+# objs is a list, or a dict of {label: object} to name the nodes
+class Profiler():
+    def __init__(self, objs, memory=False, overlay=False, history=100):
+        if isinstance(objs, dict):
+            self.labels = {id(obj): label for label, obj in objs.items()}
+            objs = list(objs.values())
+        else:
+            self.labels = {}
+        self.sinks = [obj for obj in objs if hasattr(obj, "profiler")]
+        self.nodes = find_nodes(objs)
+        self.memory = memory
+        self.overlay = overlay
+        self.totals = {}
+        self.frames = deque(maxlen=history)
+        self.frame = None
+        self.frame_t0 = 0.0
+        self.frame_mem = 0
+        self.frame_calls = 0.0  # Time in outermost profiled calls this frame, from any thread (the scope's workers too)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.saved = {}  # Instance attributes replaced by the wrappers, restored on uninstall
+        self.texts = {}  # Overlay artists, per sink
+        self.started_tracing = False
+        self.installed = False
+        self.name_nodes()
+
+    # Labels: given ones, or the class name (numbered when a class appears more than once)
+    def name_nodes(self):
+        counts = {}
+        for obj in self.nodes:
+            if id(obj) not in self.labels:
+                name = type(obj).__name__
+                counts[name] = counts.get(name, 0) + 1
+                self.labels[id(obj)] = name if counts[name] == 1 else f"{name}#{counts[name]}"
+
+    def install(self):
+        if self.installed:
+            return self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        for obj in self.nodes:
+            for name in profiled_methods(obj):
+                # Wrap what is there now (e.g. a bench graph wrapper), so the profiler sees every call
+                self.saved[(id(obj), name)] = (obj, name, vars(obj).get(name))
+                setattr(obj, name, self.wrap(f"{self.labels[id(obj)]}.{name}", getattr(obj, name)))
+        for sink in self.sinks:
+            sink.profiler = self
+        self.installed = True
+        return self
+
+    def uninstall(self):
+        for obj, name, previous in self.saved.values():
+            if previous is None:
+                vars(obj).pop(name, None)
+            else:
+                setattr(obj, name, previous)
+        self.saved = {}
+        for sink in self.sinks:
+            sink.profiler = None
+        for text in self.texts.values():
+            text.remove()
+        self.texts = {}
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        self.installed = False
+
+    def stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def record(self, key, elapsed, upstream, alloc, toplevel=False):
+        with self.lock:
+            if toplevel and self.frame is not None:
+                self.frame_calls += elapsed
+            for table in (self.totals, self.frame):
+                if table is None:
+                    continue
+                counters = table.setdefault(key, Counters())
+                counters.calls += 1
+                counters.time += elapsed
+                counters.own += elapsed - upstream
+                counters.alloc += alloc
+
+    def wrap(self, key, method):
+        def profiled(*args, **kwargs):
+            stack = self.stack()
+            stack.append(0.0)
+            mem0 = tracemalloc.get_traced_memory()[0] if self.memory else 0
+            t0 = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                alloc = tracemalloc.get_traced_memory()[0] - mem0 if self.memory else 0
+                upstream = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                self.record(key, elapsed, upstream, alloc, toplevel=not stack)
+
+        return profiled
+
+    # Frame hooks (called from measLoop, or around any headless frame with sink=None)
+    def begin_frame(self, sink=None):
+        with self.lock:
+            self.frame = {}
+            self.frame_calls = 0.0
+        self.frame_mem = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        self.frame_t0 = time.perf_counter()
+
+    def end_frame(self, sink=None):
+        elapsed = time.perf_counter() - self.frame_t0
+        if self.frame is None:
+            return
+        if sink is not None:
+            # The measLoop itself: everything not spent in the profiled calls (processing, drawing)
+            # Calls on parallel workers can add up to more than the frame, so the rest is at least zero
+            alloc = tracemalloc.get_traced_memory()[0] - self.frame_mem if self.memory else 0
+            with self.lock:
+                calls = min(self.frame_calls, elapsed)
+            self.record(f"{self.labels.get(id(sink), type(sink).__name__)}.measLoop", elapsed, calls, alloc)
+        with self.lock:
+            self.frames.append({"time": elapsed, "nodes": self.frame})
+            self.frame = None
+        if self.overlay and sink is not None:
+            self.draw_overlay(sink)
+
+    # Stats: the last nframes frames (summed, and averaged per frame when average is set), or all calls so far
+    def stats(self, nframes=None, average=True):
+        if nframes is None:
+            return dict(self.totals)
+        frames = list(self.frames)[-nframes:]
+        result = {}
+        for frame in frames:
+            for key, counters in frame["nodes"].items():
+                result.setdefault(key, Counters()).add(counters)
+        if average and frames:
+            for counters in result.values():
+                counters.calls /= len(frames)
+                counters.time /= len(frames)
+                counters.own /= len(frames)
+                counters.alloc /= len(frames)
+        return result
+
+    # Average frame time over the last nframes
+    def frame_time(self, nframes=None):
+        frames = list(self.frames)[-nframes:] if nframes else list(self.frames)
+        return sum(frame["time"] for frame in frames)/len(frames) if frames else 0.0
+
+    # Text table, slowest (own time) first
+    def report(self, nframes=None, limit=None):
+        stats = sorted(self.stats(nframes).items(), key=lambda item: -item[1].own)[:limit]
+        header = f"{'Node':<44}{'Calls':>8}{'Time (ms)':>12}{'Own (ms)':>12}"
+        lines = [header + (f"{'Alloc (kB)':>12}" if self.memory else "")]
+        for key, counters in stats:
+            line = f"{key:<44}{counters.calls:>8.4g}{counters.time*1e3:>12.3f}{counters.own*1e3:>12.3f}"
+            lines.append(line + (f"{counters.alloc/1024:>12.1f}" if self.memory else ""))
+        if self.frames:
+            lines.append(f"Frame time: {self.frame_time(nframes)*1e3:.3f} ms")
+        return "\n".join(lines)
+
+    # Overlay on the instrument graph: frame rate and the slowest nodes of the last frame
+    # (drawn by the instrument's next draw)
+    def draw_overlay(self, sink):
+        ax = getattr(sink, "graph_ax", None)
+        if ax is None:
+            return
+        stats = sorted(self.stats(1).items(), key=lambda item: -item[1].own)[:overlay_lines]
+        frame = self.frame_time(1)
+        lines = [f"{1/frame if frame > 0 else 0:.1f} fps ({frame*1e3:.1f} ms)"]
+        lines += [f"{counters.own*1e3:7.2f} ms  {key}" for key, counters in stats]
+        text = self.texts.get(id(sink))
+        if text is None:
+            text = self.texts[id(sink)] = ax.text(0.01, 0.99, "", transform=ax.transAxes, zorder=10,
+                                                  **overlay_style)
+        text.set_text("\n".join(lines))
+
+    def reset(self):
+        with self.lock:
+            self.totals = {}
+            self.frames.clear()
@@ -0,0 +1,98 @@
+# Fiber propagation
+# The intensity waveform is taken as a chirp-free field (sqrt of the power). Linear dispersion is a phase filter on
+# its FFT, cached per record grid and fiber parameters, and Kerr nonlinearity uses the symmetric split-step Fourier
+# method with steps sized by the peak nonlinear phase
+# Default time unit: 1 s
+# Default length unit: km
+# Default wavelength unit: nm
+# Default power unit: W
+
+# Imports
+import numpy as np
+from scipy.fft import fft, ifft, fftfreq
+
+# Constants
+c = 299792458.0
+db_per_neper = 10.0*np.log10(np.e)  # Power attenuation in dB for 1 Np
+
+
+# Propagation constants (s^2/km, s^3/km) from the dispersion D (ps/(nm km)) and its slope S (ps/(nm^2 km))
+def beta_coefficients(wavelength, disp, slope=0.0):
+    wl = wavelength*1e-9
+    k = wl**2/(2*np.pi*c)
+    beta2 = -k*disp*1e-6
+    beta3 = k**2*(slope*1e3 + 2*disp*1e-6/wl)
+    return beta2*1e3, beta3*1e3
+
+
+# Linear operator exponent per km, on the FFT frequency grid (numpy sign convention), loss included as field decay
+def linear_operator(freqs, wavelength, disp, slope=0.0, att=0.0):
+    beta2, beta3 = beta_coefficients(wavelength, disp, slope)
+    w = 2*np.pi*freqs
+    return 1j*(0.5*beta2*w**2 - beta3*w**3/6.0) - 0.5*att/db_per_neper
+
+
+# Field propagator, keeping the last few linear transfer functions
+class Propagator():
+    def __init__(self, max_cached=8, max_phase=0.01, max_steps=1000):
+        self.max_cached = max_cached
+        self.max_phase = max_phase  # Peak nonlinear phase per split step (rad)
+        self.max_steps = max_steps  # Lower bound on the step size is length/max_steps
+        self.cache = {}
+
+    # Transfer function for the whole length, cached by (npoints, dt, length, wavelength, disp, slope, att)
+    def transfer_function(self, npoints, dt, length, wavelength, disp, slope=0.0, att=0.0):
+        key = (npoints, dt, length, wavelength, disp, slope, att)
+        h = self.cache.get(key)
+        if h is None:
+            h = np.exp(linear_operator(fftfreq(npoints, dt), wavelength, disp, slope, att)*length)
+            if len(self.cache) >= self.max_cached:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[key] = h
+        return h
+
+    # Linear propagation of a complex field
+    def linear(self, field, dt, length, wavelength, disp, slope=0.0, att=0.0):
+        h = self.transfer_function(len(field), dt, length, wavelength, disp, slope, att)
+        return ifft(fft(field, workers=-1)*h, workers=-1)
+
+    # Split-step Fourier propagation with Kerr nonlinearity gamma (1/(W km))
+    # Steps are sized so the peak nonlinear phase stays under max_phase (they grow as the power decays), and the
+    # linear half steps of consecutive steps are merged, so each step costs one FFT/IFFT pair
+    def split_step(self, field, dt, length, wavelength, disp, slope=0.0, att=0.0, gamma=1.3):
+        op = linear_operator(fftfreq(len(field), dt), wavelength, disp, slope, att)
+        alpha = att/db_per_neper
+        min_step = length/self.max_steps
+
+        def next_step(peak, z):
+            step = self.max_phase/(gamma*peak) if gamma*peak > 0 else length
+            return min(max(step, min_step), length - z)
+
+        def linear_step(field, dz):
+            return ifft(fft(field, workers=-1)*np.exp(op*dz), workers=-1)
+
+        z = 0.0
+        step = next_step(np.max(np.abs(field)**2), z)
+        field = linear_step(field, 0.5*step)
+        while True:
+            power = np.abs(field)**2
+            step_eff = (1.0 - np.exp(-alpha*step))/alpha if alpha > 0 else step
+            field = field*np.exp(1j*gamma*power*step_eff)
+            z += step
+            if z >= length - 1e-12*length:
+                return linear_step(field, 0.5*step)
+            new_step = next_step(np.max(power)*np.exp(-alpha*step), z)
+            field = linear_step(field, 0.5*(step + new_step))
+            step = new_step
+
+    # Propagate an intensity waveform (time array and power), returning the output power
+    def propagate(self, t, power, length, att, wavelength, disp, slope=0.0, gamma=0.0):
+        if len(t) < 2:
+            return power*10**(-att*length/10.0)
+        dt = t[1] - t[0]
+        field = np.sqrt(np.maximum(power, 0.0))
+        if gamma > 0:
+            field = self.split_step(field, dt, length, wavelength, disp, slope, att, gamma)
+        else:
+            field = self.linear(field, dt, length, wavelength, disp, slope, att)
+        return np.abs(field)**2
@@ -0,0 +1,102 @@
+# Shared-memory array transport
+# Large arrays (spectra, records, batch outputs) are copied once into multiprocessing.shared_memory blocks, and only
+# small descriptors (block name, shape, dtype) travel between processes. The process that shares a block owns it and
+# unlinks it on close; other processes attach numpy views on the same memory, with no pickling of the data
+# Small arrays are left as they are, since a block costs more than pickling them
+
+# Imports
+import numpy as np
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker
+
+# Arrays smaller than this are passed by value
+min_shared_bytes = 1 << 20
+
+# What travels between processes instead of the array
+ArrayDescriptor = namedtuple("ArrayDescriptor", ["name", "shape", "dtype"])
+
+# Blocks attached by this process (name -> SharedMemory), kept open while their views are in use
+_attached = {}
+
+
+# Numpy view of a shared block (read-only unless writable is set: the block is shared by every process using it)
+def attach(desc, writable=False):
+    block = _attached.get(desc.name)
+    if block is None:
+        try:
+            block = shared_memory.SharedMemory(name=desc.name, track=False)
+        except TypeError:
+            # Before Python 3.13 attaching also registers the block, and the tracker would unlink it when this
+            # process exits, under the owner's feet
+            block = shared_memory.SharedMemory(name=desc.name)
+            resource_tracker.unregister(block._name, "shared_memory")
+        _attached[desc.name] = block
+    array = np.ndarray(desc.shape, dtype=np.dtype(desc.dtype), buffer=block.buf)
+    array.flags.writeable = writable
+    return array
+
+
+# Close the blocks attached by this process (views on them must not be used afterwards)
+def detach(names=None):
+    for name in list(_attached if names is None else names):
+        block = _attached.pop(name, None)
+        if block is not None:
+            block.close()
+
+
+# Replace descriptors by views, in nested dicts, lists and tuples
+def unpack(obj, writable=False):
+    if isinstance(obj, ArrayDescriptor):
+        return attach(obj, writable)
+    if isinstance(obj, dict):
+        return {key: unpack(value, writable) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [unpack(value, writable) for value in obj]
+    if isinstance(obj, tuple) and not hasattr(obj, "_fields"):
+        return tuple(unpack(value, writable) for value in obj)
+    return obj
+
+
+# Owner of a set of shared blocks (use as a context manager, or call close)
+class SharedArrays():
+    def __init__(self, min_bytes=min_shared_bytes):
+        self.min_bytes = min_bytes
+        self.blocks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Copy an array into a new block, returning its descriptor
+    def put(self, array):
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self.blocks[block.name] = block
+        return ArrayDescriptor(block.name, array.shape, array.dtype.str)
+
+    # Replace the large arrays by descriptors, in nested dicts, lists and tuples
+    def pack(self, obj):
+        if isinstance(obj, np.ndarray):
+            return self.put(obj) if obj.nbytes >= self.min_bytes and obj.dtype != object else obj
+        if isinstance(obj, dict):
+            return {key: self.pack(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [self.pack(value) for value in obj]
+        if isinstance(obj, tuple) and not hasattr(obj, "_fields"):
+            return tuple(self.pack(value) for value in obj)
+        return obj
+
+    # Free one block (by descriptor), once no process needs it anymore
+    def release(self, desc):
+        block = self.blocks.pop(desc.name, None)
+        if block is not None:
+            detach([desc.name])
+            block.close()
+            block.unlink()
+
+    def close(self):
+        for name in list(self.blocks):
+            self.release(ArrayDescriptor(name, (), ""))
@@ -0,0 +1,47 @@
+# Streaming statistics helpers
+# Keep only running sums, so measurements can be updated frame by frame without storing old data
+
+# Imports
+import numpy as np
+
+
+# Count, sum, sum of squares, min and max of everything added so far
+class RunningStats():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.sum = 0.0
+        self.sumsq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    # Add a chunk of values
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) > 0:
+            self.n += len(values)
+            self.sum += values.sum()
+            self.sumsq += np.dot(values, values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+
+    # Merge another accumulator (e.g. computed in another thread or process)
+    def merge(self, other):
+        self.n += other.n
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def mean(self):
+        return self.sum/self.n if self.n > 0 else np.nan
+
+    def std(self):
+        if self.n < 1:
+            return np.nan
+        return np.sqrt(max(self.sumsq/self.n - self.mean()**2, 0.0))
+
+    def ptp(self):
+        return self.max - self.min if self.n > 0 else np.nan
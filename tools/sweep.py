@@ -0,0 +1,178 @@
+# Parameter sweeps
+# A sweep takes a bench definition (module-level build()/measure(bench, rng), as in tools.montecarlo) and a grid of
+# parameters addressed as "component.attribute" (keys of the dict returned by build), e.g.
+# {"fiber1.length": [5, 10, 20], "eo_qam.v_offs": [1.0, 1.4]}. A tuple of paths is one axis of linked parameters, set
+# together (e.g. {("fiber1.length", "fiber2.length"): [5, 10, 20]}). Every point of the grid is a Monte-Carlo run, and
+# its summary is cached on disk under a hash of the bench parameters at that point, the seed and the number of
+# realizations, so running the sweep again (or with extra points) only computes what is missing
+# Default time unit: 1 s
+
+# Imports
+import os, json, itertools
+import numpy as np
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from tools.evm import config_key
+from tools.montecarlo import run_montecarlo, Reduction
+from tools.graph import volatile_attributes, clock_attributes
+
+
+# Scalar parameters of a component (class defaults included)
+def component_params(obj):
+    params = {}
+    skip = volatile_attributes(obj) + clock_attributes  # Left out of the cache keys
+    for name in dir(obj):
+        if name.startswith("_") or name in skip:
+            continue
+        value = getattr(obj, name, None)
+        if isinstance(value, (bool, int, float, str, np.generic)):
+            params[name] = value.item() if isinstance(value, np.generic) else value
+    return params
+
+
+# Scalar parameters of every component of a bench
+def bench_params(bench):
+    return {key: component_params(obj) for key, obj in bench.items() if not isinstance(obj, (int, float, str))}
+
+
+# Paths of a grid axis: "component.attribute", or a tuple of them (linked parameters)
+def axis_paths(axis):
+    return axis if isinstance(axis, tuple) else (axis,)
+
+
+# Name of a grid axis (linked parameters joined with "+"), for tables and cache files
+def axis_name(axis):
+    return "+".join(axis_paths(axis))
+
+
+# Apply a grid point ({"component.attribute": value}, or {(linked paths): value}) to a bench
+def apply_point(bench, point):
+    for axis, value in point.items():
+        for path in axis_paths(axis):
+            key, name = path.split(".", 1)
+            if not hasattr(bench[key], name):
+                raise AttributeError(f"{type(bench[key]).__name__} ({key}) has no parameter {name}")
+            setattr(bench[key], name, value)
+    return bench
+
+
+def _build_point(build, point):
+    return apply_point(build(), point)
+
+
+# Summary of a reduction, as plain JSON data: statistics of scalar results, means of array results
+def summarize(reduction):
+    results = {}
+    for key, stats in reduction.stats.items():
+        if key in reduction.sums:
+            results[key] = {"mean": (reduction.sums[key]/reduction.nrealizations).tolist()}
+        else:
+            results[key] = {"mean": float(stats.mean()), "std": float(stats.std()), "min": float(stats.min),
+                            "max": float(stats.max)}
+    return results
+
+
+# One grid point, run start to end (on a sweep worker, so its realizations run sequentially)
+def _run_point(build, measure, point, nrealizations, seed, reduction):
+    results = run_montecarlo(partial(_build_point, build, point), measure, nrealizations, reduction=reduction,
+                             seed=seed, workers=1)
+    return summarize(results)
+
+
+# Results of a sweep, in grid order
+class SweepResult():
+    def __init__(self, grid, points, results):
+        self.grid = grid
+        self.points = points
+        self.results = results
+
+    # One statistic of one result over the grid, shaped (len(values of 1st parameter), len(2nd), ...)
+    def values(self, key, stat="mean"):
+        shape = tuple(len(values) for values in self.grid.values())
+        data = np.array([result[key][stat] for result in self.results])
+        return data.reshape(shape + data.shape[1:])
+
+    # Text table (one line per point)
+    def table(self, keys=None, stat="mean"):
+        keys = keys or (list(self.results[0].keys()) if self.results else [])
+        axes = list(self.grid.keys())
+        lines = ["\t".join([axis_name(axis) for axis in axes] + [f"{key} ({stat})" for key in keys])]
+        for point, result in zip(self.points, self.results):
+            row = [f"{point[axis]:g}" if isinstance(point[axis], float) else str(point[axis]) for axis in axes]
+            row += [f"{result[key][stat]:.6g}" if np.ndim(result[key][stat]) == 0 else "[...]" for key in keys]
+            lines.append("\t".join(row))
+        return "\n".join(lines)
+
+
+# Sweep engine
+class Sweep():
+    def __init__(self, build, measure, nrealizations=100, seed=None, reduction=Reduction, cache_dir=None,
+                 workers=None):
+        self.build = build
+        self.measure = measure
+        self.nrealizations = nrealizations
+        self.seed = seed
+        self.reduction = reduction
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.computed = 0  # Points evaluated by the last run (the others came from the cache)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # Cache key of a point: everything its result depends on
+    # (the same seed is used at every point, so neighbouring points see the same noise and differences are smooth)
+    def key(self, params):
+        return config_key({"bench": f"{self.build.__module__}.{self.build.__qualname__}",
+                           "measure": f"{self.measure.__module__}.{self.measure.__qualname__}",
+                           "params": params, "seed": self.seed, "nrealizations": self.nrealizations})
+
+    def cache_file(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json") if self.cache_dir else None
+
+    def load(self, key):
+        filename = self.cache_file(key)
+        if filename and os.path.isfile(filename):
+            with open(filename, "r") as file:
+                return json.load(file)["results"]
+        return None
+
+    def store(self, key, point, params, results):
+        filename = self.cache_file(key)
+        if filename:
+            entry = {"point": {axis_name(axis): value for axis, value in point.items()}, "params": params,
+                     "seed": self.seed, "nrealizations": self.nrealizations, "results": results}
+            with open(filename + ".tmp", "w") as file:
+                json.dump(entry, file, default=str)
+            os.replace(filename + ".tmp", filename)
+
+    # Evaluate every point of grid ({"component.attribute" or (linked paths): values}), returning a SweepResult
+    def run(self, grid):
+        grid = {path: list(values) for path, values in grid.items()}
+        points = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+
+        # Parameters (and keys) of every point, read from one reference bench
+        bench = self.build()
+        keys, params = [], []
+        for point in points:
+            params.append(bench_params(apply_point(bench, point)))
+            keys.append(self.key(params[-1]))
+        del bench
+
+        # Cached points first, then the missing ones (points in parallel, their realizations sequential)
+        results = [self.load(key) for key in keys]
+        todo = [i for i, result in enumerate(results) if result is None]
+        self.computed = len(todo)
+        if self.workers <= 1 or len(todo) <= 1:
+            for i in todo:
+                results[i] = _run_point(self.build, self.measure, points[i], self.nrealizations, self.seed,
+                                        self.reduction)
+                self.store(keys[i], points[i], params[i], results[i])
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(todo))) as pool:
+                futures = {i: pool.submit(_run_point, self.build, self.measure, points[i], self.nrealizations,
+                                          self.seed, self.reduction) for i in todo}
+                for i, future in futures.items():
+                    results[i] = future.result()
+                    self.store(keys[i], points[i], params[i], results[i])
+
+        return SweepResult(grid, points, results)
@@ -0,0 +1,63 @@
+# Transfer-function cascades
+# Linear components can expose their frequency response as transfer_function(npoints, dt, wavelength=None), returning
+# an array on the FFT grid fftfreq(npoints, dt) (or a scalar), plus transfer_key(), a hashable snapshot of the
+# parameters the response depends on. A cascade multiplies the responses once, caches the product, and applies the
+# whole chain with one FFT/IFFT pair
+# Each stage also declares transfer_domain: "optical" responses act on the field, "electrical" ones on a detected
+# waveform, and a cascade only holds stages of one domain
+# Cascades are built by hand (a Cascade component in a bench, or a component wrapping itself); nothing folds chains
+# Default time unit: 1 s
+# Default wavelength unit: nm
+
+# Imports
+import numpy as np
+from scipy.fft import fft, ifft
+
+
+# Check a component for the transfer function protocol (nonlinear components never qualify)
+def is_linear(obj):
+    return hasattr(obj, "transfer_function") and hasattr(obj, "transfer_key") and not getattr(obj, "nonlinear", False)
+
+
+# Product of the stage responses, cached by record grid, wavelength and stage parameters
+class TransferCascade():
+    def __init__(self, stages=(), max_cached=8, domain=None):
+        self.stages = []
+        self.domain = domain  # Set by the first stage when not given
+        self.max_cached = max_cached
+        self.cache = {}
+        for stage in stages:
+            self.add(stage)
+
+    def add(self, stage):
+        if not is_linear(stage):
+            raise ValueError(f"{type(stage).__name__} does not expose a linear transfer function")
+        domain = getattr(stage, "transfer_domain", None)
+        if domain is None:
+            raise ValueError(f"{type(stage).__name__} does not declare a transfer_domain")
+        if self.domain is None:
+            self.domain = domain
+        elif domain != self.domain:
+            raise ValueError(f"{type(stage).__name__} is an {domain} stage, the cascade is {self.domain}")
+        self.stages.append(stage)
+        return self
+
+    def key(self, npoints, dt, wavelength=None):
+        return (npoints, dt, wavelength) + tuple(stage.transfer_key() for stage in self.stages)
+
+    def response(self, npoints, dt, wavelength=None):
+        key = self.key(npoints, dt, wavelength)
+        h = self.cache.get(key)
+        if h is None:
+            h = np.ones(npoints, dtype=complex)
+            for stage in self.stages:
+                h = h*stage.transfer_function(npoints, dt, wavelength)
+            if len(self.cache) >= self.max_cached:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[key] = h
+        return h
+
+    # Apply the whole cascade to a sampled signal (complex field or real waveform, batches along the first axes)
+    def apply(self, x, dt, wavelength=None):
+        y = ifft(fft(x, workers=-1)*self.response(np.shape(x)[-1], dt, wavelength), workers=-1)
+        return y if np.iscomplexobj(x) else y.real
@@ -0,0 +1,81 @@
+# Precompiled Qt Designer forms
+# uic.loadUiType parses the .ui XML and generates the form class on every launch. Instead, the generated module is
+# kept in .qt_for_python/cache (untracked, next to the uic folder the VS Code Qt extension writes), tagged with a hash
+# of its .ui file, and only regenerated (with uic.compileUi) when the .ui has changed. PyQt5.uic is only imported to
+# regenerate
+# Instruments derive from FrontPanel instead of the form classes: the Qt class is built when the first front panel is
+# created, so importing an instrument module (or running anything headless) never imports Qt
+
+# Imports
+import os, re, hashlib, importlib.util
+
+# Folder of the generated modules (ignored by git)
+uic_path = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), ".qt_for_python", "cache")
+
+# Header lines of the generated modules
+header = "# ui-sha1: {sha1}\n# ui-base: {base}\n"
+header_re = re.compile(r"# ui-sha1: (\w+)\n# ui-base: (\w+)\n")
+
+# Top-level widget class of a .ui file (the window base class)
+base_re = re.compile(rb'<widget\s+class="(\w+)"')
+
+
+# Hash and window base class recorded in a generated module (None if it has no header)
+def read_header(filename):
+    if not os.path.isfile(filename):
+        return None, None
+    with open(filename, "r", encoding="utf-8") as file:
+        match = header_re.match(file.read(256))
+    return match.groups() if match else (None, None)
+
+
+# Generate the form module of a .ui file
+def compile_ui(ui_file, filename, sha1, base):
+    from PyQt5 import uic
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename + ".tmp", "w", encoding="utf-8") as file:
+        file.write(header.format(sha1=sha1, base=base))
+        uic.compileUi(ui_file, file)
+    os.replace(filename + ".tmp", filename)
+
+
+# Same as uic.loadUiType(ui_file): returns (form class, window base class)
+def load_ui_type(ui_file):
+    from PyQt5 import QtWidgets
+
+    with open(ui_file, "rb") as file:
+        data = file.read()
+    sha1 = hashlib.sha1(data).hexdigest()
+    name = os.path.splitext(os.path.basename(ui_file))[0]
+    filename = os.path.join(uic_path, f"{name}.py")
+
+    recorded, base = read_header(filename)
+    if recorded != sha1:
+        base = base_re.search(data).group(1).decode()
+        try:
+            compile_ui(ui_file, filename, sha1, base)
+        except OSError:
+            # Read-only install: fall back to parsing the .ui
+            from PyQt5 import uic
+            return uic.loadUiType(ui_file)
+
+    spec = importlib.util.spec_from_file_location(f"_uic_{name}", filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    form = next(value for key, value in vars(module).items() if key.startswith("Ui_") and isinstance(value, type))
+    return form, getattr(QtWidgets, base)
+
+
+# Base of the instrument classes, which name their form in ui_file. Creating an instrument creates an instance of its
+# Qt class instead: a subclass of the instrument, its form and the window base class, built once per instrument class
+class FrontPanel():
+    ui_file = None
+
+    def __new__(cls, *args, **kwargs):
+        qt_class = cls.__dict__.get("qt_class")
+        if qt_class is None:
+            form, window = load_ui_type(cls.ui_file)
+            qt_class = type(cls.__name__, (cls, form, window), {"__module__": cls.__module__,
+                                                                 "__qualname__": cls.__qualname__})
+            qt_class.qt_class = cls.qt_class = qt_class
+        return super(FrontPanel, qt_class).__new__(qt_class)  # The Qt base's __new__ (after the form in the MRO)